@@ -0,0 +1,147 @@
+"""
+This module contains the AsyncHotel class for the Royal Stay Hotel Management System.
+"""
+
+import asyncio
+import contextlib
+import functools
+
+from payment import Payment
+
+_SEARCH_BATCH = 8  # Candidate rooms tried per search in reserve_any
+_RESERVE_ROUNDS = 8  # Searches reserve_any makes before giving up
+
+
+class AsyncHotel:
+    """
+    asyncio facade over a Hotel and its Guest, Booking and Payment objects.
+
+    Every call into the synchronous model runs in an executor so the event
+    loop never blocks. A semaphore bounds how many calls are in flight, and
+    reservations on the same room are serialized by a per-room asyncio lock,
+    kept only while some task holds or waits for it.
+    """
+
+    def __init__(self, hotel, max_concurrency=64, executor=None):
+        """Initialize a new AsyncHotel instance."""
+        if max_concurrency <= 0:
+            raise ValueError("Maximum concurrency must be positive")
+        self._hotel = hotel
+        self._executor = executor  # None uses the loop's default executor
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._room_locks = {}  # Room number -> [asyncio.Lock, tasks holding or waiting for it]
+        self._rollbacks = set()  # Pending cancellations of abandoned bookings
+
+    def get_hotel(self):
+        """Get the wrapped hotel."""
+        return self._hotel
+
+    @contextlib.asynccontextmanager
+    async def _room_lock(self, room):
+        """Hold the asyncio lock that serializes reservations on a room, dropping it when unused."""
+        room_number = room.get_room_number()
+        entry = self._room_locks.get(room_number)
+        if entry is None:
+            entry = self._room_locks[room_number] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._room_locks[room_number]
+
+    def _cancel_if_booked(self, future):
+        """Roll back, in the executor, a booking whose caller was cancelled while it was being made."""
+        if future.cancelled() or future.exception() is not None or not future.result():
+            return
+        rollback = asyncio.ensure_future(self._run(future.result().cancel_reservation))
+        self._rollbacks.add(rollback)
+        rollback.add_done_callback(self._rollbacks.discard)
+
+    async def _run(self, func, *args, **kwargs):
+        """Run a synchronous call in the executor under the concurrency bound."""
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def search(self, check_in, check_out, room_type=None, **filters):
+        """Search for rooms available for the given dates."""
+        return await self._run(self._hotel.search, check_in, check_out, room_type, **filters)
+
+    async def reserve(self, guest, room, check_in, check_out):
+        """
+        Reserve a room for a guest.
+
+        If the calling task is cancelled while the booking is being made,
+        the booking is cancelled again as soon as it completes, so a
+        cancelled reserve never leaves nights held.
+
+        Returns:
+            Booking: New booking object if successful, otherwise None
+        """
+        # Queue on the room first so waiters do not hold concurrency slots
+        async with self._room_lock(room):
+            async with self._semaphore:
+                loop = asyncio.get_running_loop()
+                future = loop.run_in_executor(self._executor, guest.create_booking,
+                                              room, check_in, check_out)
+                try:
+                    return await asyncio.shield(future)
+                except asyncio.CancelledError:
+                    future.add_done_callback(self._cancel_if_booked)
+                    raise
+
+    async def reserve_any(self, guest, check_in, check_out, room_type=None, **filters):
+        """
+        Reserve any room that matches the filters for the given dates.
+
+        A room that turns down the stay is not tried again, and the search
+        is repeated at most a fixed number of times, so a room the index
+        wrongly shows as free (say, booked by another process through a
+        shared calendar) cannot keep the coroutine spinning.
+
+        Returns:
+            Booking: New booking object if a room was free, otherwise None
+        """
+        tried = set()
+        for _ in range(_RESERVE_ROUNDS):
+            rooms = await self.search(check_in, check_out, room_type, limit=len(tried) + _SEARCH_BATCH,
+                                      **filters)
+            rooms = [room for room in rooms if room.get_room_number() not in tried]
+            if not rooms:
+                return None
+            for room in rooms:
+                booking = await self.reserve(guest, room, check_in, check_out)
+                if booking:
+                    return booking
+                tried.add(room.get_room_number())
+            # Every candidate was taken by a concurrent booking; search again
+        return None
+
+    async def cancel(self, booking):
+        """
+        Cancel a booking.
+
+        Returns:
+            bool: True if cancellation successful
+        """
+        async with self._room_lock(booking.get_room()):
+            # A cancellation that has started always runs to completion
+            return await asyncio.shield(self._run(booking.cancel_reservation))
+
+    async def invoice(self, booking):
+        """Generate the invoice for a booking."""
+        return await self._run(booking.generate_invoice)
+
+    async def pay(self, invoice, amount, payment_method):
+        """
+        Create and process a payment for an invoice.
+
+        Returns:
+            Payment: The processed payment, whatever its outcome
+        """
+        payment = Payment(invoice, amount, payment_method)
+        await self._run(payment.process_payment)
+        return payment
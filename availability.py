@@ -0,0 +1,126 @@
+"""
+This module contains the AvailabilityCalendar class for the Royal Stay Hotel Management System.
+"""
+
+
+def night_range(check_in, check_out):
+    """
+    Convert a stay into a half-open range of day ordinals.
+
+    Returns:
+        tuple: (first night, day after the last night) as ordinals
+    """
+    start = check_in.toordinal()
+    # A stay always holds at least the check-in night
+    return start, max(check_out.toordinal(), start + 1)
+
+
+class AvailabilityCalendar:
+    """
+    Compact per-day availability calendar keyed by day ordinal.
+
+    Each day is one bit in a bytearray; a set bit means the room is not
+    available that night. Days that were never set are available.
+    """
+    __slots__ = ("_base", "_bits")
+
+    def __init__(self):
+        """Initialize an empty AvailabilityCalendar instance."""
+        self._base = None  # Ordinal of bit 0, always a multiple of 8
+        self._bits = bytearray()
+
+    def _ensure(self, start, end):
+        """Grow the bit buffer so it covers the ordinals [start, end)."""
+        if self._base is None:
+            self._base = start - start % 8
+            self._bits = bytearray((end - self._base + 7) // 8)
+            return
+        if start < self._base:
+            new_base = start - start % 8
+            self._bits[0:0] = bytes((self._base - new_base) // 8)
+            self._base = new_base
+        needed = (end - self._base + 7) // 8
+        if needed > len(self._bits):
+            self._bits.extend(bytes(needed - len(self._bits)))
+
+    def _clip(self, start, end):
+        """Clip [start, end) to the covered ordinals, as bit offsets."""
+        if self._base is None:
+            return 0, 0
+        lo = max(start - self._base, 0)
+        hi = min(end - self._base, len(self._bits) * 8)
+        return lo, hi
+
+    def is_available(self, ordinal):
+        """Check if a single day is available."""
+        offset = ordinal - self._base if self._base is not None else -1
+        if offset < 0 or offset >= len(self._bits) * 8:
+            return True
+        return not (self._bits[offset >> 3] >> (offset & 7)) & 1
+
+    def is_range_available(self, start, end):
+        """Check if every day in the ordinal range [start, end) is available."""
+        lo, hi = self._clip(start, end)
+        if lo >= hi:
+            return True
+        # Read the covering bytes as one integer and test all bits at once
+        word = int.from_bytes(self._bits[lo >> 3:(hi + 7) >> 3], "little")
+        return not (word >> (lo & 7)) & ((1 << (hi - lo)) - 1)
+
+    def set_range(self, start, end, is_available):
+        """Set the availability status for the ordinal range [start, end)."""
+        if end <= start:
+            return
+        if is_available:
+            # Days outside the buffer are already available
+            lo, hi = self._clip(start, end)
+            if lo >= hi:
+                return
+        else:
+            self._ensure(start, end)
+            lo, hi = start - self._base, end - self._base
+
+        bits = self._bits
+        first, last = lo >> 3, (hi - 1) >> 3
+        if first == last:
+            masks = [(first, ((1 << (hi - lo)) - 1) << (lo & 7))]
+        else:
+            masks = [(first, (0xFF << (lo & 7)) & 0xFF),
+                     (last, (1 << (((hi - 1) & 7) + 1)) - 1)]
+            fill = 0 if is_available else 0xFF
+            bits[first + 1:last] = bytes([fill]) * (last - first - 1)
+
+        for index, mask in masks:
+            if is_available:
+                bits[index] &= ~mask & 0xFF
+            else:
+                bits[index] |= mask
+
+    def reserve_range(self, start, end):
+        """
+        Mark the ordinal range [start, end) unavailable if all of it is available.
+
+        Returns:
+            bool: True if the range was free and is now taken
+        """
+        if not self.is_range_available(start, end):
+            return False
+        self.set_range(start, end, False)
+        return True
+
+    def set_available(self, ordinal, is_available):
+        """Set the availability status for a single day."""
+        self.set_range(ordinal, ordinal + 1, is_available)
+
+    def iter_unavailable(self):
+        """Yield the ordinal of every unavailable day in ascending order."""
+        base = self._base
+        for index, byte in enumerate(self._bits):
+            while byte:
+                low = byte & -byte
+                yield base + index * 8 + low.bit_length() - 1
+                byte ^= low
+
+    def count_unavailable(self):
+        """Get the number of unavailable days."""
+        return sum(bin(byte).count("1") for byte in self._bits)
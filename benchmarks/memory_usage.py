@@ -0,0 +1,155 @@
+"""
+Memory benchmark for the Royal Stay Hotel Management System model classes.
+
+Reports the bytes allocated per object for each model class, and in total
+for a large booking history with an invoice, payment, service and
+feedback per booking. With --baseline it also measures the model classes
+of an earlier git revision, such as the commit before __slots__ were
+introduced, and prints the two side by side. Run it from the repository
+root:
+
+    python benchmarks/memory_usage.py [number of bookings]
+    python benchmarks/memory_usage.py 100000 --baseline $(git rev-list --max-parents=0 HEAD)
+"""
+
+import argparse
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Set by --baseline so a child process imports the model classes of another tree
+sys.path.insert(0, os.environ.get("HOTEL_MODEL_PATH") or REPOSITORY)
+
+from booking import Booking, Invoice
+from guest import Guest, LoyaltyProgram
+from payment import Payment
+from room import Room, SingleRoom, DoubleRoom, Suite
+from services import GuestService, Feedback
+
+SAMPLE_SIZE = 20000
+
+
+def measure(factory, count):
+    """Return the bytes allocated per object when creating count objects."""
+    tracemalloc.start()
+    objects = [factory(index) for index in range(count)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    # Subtract the list holding the objects
+    return (current - sys.getsizeof(objects)) / count
+
+
+def build_history(bookings):
+    """Create a booking history with one invoice, payment, service and feedback each."""
+    rooms = [Suite(number, 250.0, ["Wi-Fi"], "Junior") for number in range(500)]
+    guests = [Guest(guest_id, f"Guest {guest_id}", "555-000-0000", f"guest{guest_id}@example.com")
+              for guest_id in range(max(bookings // 10, 1))]
+    start = datetime(2026, 1, 1)
+    history = []
+    for index in range(bookings):
+        guest = guests[index % len(guests)]
+        check_in = start + timedelta(days=index % 700)
+        booking = Booking(index, guest, rooms[index % len(rooms)], check_in, check_in + timedelta(days=2))
+        booking.add_service(GuestService("Room Service", "Breakfast", 25.0))
+        invoice = booking.generate_invoice()
+        payment = Payment(invoice, invoice.get_final_amount(), "Credit Card")
+        payment.process_payment()
+        history.append((booking, payment, Feedback(guest, booking, 5, "Lovely stay")))
+    return history
+
+
+def run(bookings):
+    """
+    Measure every model class and a history of bookings.
+
+    Returns:
+        dict: "classes" maps class names to bytes per object; "history" has
+        bytes and peak bytes for the history
+    """
+    guest = Guest(1, "Sample Guest", "555-000-0000", "sample@example.com")
+    room = Room(1, "Standard", 100.0, ["Wi-Fi"])
+    booking = Booking(1, guest, room, datetime(2026, 1, 1), datetime(2026, 1, 3))
+    invoice = Invoice(1, 200.0)
+    factories = [
+        ("Room", lambda i: Room(i, "Standard", 100.0, [])),
+        ("SingleRoom", lambda i: SingleRoom(i, 100.0, [], "Queen")),
+        ("DoubleRoom", lambda i: DoubleRoom(i, 150.0, [], True)),
+        ("Suite", lambda i: Suite(i, 300.0, [], "Executive")),
+        ("Guest", lambda i: Guest(i, "Guest", "555-000-0000", "guest@example.com")),
+        ("LoyaltyProgram", lambda i: LoyaltyProgram(i)),
+        ("Booking", lambda i: Booking(i, guest, room, datetime(2026, 1, 1), datetime(2026, 1, 3))),
+        ("Invoice", lambda i: Invoice(i, 200.0)),
+        ("Payment", lambda i: Payment(invoice, 200.0, "Cash")),
+        ("GuestService", lambda i: GuestService("Housekeeping", "Towels", 0.0)),
+        ("Feedback", lambda i: Feedback(guest, booking, 4, "Good")),
+    ]
+    classes = {name: measure(factory, SAMPLE_SIZE) for name, factory in factories}
+
+    tracemalloc.start()
+    history = build_history(bookings)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"classes": classes, "history": {"bookings": len(history), "bytes": current, "peak": peak}}
+
+
+def run_baseline(revision, bookings):
+    """Measure the model classes of a git revision in a child process and return its results."""
+    archive = subprocess.run(["git", "-C", REPOSITORY, "archive", revision], check=True,
+                             stdout=subprocess.PIPE).stdout
+    tree = tempfile.mkdtemp()
+    try:
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            tar.extractall(tree)
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), str(bookings), "--json"],
+                                check=True, stdout=subprocess.PIPE, cwd=tree,
+                                env=dict(os.environ, HOTEL_MODEL_PATH=tree)).stdout
+    finally:
+        shutil.rmtree(tree)
+    return json.loads(output)
+
+
+def main(argv=None):
+    """Print bytes per object and the total for a large history."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("bookings", nargs="?", type=int, default=100000, help="bookings in the history")
+    parser.add_argument("--baseline", metavar="REVISION", help="also measure the model classes at this git revision")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.bookings)
+    if args.json:
+        print(json.dumps(results))
+        return
+    baseline = run_baseline(args.baseline, args.bookings) if args.baseline else None
+
+    if baseline is None:
+        print(f"{'Class':<16}{'Bytes/object':>14}")
+        for name, size in results["classes"].items():
+            print(f"{name:<16}{size:>14.1f}")
+    else:
+        print(f"{'Class':<16}{'Baseline':>10}{'Current':>10}{'Ratio':>8}")
+        for name, size in results["classes"].items():
+            before = baseline["classes"].get(name)
+            print(f"{name:<16}{before:>10.1f}{size:>10.1f}{before / size:>7.2f}x")
+
+    for label, result in (("Baseline history", baseline), ("History", results)):
+        if result is None:
+            continue
+        history = result["history"]
+        print(f"\n{label} of {history['bookings']} bookings: {history['bytes'] / 1e6:.1f} MB "
+              f"({history['bytes'] / history['bookings']:.0f} bytes/booking, peak {history['peak'] / 1e6:.1f} MB)")
+    if baseline is not None:
+        print(f"\nHistory memory of {args.baseline} / current: "
+              f"{baseline['history']['bytes'] / results['history']['bytes']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Recovery benchmark for the Royal Stay Hotel Management System persistence layer.
+
+Records a synthetic history through a HotelStore: rooms, guests and
+bookings, with every booking invoiced and most of them paid. It then
+measures how long open() takes to rebuild the hotel, first from the
+write-ahead log alone and then from a snapshot. Run it from the
+repository root:
+
+    python benchmarks/persistence_recovery.py --bookings 1000000
+"""
+
+import argparse
+import gc
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guest import Guest
+from payment import Payment
+from persistence import HotelStore
+from room import SingleRoom, DoubleRoom, Suite
+
+START_DATE = datetime(2026, 1, 1)
+
+
+def record_history(store, bookings, rooms, guests):
+    """Book, invoice and pay bookings two-night stays back to back across the rooms."""
+    room_classes = (lambda number: SingleRoom(number, 90.0, ["Wi-Fi"], "Queen"),
+                    lambda number: DoubleRoom(number, 150.0, ["Wi-Fi", "TV"], True),
+                    lambda number: Suite(number, 380.0, ["Wi-Fi", "Minibar"], "Executive"))
+    for number in range(rooms):
+        store.add_room(room_classes[number % 3](10000 + number))
+    people = [Guest(guest_id, f"Guest {guest_id}", "555-000-0000", f"guest{guest_id}@example.com")
+              for guest_id in range(1, guests + 1)]
+    hotel_rooms = store.get_hotel().get_rooms()
+    for index in range(bookings):
+        room = hotel_rooms[index % rooms]
+        check_in = START_DATE + timedelta(days=index // rooms * 2)
+        booking = people[index % guests].create_booking(room, check_in, check_in + timedelta(days=2))
+        invoice = booking.generate_invoice()
+        if index % 10:
+            Payment(invoice, invoice.get_final_amount(), "Credit Card").process_payment()
+
+
+def _timed_open(directory):
+    """Open a store and return (seconds, bookings recovered)."""
+    gc.collect()
+    started = time.perf_counter()
+    store = HotelStore(directory).open()
+    elapsed = time.perf_counter() - started
+    recovered = sum(len(guest.view_history()) for guest in store.get_guests())
+    store.close()
+    return elapsed, recovered
+
+
+def main(argv=None):
+    """Run the benchmark and return the process exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bookings", type=int, default=1000000, help="bookings to record")
+    parser.add_argument("--rooms", type=int, default=3000, help="rooms in the hotel")
+    parser.add_argument("--guests", type=int, default=100000, help="guests making the bookings")
+    parser.add_argument("--directory", help="store directory (default: a temporary one, removed afterwards)")
+    args = parser.parse_args(argv)
+
+    directory = args.directory or tempfile.mkdtemp()
+    try:
+        started = time.perf_counter()
+        store = HotelStore(directory).open()
+        record_history(store, args.bookings, args.rooms, args.guests)
+        store.close()
+        del store  # Recover into a process that no longer holds the recorded history
+        print(f"Recorded {args.bookings:,} bookings in {time.perf_counter() - started:.1f}s")
+
+        elapsed, recovered = _timed_open(directory)
+        print(f"Recovered {recovered:,} bookings from the log in {elapsed:.2f}s")
+
+        store = HotelStore(directory).open()
+        started = time.perf_counter()
+        store.snapshot()
+        print(f"Snapshot written in {time.perf_counter() - started:.2f}s")
+        store.close()
+        del store
+        elapsed, recovered = _timed_open(directory)
+        print(f"Recovered {recovered:,} bookings from the snapshot in {elapsed:.2f}s")
+    finally:
+        if not args.directory:
+            shutil.rmtree(directory)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Workload replay driver for the Royal Stay Hotel Management System.
+
+Replays a JSON Lines workload (see replay.py for the format) against a
+fresh hotel and prints throughput and latency percentiles per operation.
+Operations run on one thread or spread over worker threads, as fast as
+possible or at a fixed arrival rate. A synthetic workload can be
+generated to try it out. Run it from the repository root:
+
+    python benchmarks/replay_workload.py run workloads/sample_day.jsonl --threads 4
+    python benchmarks/replay_workload.py run day.jsonl.gz --rate 5000 --output results.json
+    python benchmarks/replay_workload.py generate day.jsonl.gz --days 365 --rooms 200 --guests 5000
+"""
+
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replay import OUTCOMES, WorkloadReplayer, generate_workload, read_workload, write_workload
+
+
+def _print_report(report):
+    """Print a replay report as a table."""
+    print(f"{report['operations']:,} operations in {report['elapsed']:.2f}s "
+          f"({report['throughput']:,.0f} ops/sec, {report['errors']} errors)")
+    print(f"{'Operation':<14}{'count':>9}{'ops/sec':>11}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}"
+          f"{'max us':>10}  outcomes")
+    for operation, result in report["per_operation"].items():
+        outcomes = ", ".join(f"{outcome} {result['outcomes'][outcome]}" for outcome in OUTCOMES
+                             if outcome in result["outcomes"])
+        print(f"{operation:<14}{result['count']:>9,}{result['throughput']:>11,.0f}"
+              + "".join(f"{result[key] * 1e6:>10.1f}" for key in ("p50", "p95", "p99", "max"))
+              + f"  {outcomes}")
+
+
+def main(argv=None):
+    """Run the driver and return the process exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="replay a workload file")
+    run.add_argument("workload", help="JSON Lines workload, optionally gzip-compressed (.gz)")
+    run.add_argument("--threads", type=int, default=1, help="worker threads")
+    run.add_argument("--rate", type=float, help="arrival rate in operations per second (default: unthrottled)")
+    run.add_argument("--output", help="write the report to this JSON file")
+    generate = commands.add_parser("generate", help="write a synthetic workload file")
+    generate.add_argument("workload", help="output file; compressed if it ends in .gz")
+    generate.add_argument("--rooms", type=int, default=10, help="rooms of each type")
+    generate.add_argument("--guests", type=int, default=100, help="guests")
+    generate.add_argument("--days", type=int, default=30, help="days of arrivals")
+    generate.add_argument("--seed", type=int, default=1, help="seed of the generator")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        count = write_workload(generate_workload(args.rooms, args.guests, args.days, args.seed), args.workload)
+        print(f"Wrote {count:,} operations to {args.workload}")
+        return 0
+
+    try:
+        report = WorkloadReplayer().run(read_workload(args.workload), args.threads, args.rate)
+    except ValueError as error:
+        parser.error(str(error))
+    _print_report(report)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+        print(f"\nReport written to {args.output}")
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
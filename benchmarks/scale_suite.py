@@ -0,0 +1,334 @@
+"""
+Scale benchmark suite for the Royal Stay Hotel Management System.
+
+Builds a deterministic synthetic hotel for each data size, with rooms of
+every Room subclass, guests and years of bookings, services, feedback
+and payments, then times the core operations against it. For each size
+and operation it reports ops/sec and latency percentiles, plus the peak
+memory of the process. Results can be saved as JSON and compared with
+a stored baseline; the run fails when an operation's throughput drops
+by more than the threshold. Run it from the repository root:
+
+    python benchmarks/scale_suite.py --sizes small,medium --output results.json
+    python benchmarks/scale_suite.py --baseline results.json --threshold 0.25
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from guest import Guest
+from histogram import LatencyHistogram
+from loyalty_ledger import LoyaltyLedger
+from payment import Payment, PAYMENT_METHODS
+from room import SingleRoom, DoubleRoom, Suite
+from services import GuestService, Feedback
+
+# Data size -> (rooms of each subclass, guests, years of bookings)
+SIZES = {
+    "small": (20, 200, 1),
+    "medium": (200, 2000, 2),
+    "large": (1000, 20000, 3),
+}
+OPERATIONS = ("check_availability", "create_booking", "cancel_reservation", "generate_invoice",
+              "process_payment", "loyalty_accrual")
+START_DATE = datetime(2026, 1, 1)
+SEED = 20260101
+
+SERVICES = (("Room Service", "Breakfast", 25.0), ("Spa", "Massage", 90.0),
+            ("Housekeeping", "Extra towels", 0.0), ("Laundry", "Pressing", 15.0))
+COMMENTS = ("Lovely stay", "Room was noisy at night", "Friendly staff and great breakfast",
+            "AC broken on arrival", "Spotless room with a view")
+
+
+def generate_hotel(rooms_per_type, guests, years, seed=SEED):
+    """
+    Build a synthetic hotel. The same arguments always give the same data.
+
+    About two thirds of the room nights are booked. Every booking is
+    invoiced; most are paid, some have services and feedback and a few
+    are cancelled.
+
+    Returns:
+        dict: rooms, guests and bookings lists
+    """
+    rng = random.Random(seed)
+    rooms = []
+    for number in range(rooms_per_type):
+        rooms.append(SingleRoom(1000 + number, 80.0 + number % 5 * 10, ["Wi-Fi"], "Queen"))
+        rooms.append(DoubleRoom(20000 + number, 140.0 + number % 5 * 15, ["Wi-Fi", "TV"], number % 2 == 0))
+        rooms.append(Suite(40000 + number, 350.0 + number % 5 * 50, ["Wi-Fi", "TV", "Minibar"], "Executive"))
+    people = [Guest(guest_id, f"Guest {guest_id}", "555-000-0000", f"guest{guest_id}@example.com")
+              for guest_id in range(1, guests + 1)]
+    for guest in people[::3]:
+        guest.enroll_in_loyalty_program()
+
+    bookings = []
+    days = 365 * years
+    for room in rooms:
+        day = rng.randrange(4)
+        while day < days:
+            nights = rng.randint(1, 6)
+            check_in = START_DATE + timedelta(days=day)
+            guest = people[rng.randrange(guests)]
+            booking = guest.create_booking(room, check_in, check_in + timedelta(days=nights))
+            if rng.random() < 0.3:
+                booking.add_service(GuestService(*SERVICES[rng.randrange(len(SERVICES))]))
+            invoice = booking.generate_invoice()
+            if rng.random() < 0.05:
+                booking.cancel_reservation()
+            elif rng.random() < 0.9:
+                Payment(invoice, invoice.get_final_amount(), PAYMENT_METHODS[rng.randrange(3)]).process_payment()
+            if rng.random() < 0.2:
+                Feedback(guest, booking, rng.randint(1, 5), COMMENTS[rng.randrange(len(COMMENTS))])
+            bookings.append(booking)
+            day += nights + rng.randrange(4)  # Gaps of up to three nights between stays
+    return {"rooms": rooms, "guests": people, "bookings": bookings}
+
+
+def _time_calls(calls):
+    """
+    Time each zero-argument call with the garbage collector paused, as timeit does.
+
+    Returns:
+        LatencyHistogram: One duration per call
+    """
+    histogram = LatencyHistogram()
+    clock = time.perf_counter
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        for call in calls:
+            started = clock()
+            call()
+            histogram.record(clock() - started)
+    finally:
+        if collecting:
+            gc.enable()
+    return histogram
+
+
+def _free_days(hotel, count):
+    """
+    Claim a run of days after the generated history and every earlier claim,
+    long enough for count two-night stays spread over the rooms.
+
+    Returns:
+        int: Days from START_DATE to the first claimed day
+    """
+    first = hotel.get("next_free_day", 4000)
+    hotel["next_free_day"] = first + (count // len(hotel["rooms"]) + 1) * 3
+    return first
+
+
+def _must_succeed(call):
+    """Wrap a call that returns a success flag so a failure stops the benchmark."""
+    def checked():
+        if not call():
+            raise RuntimeError(f"{call.__qualname__} failed during the benchmark")
+    return checked
+
+
+def _prepare(hotel, operation, count, rng):
+    """Build the calls for one operation, doing any setup outside the timed region."""
+    rooms, guests, bookings = hotel["rooms"], hotel["guests"], hotel["bookings"]
+    if operation == "check_availability":
+        calls = []
+        for _ in range(count):
+            check_in = START_DATE + timedelta(days=rng.randrange(365))
+            calls.append(lambda room=rooms[rng.randrange(len(rooms))], check_in=check_in:
+                         room.check_availability(check_in, check_in + timedelta(days=3)))
+        return calls
+    if operation == "create_booking":
+        # Stays after the generated history and earlier rounds, so each one succeeds
+        first = _free_days(hotel, count)
+        calls = []
+        for index in range(count):
+            room = rooms[index % len(rooms)]
+            check_in = START_DATE + timedelta(days=first + index // len(rooms) * 3)
+            calls.append(lambda guest=guests[rng.randrange(len(guests))], room=room, check_in=check_in:
+                         hotel["new_bookings"].append(
+                             guest.create_booking(room, check_in, check_in + timedelta(days=2))))
+        hotel["new_bookings"] = []
+        return calls
+    new_bookings = hotel.get("new_bookings") or []
+    if operation == "cancel_reservation":
+        return [booking.cancel_reservation for booking in new_bookings[:count]]
+    if operation == "generate_invoice":
+        # Invoice bookings that have none yet; regenerate existing ones once they run out
+        fresh = [booking for booking in new_bookings if booking.get_invoice() is None]
+        sample = (fresh + [bookings[rng.randrange(len(bookings))] for _ in range(count)])[:count]
+        return [booking.generate_invoice for booking in sample]
+    if operation == "process_payment":
+        # Most generated invoices are paid already and would be refused; pay fresh bookings instead
+        first = _free_days(hotel, count)
+        invoices = []
+        for index in range(count):
+            check_in = START_DATE + timedelta(days=first + index // len(rooms) * 3)
+            booking = guests[rng.randrange(len(guests))].create_booking(
+                rooms[index % len(rooms)], check_in, check_in + timedelta(days=2))
+            invoices.append(booking.generate_invoice())
+        return [_must_succeed(Payment(invoice, invoice.get_final_amount(), "Credit Card").process_payment)
+                for invoice in invoices]
+    if operation == "loyalty_accrual":
+        members = [guest.get_loyalty_program() for guest in guests if guest.get_loyalty_program()]
+        return [lambda program=members[rng.randrange(len(members))], amount=rng.uniform(50, 900):
+                program.earn_points(amount) for _ in range(count)]
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def _ledger_accrual(hotel):
+    """Time one batch accrual of every paid booking through a LoyaltyLedger."""
+    ledger = LoyaltyLedger()
+    started = time.perf_counter()
+    ledger.accrue_paid_bookings(hotel["bookings"])
+    elapsed = time.perf_counter() - started
+    return {"ops": len(hotel["bookings"]), "ops_per_sec": len(hotel["bookings"]) / elapsed if elapsed else 0.0}
+
+
+def _summary(histogram):
+    """Get ops/sec and latency percentiles in microseconds from a histogram."""
+    total = histogram.get_total()
+    return {
+        "ops": histogram.get_count(),
+        "ops_per_sec": histogram.get_count() / total if total else 0.0,
+        "p50_us": histogram.get_quantile(0.50) * 1e6,
+        "p95_us": histogram.get_quantile(0.95) * 1e6,
+        "p99_us": histogram.get_quantile(0.99) * 1e6,
+    }
+
+
+def run_size(name, operations_per_test, seed=SEED, repeat=3):
+    """
+    Generate the hotel for a data size and benchmark every operation on it.
+
+    Each operation is timed repeat times and the round with the highest
+    throughput is kept, which filters out noise from other processes.
+    Tracing allocations slows Python down several times over, so the peak
+    memory the operations allocate on top of the generated hotel is
+    measured in one more, untimed round.
+
+    Returns:
+        dict: Data set counts, generation time, peak memory while generating
+        and while running the operations, and per-operation results
+    """
+    rooms_per_type, guests, years = SIZES[name]
+    tracemalloc.start()
+    started = time.perf_counter()
+    hotel = generate_hotel(rooms_per_type, guests, years, seed)
+    generation = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rng = random.Random(seed + 1)
+    results = {}
+    for _ in range(repeat):
+        rounds = {operation: _summary(_time_calls(_prepare(hotel, operation, operations_per_test, rng)))
+                  for operation in OPERATIONS}
+        rounds["ledger_batch_accrual"] = _ledger_accrual(hotel)
+        for operation, result in rounds.items():
+            if operation not in results or result["ops_per_sec"] > results[operation]["ops_per_sec"]:
+                results[operation] = result
+
+    tracemalloc.start()
+    for operation in OPERATIONS:
+        for call in _prepare(hotel, operation, operations_per_test, rng):
+            call()
+    _ledger_accrual(hotel)
+    _, operations_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "rooms": len(hotel["rooms"]),
+        "guests": len(hotel["guests"]),
+        "bookings": len(hotel["bookings"]),
+        "generation_seconds": generation,
+        "peak_memory_mb": peak / 1e6,
+        "operations_peak_memory_mb": operations_peak / 1e6,
+        "operations": results,
+    }
+
+
+def compare(results, baseline, threshold):
+    """
+    Find operations whose throughput fell more than threshold below the baseline.
+
+    Returns:
+        list: (size, operation, baseline ops/sec, current ops/sec) tuples
+    """
+    regressions = []
+    for size, size_results in results["sizes"].items():
+        baseline_size = baseline.get("sizes", {}).get(size)
+        if baseline_size is None:
+            continue
+        for operation, current in size_results["operations"].items():
+            reference = baseline_size["operations"].get(operation)
+            if reference and current["ops_per_sec"] < reference["ops_per_sec"] * (1 - threshold):
+                regressions.append((size, operation, reference["ops_per_sec"], current["ops_per_sec"]))
+    return regressions
+
+
+def main(argv=None):
+    """Run the suite and return the process exit status."""
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="small,medium",
+                        help=f"comma-separated data sizes from: {', '.join(SIZES)}")
+    parser.add_argument("--operations", type=int, default=5000, help="timed calls per operation")
+    parser.add_argument("--repeat", type=int, default=3, help="rounds per operation; the fastest is kept")
+    parser.add_argument("--seed", type=int, default=SEED, help="seed of the data generator")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--baseline", help="compare with results saved earlier")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="largest allowed drop in ops/sec compared with the baseline")
+    args = parser.parse_args(argv)
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    for size in sizes:
+        if size not in SIZES:
+            parser.error(f"unknown size {size!r}")
+    results = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": args.seed,
+        "operations_per_test": args.operations,
+        "repeat": args.repeat,
+        "sizes": {},
+    }
+    for size in sizes:
+        size_results = results["sizes"][size] = run_size(size, args.operations, args.seed, args.repeat)
+        print(f"\n{size}: {size_results['rooms']} rooms, {size_results['guests']} guests, "
+              f"{size_results['bookings']} bookings (generated in {size_results['generation_seconds']:.1f}s, "
+              f"peak {size_results['peak_memory_mb']:.1f} MB; "
+              f"peak {size_results['operations_peak_memory_mb']:.1f} MB more while running the operations)")
+        print(f"{'Operation':<22}{'ops/sec':>12}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}")
+        for operation, result in size_results["operations"].items():
+            percentiles = "".join(f"{result[key]:>10.1f}" if key in result else f"{'':>10}"
+                                  for key in ("p50_us", "p95_us", "p99_us"))
+            print(f"{operation:<22}{result['ops_per_sec']:>12,.0f}{percentiles}")
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(results, baseline, args.threshold)
+        for size, operation, reference, current in regressions:
+            print(f"REGRESSION {size}/{operation}: {current:,.0f} ops/sec vs baseline {reference:,.0f}")
+        if regressions:
+            return 1
+        print(f"\nNo operation regressed more than {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""
+This module contains the BillingEngine and InvoiceBatch classes for the Royal Stay Hotel Management System.
+"""
+
+from booking import Booking, Invoice
+from guest import LOYALTY_DISCOUNTS
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to list columns
+    np = None
+
+def _discount_percent(loyalty_program):
+    """Get the loyalty discount percentage for a guest's program, or 0."""
+    if loyalty_program is None:
+        return 0
+    return LOYALTY_DISCOUNTS.get(loyalty_program.get_membership_level(), 0)
+
+
+class InvoiceBatch:
+    """
+    Columnar invoice amounts for a list of bookings.
+
+    Column i belongs to the i-th booking. Columns are NumPy arrays when
+    the batch was computed with NumPy and lists otherwise.
+    """
+
+    def __init__(self, bookings, nights, base_amounts, service_charges, discounts, total_amounts, final_amounts):
+        """Initialize a new InvoiceBatch instance."""
+        self._bookings = bookings
+        self._nights = nights
+        self._base_amounts = base_amounts
+        self._service_charges = service_charges
+        self._discounts = discounts
+        self._total_amounts = total_amounts
+        self._final_amounts = final_amounts
+
+    def __len__(self):
+        """Return the number of bookings in the batch."""
+        return len(self._bookings)
+
+    def get_bookings(self):
+        """Get the bookings in column order."""
+        return self._bookings
+
+    def get_nights(self):
+        """Get the number of nights of each booking."""
+        return self._nights
+
+    def get_base_amounts(self):
+        """Get the room charge of each booking."""
+        return self._base_amounts
+
+    def get_service_charges(self):
+        """Get the service charges of each booking."""
+        return self._service_charges
+
+    def get_discounts(self):
+        """Get the loyalty discount percentage of each booking."""
+        return self._discounts
+
+    def get_total_amounts(self):
+        """Get the total amount before discount of each booking."""
+        return self._total_amounts
+
+    def get_final_amounts(self):
+        """Get the final amount after discount of each booking."""
+        return self._final_amounts
+
+    def get_grand_total(self):
+        """Get the sum of the final amounts."""
+        return sum(self._column(self._final_amounts))
+
+    @staticmethod
+    def _column(values):
+        """Get a column as a list of Python numbers."""
+        return values.tolist() if np is not None and isinstance(values, np.ndarray) else values
+
+    def to_invoices(self):
+        """
+        Create an Invoice for every booking in the batch.
+
+        The invoices are not attached to their bookings.
+
+        Returns:
+            list: Invoice objects in column order
+        """
+        return list(map(Invoice.restore,
+                        [booking.get_booking_id() for booking in self._bookings],
+                        self._column(self._total_amounts),
+                        self._column(self._discounts),
+                        self._column(self._final_amounts)))
+
+    def __str__(self):
+        """Return a string representation of the batch."""
+        return f"Invoice batch: {len(self)} bookings | Total: ${self.get_grand_total():.2f}"
+
+
+class BillingEngine:
+    """
+    Batch invoicing for the night audit.
+
+    Gathers the inputs of many bookings into columns once and computes
+    base amount, service charges, loyalty discount and final amount for
+    all of them together. The arithmetic is the same as
+    Booking.generate_invoice, in the same order, so the amounts match the
+    per-booking path exactly. Rooms with a rate calendar are charged
+    night by night through Room.get_room_charge.
+
+    The result is columnar and creates no Invoice objects, which is where
+    batching pays. InvoiceBatch.to_invoices() builds Invoice objects from
+    it when they are needed.
+    """
+
+    def __init__(self, use_numpy=None):
+        """Initialize a new BillingEngine instance."""
+        if use_numpy is None:
+            use_numpy = np is not None
+        elif use_numpy and np is None:
+            raise ImportError("NumPy is required for use_numpy=True")
+        self._use_numpy = use_numpy
+
+    def compute(self, bookings):
+        """
+        Compute invoice amounts for bookings without creating invoices.
+
+        Returns:
+            InvoiceBatch: Columnar amounts in the order of bookings
+        """
+        bookings = list(bookings)
+        # map() over the unbound getters skips a Python frame per booking
+        nights = list(map(Booking.calculate_stay_duration, bookings))
+        charges = list(map(Booking.get_service_charges, bookings))
+
+        # Look up each distinct room and guest once, then fan out by identity
+        rooms = list(map(Booking.get_room, bookings))
+        room_prices = {room: room.get_price_per_night() for room in set(rooms)}
+        prices = list(map(room_prices.__getitem__, rooms))
+        guests = list(map(Booking.get_guest, bookings))
+        guest_discounts = {guest: _discount_percent(guest.get_loyalty_program()) for guest in set(guests)}
+        discounts = list(map(guest_discounts.__getitem__, guests))
+        base_amounts = None
+        if any(room.get_rate_calendar() is not None for room in room_prices):
+            base_amounts = [room.get_room_charge(booking.get_check_in(), booking.get_check_out())
+                            for room, booking in zip(rooms, bookings)]
+
+        if self._use_numpy and bookings:
+            return self._compute_numpy(bookings, nights, prices, charges, discounts, base_amounts)
+        return self._compute_python(bookings, nights, prices, charges, discounts, base_amounts)
+
+    @staticmethod
+    def _compute_python(bookings, nights, prices, charges, discounts, base_amounts=None):
+        """Compute the amount columns as lists, from flat prices unless base_amounts is given."""
+        if base_amounts is None:
+            base_amounts = [count * price for count, price in zip(nights, prices)]
+        totals = [base + charge for base, charge in zip(base_amounts, charges)]
+        finals = [total - (total * percent) / 100 if percent else total
+                  for total, percent in zip(totals, discounts)]
+        return InvoiceBatch(bookings, nights, base_amounts, charges, discounts, totals, finals)
+
+    @staticmethod
+    def _compute_numpy(bookings, nights, prices, charges, discounts, base_amounts=None):
+        """Compute the amount columns as NumPy arrays, from flat prices unless base_amounts is given."""
+        nights = np.array(nights, dtype=np.int64)
+        if base_amounts is None:
+            base_amounts = nights * np.array(prices, dtype=np.float64)
+        else:
+            base_amounts = np.array(base_amounts, dtype=np.float64)
+        charges = np.array(charges, dtype=np.float64)
+        discounts = np.array(discounts, dtype=np.int64)
+        totals = base_amounts + charges
+        finals = np.where(discounts != 0, totals - (totals * discounts) / 100, totals)
+        return InvoiceBatch(bookings, nights, base_amounts, charges, discounts, totals, finals)
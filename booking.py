@@ -2,12 +2,24 @@
 This module contains the Booking and Invoice classes for the Royal Stay Hotel Management System.
 """
 
+import sys
+import threading
 from datetime import datetime
 
+import events
+from guest import LOYALTY_DISCOUNTS
+from room import booking_change
+
+_payment_status_lock = threading.Lock()  # Makes marking an invoice paid check-and-set
+_services_lock = threading.Lock()  # Makes adding a service and its charge one step
+_settling = set()  # Invoices with a payment being charged, guarded by _payment_status_lock
+
 class Booking:
     """
     Booking class representing a room reservation.
     """
+    __slots__ = ("_booking_id", "_guest", "_room", "_check_in", "_check_out", "_status",
+                 "_invoice", "_invoice_inputs", "_services", "_service_charges")
     
     def __init__(self, booking_id, guest, room, check_in, check_out):
         """Initialize a new Booking instance."""
@@ -18,7 +30,9 @@ class Booking:
         self._check_out = check_out
         self._status = "Confirmed"
         self._invoice = None
-        self._services = []
+        self._invoice_inputs = None  # (room charge, service charges, loyalty level) behind the invoice
+        self._services = None  # List created with the first service; most bookings have none
+        self._service_charges = 0  # Running sum, in the order services were added
     
     def get_booking_id(self):
         """Get the booking ID."""
@@ -46,7 +60,9 @@ class Booking:
     
     def set_status(self, status):
         """Set a new status for the booking."""
-        self._status = status
+        # Intern so millions of bookings share one string per status
+        self._status = sys.intern(status)
+        events.publish("booking_status_changed", self, status)
     
     def calculate_stay_duration(self):
         """Calculate the duration of the stay in days."""
@@ -55,42 +71,104 @@ class Booking:
     
     def add_service(self, service):
         """Add a service to the booking."""
-        self._services.append(service)
+        with _services_lock:
+            if self._services is None:
+                self._services = []
+            self._services.append(service)
+            self._service_charges += service.get_charge()
+        events.publish("service_added", self, service)
     
     def get_services(self):
-        """Get all services requested for this booking."""
-        return self._services
+        """Get all services requested for this booking, as a tuple. Add services with add_service."""
+        # A copy, so nothing can be added that skips the service charges the invoice uses
+        services = self._services
+        return tuple(services) if services else ()
+    
+    def get_service_charges(self):
+        """Get the total charge of all services requested for this booking."""
+        return self._service_charges
+    
+    def _get_invoice_inputs(self):
+        """Get the current room charge, service charges and loyalty level the invoice depends on."""
+        loyalty_program = self._guest.get_loyalty_program()
+        level = loyalty_program.get_membership_level() if loyalty_program else None
+        return self._room.get_room_charge(self._check_in, self._check_out), self._service_charges, level
+    
+    def _calculate_amounts(self, inputs):
+        """
+        Calculate invoice amounts from the invoice inputs.
+        
+        Returns:
+            tuple: (total amount, loyalty discount percent)
+        """
+        base_amount, service_charges, level = inputs
+        total_amount = base_amount + service_charges
+        
+        # Apply loyalty discount if applicable
+        return total_amount, LOYALTY_DISCOUNTS.get(level, 0)
     
     def generate_invoice(self):
         """
-        Generate an invoice for the booking.
+        Generate an invoice for the booking, or bring the existing one up to date.
+        
+        The invoice is recalculated in place, keeping its ID, when services
+        were added, the room charge changed (through the room price or its
+        rate calendar) or the guest's loyalty level changed since it was
+        last generated. A paid invoice whose final amount goes up becomes
+        "Partially Paid", with the difference as its balance due.
+        Otherwise the existing invoice is returned as is.
         
         Returns:
-            Invoice: New invoice object
+            Invoice: The booking's invoice
         """
-        if not self._invoice:
-            # Calculate base amount
-            nights = self.calculate_stay_duration()
-            base_amount = nights * self._room.get_price_per_night()
-            
-            # Add service charges
-            service_charges = sum(service.get_charge() for service in self._services)
-            
-            total_amount = base_amount + service_charges
-            
+        inputs = self._get_invoice_inputs()
+        if inputs == self._invoice_inputs and self._invoice is not None:
+            return self._invoice
+        
+        total_amount, discount_percent = self._calculate_amounts(inputs)
+        if self._invoice is None:
             # Create invoice
             self._invoice = Invoice(self._booking_id, total_amount)
-            
-            # Apply loyalty discount if applicable
-            loyalty_program = self._guest.get_loyalty_program()
-            if loyalty_program:
-                if loyalty_program.get_membership_level() == "Silver":
-                    self._invoice.apply_discount(5)
-                elif loyalty_program.get_membership_level() == "Gold":
-                    self._invoice.apply_discount(10)
+            self._invoice._booking = self
+            if discount_percent:
+                self._invoice.apply_discount(discount_percent)
+            self._invoice_inputs = inputs
+            events.publish("invoice_generated", self, self._invoice)
+        else:
+            self._invoice_inputs = inputs
+            if (total_amount, discount_percent) != (self._invoice.get_total_amount(),
+                                                    self._invoice.get_discount_applied()):
+                self._invoice.update_amounts(total_amount, discount_percent)
+                events.publish("invoice_updated", self, self._invoice)
         
         return self._invoice
     
+    def get_invoice(self):
+        """Get the invoice generated for the booking, or None."""
+        return self._invoice
+    
+    def set_invoice(self, invoice):
+        """Attach an existing invoice, such as one restored from storage."""
+        invoice._booking = self
+        self._invoice = invoice
+        self._invoice_inputs = None  # Checked against current amounts on next generate_invoice
+    
+    def is_invoice_stale(self):
+        """
+        Check whether the invoice no longer matches the booking.
+        
+        Returns:
+            bool: True if services, the room charge or the loyalty level
+            changed the amounts since the invoice was last generated
+        """
+        if self._invoice is None:
+            return False
+        inputs = self._get_invoice_inputs()
+        if inputs == self._invoice_inputs:
+            return False
+        return self._calculate_amounts(inputs) != (self._invoice.get_total_amount(),
+                                                   self._invoice.get_discount_applied())
+    
     def cancel_reservation(self):
         """
         Cancel the booking and update room availability.
@@ -98,19 +176,18 @@ class Booking:
         Returns:
             bool: True if cancellation successful
         """
-        if self._status == "Cancelled":
-            return False
-        
-        # Update status
-        self._status = "Cancelled"
-        
-        # Update room availability
-        current_date = self._check_in
-        while current_date < self._check_out:
-            self._room.set_availability(current_date, True)
-            # Move to next day
-            current_date = current_date.replace(day=current_date.day + 1)
+        with self._room.get_lock():
+            if self._status == "Cancelled":
+                return False
+            
+            # Update status
+            self._status = "Cancelled"
+            
+            # Update room availability
+            with booking_change():
+                self._room.release(self._check_in, self._check_out)
         
+        events.publish("booking_cancelled", self)
         return True
     
     def __str__(self):
@@ -127,19 +204,40 @@ class Invoice:
     """
     Invoice class representing a booking invoice.
     """
+    __slots__ = ("_booking_id", "_total_amount", "_discount_applied",
+                 "_final_amount", "_payment_status", "_amount_paid", "_booking")
     
     def __init__(self, booking_id, total_amount):
         """Initialize a new Invoice instance."""
-        self._invoice_id = f"INV-{booking_id}"
         self._booking_id = booking_id
         self._total_amount = total_amount
         self._discount_applied = 0
         self._final_amount = total_amount
         self._payment_status = "Pending"
+        self._amount_paid = 0  # Final amount when the invoice was last marked paid
+        self._booking = None  # Set by the booking the invoice is attached to
+    
+    @classmethod
+    def restore(cls, booking_id, total_amount, discount_applied, final_amount, payment_status="Pending",
+                amount_paid=None):
+        """Recreate an invoice from amounts that were already calculated."""
+        invoice = cls(booking_id, total_amount)
+        invoice._discount_applied = discount_applied
+        invoice._final_amount = final_amount
+        invoice._payment_status = sys.intern(payment_status)
+        if amount_paid is None:
+            amount_paid = final_amount if payment_status == "Paid" else 0
+        invoice._amount_paid = amount_paid
+        return invoice
     
     def get_invoice_id(self):
         """Get the invoice ID."""
-        return self._invoice_id
+        # Derived rather than stored to keep invoices small
+        return f"INV-{self._booking_id}"
+    
+    def get_booking_id(self):
+        """Get the ID of the invoiced booking."""
+        return self._booking_id
     
     def get_total_amount(self):
         """Get the total amount before discount."""
@@ -157,9 +255,65 @@ class Invoice:
         """Get the payment status."""
         return self._payment_status
     
+    def get_amount_paid(self):
+        """Get the amount paid so far."""
+        return self._amount_paid
+    
+    def get_balance_due(self):
+        """Get the part of the final amount that is still to be paid."""
+        return max(self._final_amount - self._amount_paid, 0)
+    
+    def is_stale(self):
+        """Check whether the booking changed since the invoice amounts were calculated."""
+        return self._booking is not None and self._booking.get_invoice() is self and self._booking.is_invoice_stale()
+    
+    def refresh(self):
+        """Bring the amounts up to date with the booking, as Booking.generate_invoice does."""
+        if self._booking is not None and self._booking.get_invoice() is self:
+            self._booking.generate_invoice()
+    
     def set_payment_status(self, status):
-        """Set a new payment status."""
-        self._payment_status = status
+        """Set a new payment status. Setting "Paid" records the final amount as paid."""
+        with _payment_status_lock:
+            self._payment_status = sys.intern(status)
+            if status == "Paid":
+                self._amount_paid = self._final_amount
+        events.publish("invoice_status_changed", self, status)
+    
+    def mark_paid(self):
+        """
+        Set the payment status to "Paid" unless it already is.
+        
+        Returns:
+            bool: True if this call marked the invoice paid
+        """
+        with _payment_status_lock:
+            if self._payment_status == "Paid":
+                return False
+            self._payment_status = "Paid"
+            self._amount_paid = self._final_amount
+        events.publish("invoice_status_changed", self, "Paid")
+        return True
+    
+    def reserve_payment(self):
+        """
+        Claim the invoice for one payment to charge, as Payment.process_payment does.
+        
+        Returns:
+            str: None if claimed, otherwise the failed payment status saying why not
+        """
+        with _payment_status_lock:
+            if self._payment_status == "Paid":
+                return "Failed - Already Paid"
+            if self in _settling:
+                return "Failed - Payment In Progress"
+            _settling.add(self)
+        return None
+    
+    def release_payment(self):
+        """Release a claim made by reserve_payment."""
+        with _payment_status_lock:
+            _settling.discard(self)
     
     def apply_discount(self, discount_percent):
         """Apply a discount to the invoice."""
@@ -170,13 +324,35 @@ class Invoice:
         discount_amount = (self._total_amount * discount_percent) / 100
         self._final_amount = self._total_amount - discount_amount
     
+    def update_amounts(self, total_amount, discount_percent):
+        """
+        Replace the total amount and discount, keeping the ID.
+        
+        A paid invoice whose final amount goes up above the amount paid
+        becomes "Partially Paid"; get_balance_due gives the difference.
+        """
+        if discount_percent < 0 or discount_percent > 100:
+            raise ValueError("Discount must be between 0 and 100 percent")
+        
+        self._total_amount = total_amount
+        self._discount_applied = 0
+        self._final_amount = total_amount
+        if discount_percent:
+            self.apply_discount(discount_percent)
+        with _payment_status_lock:
+            reopened = self._payment_status == "Paid" and self._final_amount > self._amount_paid
+            if reopened:
+                self._payment_status = "Partially Paid"
+        if reopened:
+            events.publish("invoice_status_changed", self, "Partially Paid")
+    
     def calculate_total(self):
         """Calculate the final amount to pay."""
         return self._final_amount
     
     def __str__(self):
         """Return a string representation of the invoice."""
-        return (f"Invoice: {self._invoice_id} | "
+        return (f"Invoice: {self.get_invoice_id()} | "
                 f"Booking: {self._booking_id} | "
                 f"Total: ${self._total_amount:.2f} | "
                 f"Discount: {self._discount_applied}% | "
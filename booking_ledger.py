@@ -0,0 +1,156 @@
+"""
+This module contains the BookingLedger class for the Royal Stay Hotel Management System.
+"""
+
+import threading
+from itertools import islice
+
+import events
+
+
+def _iter_newest_first(bookings):
+    """Yield from a list newest first, ignoring entries appended meanwhile."""
+    for index in range(len(bookings) - 1, -1, -1):
+        yield bookings[index]
+
+
+class BookingLedger:
+    """
+    Hotel-wide index of bookings by guest, room, check-in and check-out date.
+
+    The ledger subscribes to the events module, so bookings made with
+    Guest.create_booking are added as they are created. Cancellations and
+    status changes keep the per-status counts current. History queries
+    are generators over the index lists and only build the page asked for.
+    Call close() to stop listening.
+    """
+
+    def __init__(self, bookings=()):
+        """Initialize a new BookingLedger holding bookings."""
+        self._lock = threading.Lock()  # Guards every index
+        self._bookings = {}  # Booking ID -> Booking
+        self._by_guest = {}  # Guest ID -> bookings in creation order
+        self._by_room = {}  # Room number -> bookings in creation order
+        self._by_check_in = {}  # Check-in day ordinal -> bookings
+        self._by_check_out = {}  # Check-out day ordinal -> bookings
+        self._statuses = {}  # Booking ID -> status last seen
+        self._status_counts = {}  # Status -> number of bookings
+        for booking in bookings:
+            self.add_booking(booking)
+        events.subscribe(self._on_event)
+
+    def close(self):
+        """Stop following booking changes."""
+        events.unsubscribe(self._on_event)
+
+    def add_booking(self, booking):
+        """Add a booking to every index. Adding a booking twice has no effect."""
+        booking_id = booking.get_booking_id()
+        with self._lock:
+            if booking_id in self._bookings:
+                return
+            self._bookings[booking_id] = booking
+            self._by_guest.setdefault(booking.get_guest().get_guest_id(), []).append(booking)
+            self._by_room.setdefault(booking.get_room().get_room_number(), []).append(booking)
+            self._by_check_in.setdefault(booking.get_check_in().toordinal(), []).append(booking)
+            self._by_check_out.setdefault(booking.get_check_out().toordinal(), []).append(booking)
+            self._set_status(booking_id, booking.get_status())
+
+    def _set_status(self, booking_id, status):
+        """Move a booking to a new status count. Caller holds the lock."""
+        old_status = self._statuses.get(booking_id)
+        if old_status == status:
+            return
+        if old_status is not None:
+            self._status_counts[old_status] -= 1
+        self._statuses[booking_id] = status
+        self._status_counts[status] = self._status_counts.get(status, 0) + 1
+
+    def get_booking(self, booking_id):
+        """Get a booking by ID, or None."""
+        return self._bookings.get(booking_id)
+
+    def count_by_status(self):
+        """Get the number of bookings with each status."""
+        with self._lock:
+            return {status: count for status, count in self._status_counts.items() if count}
+
+    def count_guest_bookings(self, guest_id):
+        """Get the number of bookings a guest has made."""
+        return len(self._by_guest.get(guest_id, ()))
+
+    def iter_guest_history(self, guest_id, status=None):
+        """Iterate over a guest's bookings newest first, optionally only those with a status."""
+        return self._iter(self._by_guest.get(guest_id, []), status)
+
+    def iter_room_history(self, room_number, status=None):
+        """Iterate over a room's bookings newest first, optionally only those with a status."""
+        return self._iter(self._by_room.get(room_number, []), status)
+
+    @staticmethod
+    def _iter(bookings, status):
+        """Iterate over an index list newest first, filtered by status."""
+        newest_first = _iter_newest_first(bookings)
+        if status is None:
+            return newest_first
+        return (booking for booking in newest_first if booking.get_status() == status)
+
+    def get_guest_history(self, guest_id, page=0, page_size=20, status=None):
+        """
+        Get one page of a guest's bookings, newest first.
+
+        Returns:
+            list: At most page_size bookings
+        """
+        return self._page(self.iter_guest_history(guest_id, status), page, page_size)
+
+    def get_room_history(self, room_number, page=0, page_size=20, status=None):
+        """
+        Get one page of a room's bookings, newest first.
+
+        Returns:
+            list: At most page_size bookings
+        """
+        return self._page(self.iter_room_history(room_number, status), page, page_size)
+
+    @staticmethod
+    def _page(bookings, page, page_size):
+        """Materialize one page of an iterator."""
+        if page < 0 or page_size <= 0:
+            raise ValueError("Page must not be negative and page size must be positive")
+        start = page * page_size
+        return list(islice(bookings, start, start + page_size))
+
+    def get_arrivals(self, day, include_cancelled=False):
+        """Get the bookings checking in on a day."""
+        return self._on_day(self._by_check_in, day, include_cancelled)
+
+    def get_departures(self, day, include_cancelled=False):
+        """Get the bookings checking out on a day."""
+        return self._on_day(self._by_check_out, day, include_cancelled)
+
+    @staticmethod
+    def _on_day(index, day, include_cancelled):
+        """Get the bookings of a date index on a day, skipping cancelled ones unless asked."""
+        bookings = index.get(day.toordinal(), [])
+        if include_cancelled:
+            return list(bookings)
+        return [booking for booking in bookings if booking.get_status() != "Cancelled"]
+
+    def _on_event(self, event, *args):
+        """Keep the indexes in step with booking changes."""
+        if event == "booking_created":
+            self.add_booking(args[0])
+        elif event in ("booking_cancelled", "booking_status_changed"):
+            booking = args[0]
+            with self._lock:
+                if self._bookings.get(booking.get_booking_id()) is booking:
+                    self._set_status(booking.get_booking_id(), booking.get_status())
+
+    def __len__(self):
+        """Return the number of bookings in the ledger."""
+        return len(self._bookings)
+
+    def __str__(self):
+        """Return a string representation of the ledger."""
+        return f"Booking ledger: {len(self)} bookings"
@@ -0,0 +1,50 @@
+"""
+This module contains the state change event hooks for the Royal Stay Hotel Management System.
+
+Model classes publish an event after every state change they make, for
+example "booking_created" with the new Booking. Subscribers such as the
+persistence layer receive (event, *args) synchronously on the thread
+that made the change. Code that rebuilds existing state, such as
+recovery from storage, runs inside suppressed() so its changes are not
+published as new ones.
+"""
+
+import contextlib
+import threading
+
+_subscribers = ()  # Replaced rather than mutated so publish never needs a lock
+_lock = threading.Lock()
+_local = threading.local()  # suppressed() depth of the current thread
+
+
+def subscribe(callback):
+    """Register a callback(event, *args) for every published event."""
+    global _subscribers
+    with _lock:
+        if callback not in _subscribers:
+            _subscribers = _subscribers + (callback,)
+
+
+def unsubscribe(callback):
+    """Unregister a previously subscribed callback."""
+    global _subscribers
+    with _lock:
+        _subscribers = tuple(s for s in _subscribers if s != callback)
+
+
+@contextlib.contextmanager
+def suppressed():
+    """Drop every event the current thread publishes inside the with block."""
+    _local.depth = getattr(_local, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _local.depth -= 1
+
+
+def publish(event, *args):
+    """Deliver an event to every subscriber, unless the current thread has suppressed events."""
+    if getattr(_local, "depth", 0):
+        return
+    for callback in _subscribers:
+        callback(event, *args)
@@ -0,0 +1,185 @@
+"""
+This module contains the streaming export functions for the Royal Stay Hotel Management System.
+
+Bookings, invoices and payments are written as CSV, JSON Lines or
+plain text (receipts for payments) one record at a time, so an export
+of any size holds only the current record and the output buffers.
+"""
+
+import csv
+import gzip
+import io
+import json
+import math
+from json.encoder import encode_basestring
+
+_BUFFER_SIZE = 1 << 20  # Bytes buffered before each write to disk
+_GZIP_LEVEL = 6  # Close to the smallest output at a fraction of level 9's time
+
+BOOKING_COLUMNS = ("booking_id", "guest_id", "guest_name", "room_number", "check_in", "check_out", "status")
+INVOICE_COLUMNS = ("invoice_id", "booking_id", "total_amount", "discount_applied", "final_amount",
+                   "payment_status")
+PAYMENT_COLUMNS = ("payment_id", "invoice_id", "amount", "payment_method", "timestamp", "status")
+
+FORMATS = ("csv", "jsonl", "text")
+
+
+def booking_row(booking):
+    """Get the export fields of a booking, in BOOKING_COLUMNS order."""
+    guest = booking.get_guest()
+    # The first ten characters of isoformat are the date, for dates and datetimes alike
+    return (booking.get_booking_id(), guest.get_guest_id(), guest.get_name(),
+            booking.get_room().get_room_number(), booking.get_check_in().isoformat()[:10],
+            booking.get_check_out().isoformat()[:10], booking.get_status())
+
+
+def invoice_row(invoice):
+    """Get the export fields of an invoice, in INVOICE_COLUMNS order."""
+    return (invoice.get_invoice_id(), invoice.get_booking_id(), invoice.get_total_amount(),
+            invoice.get_discount_applied(), invoice.get_final_amount(), invoice.get_payment_status())
+
+
+def payment_row(payment):
+    """Get the export fields of a payment, in PAYMENT_COLUMNS order."""
+    return (payment.get_payment_id(), payment.get_invoice().get_invoice_id(), payment.get_amount(),
+            payment.get_payment_method(), payment.get_timestamp().isoformat(" ", "seconds"),
+            payment.get_status())
+
+
+# Same text as Booking.__str__, filled from booking_row without two strftime calls per booking
+_BOOKING_TEXT = "Booking #{0} | Guest: {2} | Room: {3} | Check-in: {4} | Check-out: {5} | Status: {6}"
+
+
+def _booking_text(booking):
+    """Get the text of a booking, as str(booking) gives it."""
+    return _BOOKING_TEXT.format(*booking_row(booking))
+
+
+def _receipt(payment):
+    """Get the receipt text of a payment."""
+    return payment.generate_receipt()
+
+
+# Record kind -> (columns, row function, text function)
+_KINDS = {
+    "bookings": (BOOKING_COLUMNS, booking_row, _booking_text),
+    "invoices": (INVOICE_COLUMNS, invoice_row, str),
+    "payments": (PAYMENT_COLUMNS, payment_row, _receipt),
+}
+
+
+def _kind(kind):
+    """Get the columns and formatters of a record kind."""
+    try:
+        return _KINDS[kind]
+    except KeyError:
+        raise ValueError(f"Unknown record kind: {kind}") from None
+
+
+def iter_rows(records, kind):
+    """
+    Iterate over the export rows of records of a kind ("bookings", "invoices" or "payments").
+
+    Yields:
+        tuple: Field values in the kind's column order
+    """
+    _, row, _ = _kind(kind)
+    return map(row, records)
+
+
+def iter_jsonl(records, kind):
+    """
+    Iterate over records of a kind as JSON Lines.
+
+    Yields:
+        str: One JSON object per record, ending in a newline
+
+    Raises:
+        ValueError: If a record has a NaN or infinite amount
+    """
+    columns, row, _ = _kind(kind)
+    # One format call per record with the keys already in place, instead of building
+    # and encoding a dict; about twice as fast
+    template = "{{" + ",".join(f"{encode_basestring(column)}:{{}}" for column in columns) + "}}\n"
+    for record in records:
+        yield template.format(*[encode_basestring(value) if type(value) is str
+                                else value if type(value) is int
+                                else _json_float(value) if type(value) is float
+                                else json.dumps(value, allow_nan=False)
+                                for value in row(record)])
+
+
+def _json_float(value):
+    """Encode a float as JSON, which has no NaN or infinity."""
+    if not math.isfinite(value):
+        raise ValueError(f"Cannot export non-finite number: {value}")
+    return float.__repr__(value)
+
+
+def iter_text(records, kind, separator="\n\n"):
+    """
+    Iterate over records of a kind as text: receipts for payments, str() otherwise.
+
+    Yields:
+        str: One record followed by separator
+    """
+    _, _, text = _kind(kind)
+    for record in records:
+        yield text(record) + separator
+
+
+def open_export(path, compress=None):
+    """
+    Open a text file for export with a large write buffer.
+
+    Returns:
+        file: Writable text file, gzip-compressed if compress is True or,
+        when compress is None, if path ends in ".gz"
+    """
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        raw = gzip.open(path, "wb", compresslevel=_GZIP_LEVEL)
+        return io.TextIOWrapper(io.BufferedWriter(raw, _BUFFER_SIZE), encoding="utf-8", newline="")
+    return open(path, "w", buffering=_BUFFER_SIZE, encoding="utf-8", newline="")
+
+
+def write_records(output, records, kind, fmt="csv"):
+    """
+    Write records of a kind to an open text file.
+
+    Returns:
+        int: Number of records written
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    columns, row, _ = _kind(kind)
+    count = 0
+
+    def counted(items):
+        """Pass items through, keeping count of how many were taken."""
+        nonlocal count
+        for count, item in enumerate(items, 1):
+            yield item
+
+    records = counted(records)
+    if fmt == "csv":
+        writer = csv.writer(output)
+        writer.writerow(columns)
+        writer.writerows(map(row, records))
+    elif fmt == "jsonl":
+        output.writelines(iter_jsonl(records, kind))
+    else:
+        output.writelines(iter_text(records, kind))
+    return count
+
+
+def export(records, kind, path, fmt="csv", compress=None):
+    """
+    Stream records of a kind to a file.
+
+    Returns:
+        int: Number of records written
+    """
+    with open_export(path, compress) as output:
+        return write_records(output, records, kind, fmt)
@@ -0,0 +1,194 @@
+"""
+This module contains the FeedbackAnalytics class for the Royal Stay Hotel Management System.
+"""
+
+import heapq
+import threading
+from datetime import datetime, timedelta
+
+import events
+
+
+def _loyalty_level(guest):
+    """Get a guest's membership level, or their loyalty status if not enrolled."""
+    loyalty_program = guest.get_loyalty_program()
+    if loyalty_program is None:
+        return guest.get_loyalty_status()
+    return loyalty_program.get_membership_level()
+
+
+class _RatingAggregate:
+    """Running count, sum and whole-star histogram of ratings."""
+
+    __slots__ = ("count", "total", "stars")
+
+    def __init__(self):
+        """Initialize an empty aggregate."""
+        self.count = 0
+        self.total = 0
+        self.stars = [0] * 5  # Ratings of 1 to 5 stars
+
+    def add(self, rating, star, sign):
+        """Add a rating in histogram slot star, or remove it with sign=-1."""
+        self.count += sign
+        self.total += sign * rating
+        self.stars[star] += sign
+
+    def to_dict(self):
+        """Get the aggregate as count, mean and histogram."""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "histogram": {stars: count for stars, count in enumerate(self.stars, 1)},
+        }
+
+
+class FeedbackAnalytics:
+    """
+    Running rating statistics per room, room type and loyalty level.
+
+    The engine subscribes to the events module, so new Feedback and
+    Feedback.set_rating update it in constant time and reports never
+    rescan history. Each statistic is kept both for all time and for a
+    sliding window of recent feedback. The window is made of buckets of
+    bucket_width; when a bucket falls out of the window its totals are
+    subtracted, so the window moves in steps of bucket_width. Feedback
+    is filed under the guest's loyalty level at submission time. Call
+    close() to stop listening.
+    """
+
+    def __init__(self, feedbacks=(), window=timedelta(days=7), bucket_width=timedelta(hours=1)):
+        """Initialize a new FeedbackAnalytics instance holding feedbacks."""
+        if window <= timedelta(0) or bucket_width <= timedelta(0):
+            raise ValueError("Window and bucket width must be positive")
+        self._bucket_seconds = bucket_width.total_seconds()
+        self._window_buckets = max(int(window / bucket_width), 1)
+        self._lock = threading.Lock()  # Guards every aggregate
+        self._entries = {}  # Feedback -> (keys, rating, bucket)
+        self._all_time = {}  # Key -> _RatingAggregate
+        self._windowed = {}  # Key -> _RatingAggregate over the live buckets
+        self._buckets = {}  # Bucket number -> {key: _RatingAggregate}
+        self._bucket_heap = []  # Live bucket numbers, oldest first
+        self._latest_bucket = None  # Newest bucket the window has moved to
+        for feedback in feedbacks:
+            self.add_feedback(feedback)
+        events.subscribe(self._on_event)
+
+    def close(self):
+        """Stop following feedback changes."""
+        events.unsubscribe(self._on_event)
+
+    def _bucket(self, when):
+        """Get the bucket number of a time."""
+        return int(when.timestamp() // self._bucket_seconds)
+
+    def _advance(self, bucket):
+        """Move the window so it ends at bucket, evicting older buckets. Caller holds the lock."""
+        if self._latest_bucket is not None and bucket <= self._latest_bucket:
+            return
+        self._latest_bucket = bucket
+        oldest = bucket - self._window_buckets + 1
+        while self._bucket_heap and self._bucket_heap[0] < oldest:
+            for key, aggregate in self._buckets.pop(heapq.heappop(self._bucket_heap)).items():
+                windowed = self._windowed[key]
+                windowed.count -= aggregate.count
+                windowed.total -= aggregate.total
+                windowed.stars = [mine - theirs for mine, theirs in zip(windowed.stars, aggregate.stars)]
+
+    def _update(self, keys, rating, bucket, sign):
+        """Add or remove a rating under every key. Caller holds the lock."""
+        star = 0 if rating < 1 else 4 if rating >= 5 else int(rating) - 1
+        for key in keys:
+            aggregate = self._all_time.get(key)
+            if aggregate is None:
+                aggregate = self._all_time[key] = _RatingAggregate()
+            aggregate.add(rating, star, sign)
+        window = self._buckets.get(bucket)
+        if window is None:
+            if bucket <= self._latest_bucket - self._window_buckets:
+                return  # Already outside the window
+            window = self._buckets[bucket] = {}
+            heapq.heappush(self._bucket_heap, bucket)
+        for key in keys:
+            aggregate = window.get(key)
+            if aggregate is None:
+                aggregate = window[key] = _RatingAggregate()
+            aggregate.add(rating, star, sign)
+            windowed = self._windowed.get(key)
+            if windowed is None:
+                windowed = self._windowed[key] = _RatingAggregate()
+            windowed.add(rating, star, sign)
+
+    def add_feedback(self, feedback):
+        """Add a feedback's rating. Adding a feedback twice has no effect."""
+        room = feedback.get_booking().get_room()
+        keys = (None, ("room", room.get_room_number()), ("room_type", room.get_room_type()),
+                ("level", _loyalty_level(feedback.get_guest())))
+        bucket = self._bucket(feedback.get_submission_time())
+        with self._lock:
+            if feedback in self._entries:
+                return
+            self._advance(bucket)
+            rating = feedback.get_rating()
+            self._entries[feedback] = (keys, rating, bucket)
+            self._update(keys, rating, bucket, 1)
+
+    def _change_rating(self, feedback):
+        """Replace the rating counted for a feedback."""
+        with self._lock:
+            entry = self._entries.get(feedback)
+            if entry is None:
+                return
+            keys, old_rating, bucket = entry
+            rating = feedback.get_rating()
+            self._update(keys, old_rating, bucket, -1)
+            self._update(keys, rating, bucket, 1)
+            self._entries[feedback] = (keys, rating, bucket)
+
+    def _stats(self, key, windowed, as_of):
+        """Get the statistics under a key."""
+        with self._lock:
+            if windowed:
+                self._advance(self._bucket(as_of or datetime.now()))
+            aggregate = (self._windowed if windowed else self._all_time).get(key)
+            return (aggregate or _RatingAggregate()).to_dict()
+
+    def get_overall_stats(self, windowed=False, as_of=None):
+        """
+        Get rating statistics over all feedback.
+
+        With windowed=True only feedback in the window ending at as_of
+        (default now) is counted. The window never moves back in time.
+
+        Returns:
+            dict: count, mean and histogram (stars -> count)
+        """
+        return self._stats(None, windowed, as_of)
+
+    def get_room_stats(self, room_number, windowed=False, as_of=None):
+        """Get rating statistics for a room, as in get_overall_stats."""
+        return self._stats(("room", room_number), windowed, as_of)
+
+    def get_room_type_stats(self, room_type, windowed=False, as_of=None):
+        """Get rating statistics for a room type, as in get_overall_stats."""
+        return self._stats(("room_type", room_type), windowed, as_of)
+
+    def get_level_stats(self, level, windowed=False, as_of=None):
+        """Get rating statistics for a loyalty level, as in get_overall_stats."""
+        return self._stats(("level", level), windowed, as_of)
+
+    def _on_event(self, event, *args):
+        """Keep the aggregates in step with feedback changes."""
+        if event == "feedback_submitted":
+            self.add_feedback(args[0])
+        elif event == "feedback_rating_changed":
+            self._change_rating(args[0])
+
+    def __len__(self):
+        """Return the number of feedbacks counted."""
+        return len(self._entries)
+
+    def __str__(self):
+        """Return a string representation of the analytics engine."""
+        overall = self.get_overall_stats()
+        return f"Feedback analytics: {overall['count']} ratings | Mean: {overall['mean']:.2f}"
@@ -0,0 +1,295 @@
+"""
+This module contains the FeedbackIndex class for the Royal Stay Hotel Management System.
+"""
+
+import heapq
+import math
+import os
+import pickle
+import re
+import threading
+import zlib
+
+import events
+
+_TOKEN = re.compile(r"\w+")
+_QUERY_PART = re.compile(r'-?"[^"]*"?|\S+')
+_FORMAT_VERSION = 2
+
+# BM25 parameters: term frequency saturation and document length normalization
+_K1 = 1.2
+_B = 0.75
+
+
+def tokenize(text):
+    """Split text into lowercase word tokens."""
+    return _TOKEN.findall(text.casefold())
+
+
+def _checksum(comments):
+    """Get a checksum of comments, saved with the index to detect feedback that changed."""
+    return zlib.crc32(comments.encode("utf-8"))
+
+
+def _parse_query(query):
+    """
+    Parse a query into OR-separated groups of clauses.
+
+    Words and quoted phrases in a group must all match; OR starts a new
+    group. A clause prefixed with - or NOT must not match. A word that
+    tokenizes into several tokens, such as "wi-fi", is a phrase.
+
+    Returns:
+        list: Groups of (terms, negated) clauses
+    """
+    groups = [[]]
+    negate = False
+    for part in _QUERY_PART.findall(query):
+        if part == "OR":
+            groups.append([])
+            continue
+        if part in ("AND", "NOT"):
+            negate = negate or part == "NOT"
+            continue
+        if part.startswith("-") and len(part) > 1:
+            negate, part = True, part[1:]
+        terms = tokenize(part)
+        if terms:
+            groups[-1].append((terms, negate))
+        negate = False
+    groups = [group for group in groups if group]
+    if not groups:
+        raise ValueError("Query has no search terms")
+    for group in groups:
+        if all(negated for _, negated in group):
+            raise ValueError("Every part of a query needs at least one term that is not negated")
+    return groups
+
+
+class FeedbackIndex:
+    """
+    Inverted index over feedback comments with BM25 ranking.
+
+    Each term maps to the feedbacks containing it and the token positions
+    where it occurs, so queries touch only the postings of their terms and
+    phrases are matched by position. The index subscribes to the events
+    module: new Feedback is indexed as it is created and set_comments
+    reindexes just that feedback. save() and load() store the postings so
+    a large index does not have to be tokenized again; feedback is matched
+    by ID, so recreate it with Feedback.restore. Call close() to stop
+    listening.
+    """
+
+    def __init__(self, feedbacks=()):
+        """Initialize a new FeedbackIndex holding feedbacks."""
+        self._lock = threading.Lock()  # Guards the postings and document table
+        self._postings = {}  # Term -> {document number: token positions}
+        self._feedbacks = []  # Document number -> Feedback, or None once removed
+        self._documents = {}  # Feedback -> document number
+        self._lengths = []  # Document number -> number of tokens
+        self._total_length = 0
+        for feedback in feedbacks:
+            self.add_feedback(feedback)
+        events.subscribe(self._on_event)
+
+    def close(self):
+        """Stop following feedback changes."""
+        events.unsubscribe(self._on_event)
+
+    def _index(self, document, comments):
+        """Add a document's tokens to the postings. Caller holds the lock."""
+        positions = {}
+        tokens = tokenize(comments)
+        for position, term in enumerate(tokens):
+            positions.setdefault(term, []).append(position)
+        for term, term_positions in positions.items():
+            self._postings.setdefault(term, {})[document] = tuple(term_positions)
+        self._lengths[document] = len(tokens)
+        self._total_length += len(tokens)
+
+    def _unindex(self, document, comments):
+        """Remove a document's tokens from the postings. Caller holds the lock."""
+        for term in set(tokenize(comments)):
+            documents = self._postings.get(term)
+            if documents is not None and documents.pop(document, None) is not None and not documents:
+                del self._postings[term]
+        self._total_length -= self._lengths[document]
+        self._lengths[document] = 0
+
+    def add_feedback(self, feedback):
+        """Index a feedback's comments. Adding a feedback twice has no effect."""
+        with self._lock:
+            if feedback in self._documents:
+                return
+            document = self._documents[feedback] = len(self._feedbacks)
+            self._feedbacks.append(feedback)
+            self._lengths.append(0)
+            self._index(document, feedback.get_comments())
+
+    def remove_feedback(self, feedback):
+        """Remove a feedback from the index."""
+        with self._lock:
+            document = self._documents.pop(feedback, None)
+            if document is not None:
+                self._unindex(document, feedback.get_comments())
+                self._feedbacks[document] = None
+
+    def _reindex(self, feedback, old_comments):
+        """Replace the indexed comments of a feedback."""
+        with self._lock:
+            document = self._documents.get(feedback)
+            if document is not None:
+                self._unindex(document, old_comments)
+                self._index(document, feedback.get_comments())
+
+    def _matches(self, terms):
+        """Get the documents containing a term or phrase. Caller holds the lock."""
+        postings = [self._postings.get(term) for term in terms]
+        if not all(postings):
+            return set()
+        rarest = min(postings, key=len)
+        documents = set(rarest)
+        for documents_with_term in postings:
+            if documents_with_term is not rarest:
+                documents.intersection_update(documents_with_term)
+        if len(terms) == 1:
+            return documents
+        # Keep documents where the terms appear one after another
+        return {document for document in documents
+                if any(all(start + offset in postings[offset][document] for offset in range(1, len(terms)))
+                       for start in postings[0][document])}
+
+    def _evaluate(self, group):
+        """Get the documents matching every clause of a group. Caller holds the lock."""
+        positive = sorted((self._matches(terms) for terms, negated in group if not negated), key=len)
+        documents = positive[0]
+        for matches in positive[1:]:
+            documents &= matches
+        for terms, negated in group:
+            if negated and documents:
+                documents -= self._matches(terms)
+        return documents
+
+    def search(self, query, limit=10, min_rating=None, max_rating=None):
+        """
+        Find the feedback best matching a query.
+
+        Words must all appear, "quoted phrases" must appear in order, OR
+        separates alternatives and -word or NOT word excludes. Results are
+        ranked by BM25 over the query's non-negated terms.
+
+        Returns:
+            list: Up to limit (Feedback, score) tuples, best first
+        """
+        groups = _parse_query(query)
+        terms = {term for group in groups for clause_terms, negated in group if not negated
+                 for term in clause_terms}
+        with self._lock:
+            documents = set()
+            for group in groups:
+                documents |= self._evaluate(group)
+            feedbacks = self._feedbacks
+            if min_rating is not None or max_rating is not None:
+                low = -math.inf if min_rating is None else min_rating
+                high = math.inf if max_rating is None else max_rating
+                documents = [document for document in documents
+                             if low <= feedbacks[document].get_rating() <= high]
+            scores = dict.fromkeys(documents, 0.0)
+            live = len(self._documents)
+            average_length = self._total_length / live if live else 0.0
+            lengths = self._lengths
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (live - len(postings) + 0.5) / (len(postings) + 0.5))
+                # Walk whichever of the candidates and the postings is smaller
+                if len(postings) < len(scores):
+                    pairs = ((document, positions) for document, positions in postings.items()
+                             if document in scores)
+                else:
+                    pairs = ((document, postings[document]) for document in scores if document in postings)
+                for document, positions in pairs:
+                    frequency = len(positions)
+                    norm = _K1 * (1 - _B + _B * lengths[document] / average_length)
+                    scores[document] += idf * frequency * (_K1 + 1) / (frequency + norm)
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+            return [(feedbacks[document], score) for document, score in best]
+
+    def save(self, path):
+        """Write the index to a file, replacing it atomically."""
+        with self._lock:
+            state = {
+                "version": _FORMAT_VERSION,
+                "feedback_ids": [None if feedback is None else feedback.get_feedback_id()
+                                 for feedback in self._feedbacks],
+                "checksums": [None if feedback is None else _checksum(feedback.get_comments())
+                              for feedback in self._feedbacks],
+                "lengths": self._lengths,
+                "postings": self._postings,
+            }
+            with open(path + ".tmp", "wb") as index_file:
+                pickle.dump(state, index_file, pickle.HIGHEST_PROTOCOL)
+                index_file.flush()
+                os.fsync(index_file.fileno())
+        os.replace(path + ".tmp", path)
+
+    @classmethod
+    def load(cls, path, feedbacks):
+        """
+        Load an index saved with save().
+
+        The feedbacks must be the ones indexed when it was saved, with the
+        same IDs (see Feedback.restore) and comments; indexed feedback not
+        among them is dropped.
+
+        Returns:
+            FeedbackIndex: The loaded index, following feedback changes
+
+        Raises:
+            ValueError: If a feedback's comments differ from the saved ones
+        """
+        with open(path, "rb") as index_file:
+            state = pickle.load(index_file)
+        if state.get("version") != _FORMAT_VERSION:
+            raise ValueError(f"Unsupported feedback index version: {state.get('version')}")
+        by_id = {feedback.get_feedback_id(): feedback for feedback in feedbacks}
+        index = cls()
+        with index._lock:
+            index._postings = state["postings"]
+            index._lengths = state["lengths"]
+            index._feedbacks = [by_id.get(feedback_id) for feedback_id in state["feedback_ids"]]
+            missing = set()
+            for document, feedback in enumerate(index._feedbacks):
+                if feedback is not None:
+                    if _checksum(feedback.get_comments()) != state["checksums"][document]:
+                        index.close()
+                        raise ValueError(f"Comments of {feedback.get_feedback_id()} differ from the saved index")
+                    index._documents[feedback] = document
+                elif index._lengths[document]:
+                    missing.add(document)
+                    index._lengths[document] = 0
+            index._total_length = sum(index._lengths)
+            if missing:
+                # Drop the postings of saved feedback that was not supplied in one pass
+                for term, documents in list(index._postings.items()):
+                    for document in missing.intersection(documents):
+                        del documents[document]
+                    if not documents:
+                        del index._postings[term]
+        return index
+
+    def _on_event(self, event, *args):
+        """Keep the index in step with feedback changes."""
+        if event == "feedback_submitted":
+            self.add_feedback(args[0])
+        elif event == "feedback_comments_changed":
+            self._reindex(*args)
+
+    def __len__(self):
+        """Return the number of indexed feedbacks."""
+        return len(self._documents)
+
+    def __str__(self):
+        """Return a string representation of the index."""
+        return f"Feedback index: {len(self)} feedbacks | Terms: {len(self._postings)}"
@@ -2,10 +2,21 @@
 This module contains the Guest and LoyaltyProgram classes for the Royal Stay Hotel Management System.
 """
 
+import threading
+
+import events
+import ids
+from room import booking_change
+
+# Loyalty discount percentages by membership level, applied by invoices and quotes
+LOYALTY_DISCOUNTS = {"Silver": 5, "Gold": 10}
+
 class Guest:
     """
     Guest class representing a hotel guest.
     """
+    __slots__ = ("_guest_id", "_name", "_contact_info", "_email", "_loyalty_status",
+                 "_booking_history", "_loyalty_program", "_lock")
     
     def __init__(self, guest_id, name, contact_info, email):
         """Initialize a new Guest instance."""
@@ -16,6 +27,7 @@ class Guest:
         self._loyalty_status = "Regular"
         self._booking_history = []
         self._loyalty_program = None
+        self._lock = threading.Lock()  # Guards the booking history
     
     def get_guest_id(self):
         """Get the guest ID."""
@@ -25,6 +37,10 @@ class Guest:
         """Get the guest's name."""
         return self._name
     
+    def get_contact_info(self):
+        """Get the guest's contact information."""
+        return self._contact_info
+    
     def get_email(self):
         """Get the guest's email."""
         return self._email
@@ -33,7 +49,9 @@ class Guest:
         """Set a new email for the guest."""
         if "@" not in email:
             raise ValueError("Invalid email format")
+        old_email = self._email
         self._email = email
+        events.publish("guest_email_changed", self, old_email)
     
     def get_loyalty_status(self):
         """Get the guest's loyalty status."""
@@ -43,6 +61,7 @@ class Guest:
         """Enroll the guest in the loyalty program."""
         if not self._loyalty_program:
             self._loyalty_program = LoyaltyProgram(self._guest_id)
+            events.publish("loyalty_enrolled", self)
             return True
         return False
     
@@ -50,6 +69,11 @@ class Guest:
         """Get the guest's loyalty program."""
         return self._loyalty_program
     
+    def set_loyalty_program(self, loyalty_program):
+        """Attach an existing loyalty program, such as one restored from storage."""
+        self._loyalty_program = loyalty_program
+        events.publish("loyalty_enrolled", self)
+    
     def create_booking(self, room, check_in, check_out):
         """
         Create a new booking for the guest.
@@ -57,22 +81,35 @@ class Guest:
         Returns:
             Booking: New booking object if successful
         """
+        # Check and mark the nights in one step so concurrent bookings cannot both win
+        with booking_change():
+            if not room.reserve(check_in, check_out):
+                return None
+        
+        return self.record_bookings([(room, check_in, check_out)])[0]
+    
+    def record_bookings(self, stays):
+        """
+        Create bookings for (room, check_in, check_out) stays already reserved.
+        
+        Returns:
+            list: New booking objects, in the order of the stays
+        """
         # Import here to avoid circular import issues
         from booking import Booking
         
-        if room.check_availability(check_in, check_out):
-            booking = Booking(len(self._booking_history) + 1, self, room, check_in, check_out)
+        bookings = [Booking(ids.next_id("booking"), self, room, check_in, check_out)
+                    for room, check_in, check_out in stays]
+        with self._lock:
+            self._booking_history.extend(bookings)
+        for booking in bookings:
+            events.publish("booking_created", booking)
+        return bookings
+    
+    def add_booking(self, booking):
+        """Add an existing booking, such as one restored from storage, to the history."""
+        with self._lock:
             self._booking_history.append(booking)
-            
-            # Update room availability
-            current_date = check_in
-            while current_date < check_out:
-                room.set_availability(current_date, False)
-                # Move to next day
-                current_date = current_date.replace(day=current_date.day + 1)
-            
-            return booking
-        return None
     
     def view_history(self):
         """Get the guest's booking history."""
@@ -87,6 +124,7 @@ class LoyaltyProgram:
     """
     LoyaltyProgram class representing a hotel loyalty rewards program.
     """
+    __slots__ = ("_guest_id", "_points_balance", "_membership_level")
     
     def __init__(self, guest_id):
         """Initialize a new LoyaltyProgram instance."""
@@ -94,6 +132,10 @@ class LoyaltyProgram:
         self._points_balance = 0
         self._membership_level = "Bronze"
     
+    def get_guest_id(self):
+        """Get the ID of the member guest."""
+        return self._guest_id
+    
     def get_points_balance(self):
         """Get the current points balance."""
         return self._points_balance
@@ -120,14 +162,23 @@ class LoyaltyProgram:
         self._points_balance -= points
         return discount
     
+    def set_points_balance(self, points, update_level=True):
+        """Set the points balance, such as one kept by a LoyaltyLedger."""
+        self._points_balance = points
+        if update_level:
+            self._update_membership_level()
+    
     def _update_membership_level(self):
         """Update membership level based on points."""
+        old_level = self._membership_level
         if self._points_balance >= 5000:
             self._membership_level = "Gold"
         elif self._points_balance >= 1000:
             self._membership_level = "Silver"
         else:
             self._membership_level = "Bronze"
+        if self._membership_level != old_level:
+            events.publish("loyalty_level_changed", self, old_level)
     
     def __str__(self):
         """Return a string representation of the loyalty program."""
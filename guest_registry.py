@@ -0,0 +1,263 @@
+"""
+This module contains the GuestRegistry class for the Royal Stay Hotel Management System.
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+
+import events
+
+_BLOCK_SIZE = 1024  # Entries per block of the name index; blocks split at twice this
+
+
+def normalize_email(email):
+    """Normalize an email address for lookups."""
+    return email.strip().lower()
+
+
+def normalize_name(name):
+    """Normalize a name or name prefix for lookups."""
+    return " ".join(name.casefold().split())
+
+
+class _NameIndex:
+    """
+    Sorted (normalized name, guest ID) pairs kept in blocks.
+
+    Inserting or removing touches a single block of at most a few
+    thousand entries, so the cost does not grow with the number of
+    guests the way a single sorted list would.
+    """
+
+    def __init__(self, entries=()):
+        """Initialize the index from (name, guest ID) pairs in any order."""
+        self._blocks = []
+        self._maxes = []  # Last entry of each block
+        self.update(entries)
+
+    def add(self, entry):
+        """Insert a (name, guest ID) pair."""
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._maxes.append(entry)
+            return
+        position = min(bisect_left(self._maxes, entry), len(self._blocks) - 1)
+        block = self._blocks[position]
+        insort(block, entry)
+        self._maxes[position] = block[-1]
+        if len(block) > 2 * _BLOCK_SIZE:
+            self._blocks[position:position + 1] = [block[:_BLOCK_SIZE], block[_BLOCK_SIZE:]]
+            self._maxes[position:position + 1] = [block[_BLOCK_SIZE - 1], block[-1]]
+
+    def update(self, entries):
+        """
+        Insert many (name, guest ID) pairs in any order.
+
+        The sorted batch is merged into the blocks it falls in; blocks it
+        does not touch are kept as they are, so the cost follows the size
+        of the batch and of the blocks it lands in, not of the whole index.
+        """
+        entries = sorted(entries)
+        if not entries:
+            return
+        blocks, maxes = [], []
+        start = 0
+        last = max(len(self._blocks) - 1, 0)
+        for position, block in enumerate(self._blocks or [[]]):
+            # Entries up to a block's last entry go in that block, as in add(); the rest in the last one
+            end = len(entries) if position == last else bisect_right(entries, self._maxes[position], start)
+            if end > start:
+                block = sorted(block + entries[start:end])  # Merges two sorted runs in linear time
+                start = end
+            if len(block) > 2 * _BLOCK_SIZE:
+                for offset in range(0, len(block), _BLOCK_SIZE):
+                    blocks.append(block[offset:offset + _BLOCK_SIZE])
+                    maxes.append(blocks[-1][-1])
+            else:
+                blocks.append(block)
+                maxes.append(block[-1])
+        self._blocks = blocks
+        self._maxes = maxes
+
+    def remove(self, entry):
+        """Remove a (name, guest ID) pair if it is present."""
+        position = bisect_left(self._maxes, entry)
+        if position == len(self._blocks):
+            return
+        block = self._blocks[position]
+        index = bisect_left(block, entry)
+        if index == len(block) or block[index] != entry:
+            return
+        del block[index]
+        if block:
+            self._maxes[position] = block[-1]
+        else:
+            del self._blocks[position]
+            del self._maxes[position]
+
+    def entries(self):
+        """Get every (name, guest ID) pair in order."""
+        return [entry for block in self._blocks for entry in block]
+
+    def search(self, prefix, limit):
+        """Get up to limit guest IDs whose name starts with prefix, in name order."""
+        found = []
+        position = bisect_left(self._maxes, (prefix,))
+        index = bisect_left(self._blocks[position], (prefix,)) if position < len(self._blocks) else 0
+        while position < len(self._blocks) and len(found) < limit:
+            block = self._blocks[position]
+            end = min(len(block), index + limit - len(found))
+            for name, guest_id in block[index:end]:
+                if not name.startswith(prefix):
+                    return found
+                found.append(guest_id)
+            position += 1
+            index = 0
+        return found
+
+
+class GuestRegistry:
+    """
+    Directory of guests indexed by ID, email, name prefix and loyalty level.
+
+    The registry subscribes to the events module, so Guest.set_email,
+    loyalty enrollment and loyalty level changes update its indexes
+    automatically. Call close() to stop listening.
+    """
+
+    def __init__(self, guests=()):
+        """Initialize a new GuestRegistry holding guests."""
+        self._lock = threading.RLock()  # Guards every index
+        self._guests = {}  # Guest ID -> Guest
+        self._emails = {}  # Normalized email -> list of Guests
+        self._levels = {}  # Loyalty level -> set of guest IDs
+        self._names = _NameIndex()
+        self.add_guests(guests)
+        events.subscribe(self._on_event)
+
+    def close(self):
+        """Stop following guest changes."""
+        events.unsubscribe(self._on_event)
+
+    @staticmethod
+    def _level(guest):
+        """Get the loyalty level a guest is indexed under."""
+        loyalty_program = guest.get_loyalty_program()
+        if loyalty_program is None:
+            return guest.get_loyalty_status()
+        return loyalty_program.get_membership_level()
+
+    def _index(self, guest):
+        """Add a guest to the email and level indexes. Caller holds the lock."""
+        self._emails.setdefault(normalize_email(guest.get_email()), []).append(guest)
+        self._levels.setdefault(self._level(guest), set()).add(guest.get_guest_id())
+
+    def add_guest(self, guest):
+        """Register a guest."""
+        self.add_guests([guest])
+
+    def add_guests(self, guests):
+        """Register many guests, merging their names into the name index in one pass."""
+        with self._lock:
+            added = []
+            for guest in guests:
+                guest_id = guest.get_guest_id()
+                if guest_id in self._guests:
+                    raise ValueError(f"Guest {guest_id} already exists")
+                self._guests[guest_id] = guest
+                self._index(guest)
+                added.append((normalize_name(guest.get_name()), guest_id))
+            if len(added) > _BLOCK_SIZE:
+                # Merging into the blocks beats inserting one by one for bulk loads
+                self._names.update(added)
+            else:
+                for entry in added:
+                    self._names.add(entry)
+
+    def remove_guest(self, guest_id):
+        """
+        Remove a guest from the registry.
+
+        Returns:
+            Guest: The removed guest, or None if not registered
+        """
+        with self._lock:
+            guest = self._guests.pop(guest_id, None)
+            if guest is None:
+                return None
+            self._unindex_email(guest, guest.get_email())
+            self._levels.get(self._level(guest), set()).discard(guest_id)
+            self._names.remove((normalize_name(guest.get_name()), guest_id))
+            return guest
+
+    def _unindex_email(self, guest, email):
+        """Remove a guest from the email index under email. Caller holds the lock."""
+        key = normalize_email(email)
+        holders = self._emails.get(key, [])
+        if guest in holders:
+            holders.remove(guest)
+            if not holders:
+                del self._emails[key]
+
+    def get_guest(self, guest_id):
+        """Get a guest by ID, or None."""
+        return self._guests.get(guest_id)
+
+    def find_by_email(self, email):
+        """Get the guests registered with an email address, ignoring case."""
+        with self._lock:
+            return list(self._emails.get(normalize_email(email), ()))
+
+    def search_by_name(self, prefix, limit=10):
+        """Get up to limit guests whose name starts with prefix, ignoring case, in name order."""
+        with self._lock:
+            return [self._guests[guest_id]
+                    for guest_id in self._names.search(normalize_name(prefix), limit)]
+
+    def get_guests_by_level(self, level):
+        """Get the guests at a loyalty level, such as "Gold" or "Regular" for non-members."""
+        with self._lock:
+            return [self._guests[guest_id] for guest_id in self._levels.get(level, ())]
+
+    def count_by_level(self):
+        """Get the number of guests at each loyalty level."""
+        with self._lock:
+            return {level: len(guest_ids) for level, guest_ids in self._levels.items() if guest_ids}
+
+    def _move_level(self, guest, old_level):
+        """Reindex a guest whose loyalty level changed. Caller holds the lock."""
+        guest_id = guest.get_guest_id()
+        self._levels.get(old_level, set()).discard(guest_id)
+        self._levels.setdefault(self._level(guest), set()).add(guest_id)
+
+    def _on_event(self, event, *args):
+        """Keep the indexes in step with guest changes."""
+        if event == "guest_email_changed":
+            guest, old_email = args
+            with self._lock:
+                if self._guests.get(guest.get_guest_id()) is guest:
+                    self._unindex_email(guest, old_email)
+                    self._emails.setdefault(normalize_email(guest.get_email()), []).append(guest)
+        elif event == "loyalty_enrolled":
+            guest = args[0]
+            with self._lock:
+                if self._guests.get(guest.get_guest_id()) is guest:
+                    # Enrollment moves a guest from their loyalty status to a membership level
+                    guest_id = guest.get_guest_id()
+                    for guest_ids in self._levels.values():
+                        guest_ids.discard(guest_id)
+                    self._levels.setdefault(self._level(guest), set()).add(guest_id)
+        elif event == "loyalty_level_changed":
+            loyalty_program, old_level = args
+            with self._lock:
+                guest = self._guests.get(loyalty_program.get_guest_id())
+                if guest is not None and guest.get_loyalty_program() is loyalty_program:
+                    self._move_level(guest, old_level)
+
+    def __len__(self):
+        """Return the number of registered guests."""
+        return len(self._guests)
+
+    def __str__(self):
+        """Return a string representation of the registry."""
+        return f"Guest registry: {len(self)} guests"
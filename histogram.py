@@ -0,0 +1,97 @@
+"""
+This module contains the LatencyHistogram class for the Royal Stay Hotel Management System.
+"""
+
+import math
+
+_MIN_VALUE = 1e-6  # Smallest value told apart from zero, in seconds
+_GROWTH = 1.04  # Each bucket is 4% wider than the one before
+_BUCKETS = int(math.log(1e7 / _MIN_VALUE) / math.log(_GROWTH)) + 2  # Up to about 115 days
+_LOG_GROWTH = math.log(_GROWTH)
+
+
+def bucket_bound(bucket):
+    """Get the upper bound of a bucket."""
+    return _MIN_VALUE * _GROWTH ** bucket
+
+
+class LatencyHistogram:
+    """
+    Fixed-size histogram of durations in seconds with log-spaced buckets.
+
+    Memory does not grow with the number of values recorded. Quantiles
+    are reported as the upper bound of their bucket, which is within 4%
+    of the true value. Not thread-safe; callers hold their own lock.
+    """
+
+    __slots__ = ("_counts", "_count", "_total", "_min", "_max")
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self._counts = [0] * _BUCKETS
+        self._count = 0
+        self._total = 0.0
+        self._min = math.inf
+        self._max = 0.0
+
+    def record(self, seconds):
+        """Record one duration."""
+        if seconds <= _MIN_VALUE:
+            bucket = 0
+        else:
+            bucket = min(int(math.log(seconds / _MIN_VALUE) / _LOG_GROWTH) + 1, _BUCKETS - 1)
+        self._counts[bucket] += 1
+        self._count += 1
+        self._total += seconds
+        if seconds < self._min:
+            self._min = seconds
+        if seconds > self._max:
+            self._max = seconds
+
+    def merge(self, other):
+        """Add every value recorded in another histogram."""
+        self._counts = [mine + theirs for mine, theirs in zip(self._counts, other._counts)]
+        self._count += other._count
+        self._total += other._total
+        self._min = min(self._min, other._min)
+        self._max = max(self._max, other._max)
+
+    def get_count(self):
+        """Get the number of values recorded."""
+        return self._count
+
+    def get_total(self):
+        """Get the sum of the values recorded."""
+        return self._total
+
+    def get_mean(self):
+        """Get the mean value, or 0.0 if nothing was recorded."""
+        return self._total / self._count if self._count else 0.0
+
+    def get_max(self):
+        """Get the largest value recorded, or 0.0."""
+        return self._max
+
+    def get_quantile(self, quantile):
+        """Get the value below which a quantile (0 to 1) of the values fall, or 0.0."""
+        if not self._count:
+            return 0.0
+        rank = max(math.ceil(quantile * self._count), 1)
+        seen = 0
+        for bucket, count in enumerate(self._counts):
+            seen += count
+            if seen >= rank:
+                # Never report beyond the values actually seen
+                return min(max(bucket_bound(bucket), self._min), self._max)
+        return self._max
+
+    def iter_buckets(self):
+        """
+        Iterate over the non-empty buckets.
+
+        Yields:
+            tuple: (upper bound in seconds, count)
+        """
+        for bucket, count in enumerate(self._counts):
+            if count:
+                yield bucket_bound(bucket), count
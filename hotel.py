@@ -0,0 +1,381 @@
+"""
+This module contains the Hotel and RoomTypeIndex classes for the Royal Stay Hotel Management System.
+"""
+
+import threading
+from contextlib import ExitStack
+
+from availability import night_range
+from room import booking_change
+
+
+def _iter_slots(mask):
+    """Yield the position of every set bit in mask in ascending order."""
+    bits = format(mask, "b")[::-1]
+    slot = bits.find("1")
+    while slot >= 0:
+        yield slot
+        slot = bits.find("1", slot + 1)
+
+
+class RoomTypeIndex:
+    """
+    Index over all rooms of one room type.
+
+    Every room gets a slot number, and each attribute index is a Python
+    integer used as a bitmask over those slots. A date range search ORs
+    together the occupied masks of its nights, so the work grows with the
+    length of the stay rather than the number of rooms.
+    """
+
+    def __init__(self, room_type, price_band_width):
+        """Initialize an empty RoomTypeIndex instance."""
+        self._room_type = room_type
+        self._price_band_width = price_band_width
+        self._rooms = []  # Slot number -> Room (None once removed)
+        self._slots = {}  # Room number -> slot number
+        self._free_slots = []
+        self._all_mask = 0
+        self._occupied = {}  # Day ordinal -> mask of unavailable rooms
+        self._band_masks = {}  # Price band -> mask of rooms
+        self._amenity_masks = {}  # Amenity -> mask of rooms
+        self._lock = threading.Lock()  # Rooms of one type update the masks from many threads
+
+    def get_room_type(self):
+        """Get the indexed room type."""
+        return self._room_type
+
+    def _price_band(self, price):
+        """Get the price band of a nightly price."""
+        return int(price // self._price_band_width)
+
+    def add_room(self, room):
+        """Add a room and index its current availability."""
+        with self._lock:
+            slot = self._free_slots.pop() if self._free_slots else len(self._rooms)
+            if slot == len(self._rooms):
+                self._rooms.append(room)
+            else:
+                self._rooms[slot] = room
+            self._slots[room.get_room_number()] = slot
+            bit = 1 << slot
+            self._all_mask |= bit
+
+            band = self._price_band(room.get_price_per_night())
+            self._band_masks[band] = self._band_masks.get(band, 0) | bit
+            for amenity in room.get_amenities():
+                self._amenity_masks[amenity] = self._amenity_masks.get(amenity, 0) | bit
+            for ordinal in room.get_availability_calendar().iter_unavailable():
+                self._occupied[ordinal] = self._occupied.get(ordinal, 0) | bit
+
+    def remove_room(self, room):
+        """Remove a room and drop it from every index."""
+        with self._lock:
+            slot = self._slots.pop(room.get_room_number())
+            self._rooms[slot] = None
+            self._free_slots.append(slot)
+            keep = ~(1 << slot)
+            self._all_mask &= keep
+            for masks in (self._band_masks, self._amenity_masks, self._occupied):
+                for key in [key for key, mask in masks.items() if not mask & keep]:
+                    del masks[key]
+                for key in masks:
+                    masks[key] &= keep
+
+    def set_occupied(self, room, start, end, is_occupied):
+        """Mark a room as occupied or free for the ordinal range [start, end)."""
+        bit = 1 << self._slots[room.get_room_number()]
+        with self._lock:
+            occupied = self._occupied
+            for ordinal in range(start, end):
+                if is_occupied:
+                    occupied[ordinal] = occupied.get(ordinal, 0) | bit
+                elif ordinal in occupied:
+                    mask = occupied[ordinal] & ~bit
+                    if mask:
+                        occupied[ordinal] = mask
+                    else:
+                        del occupied[ordinal]
+
+    def move_price_band(self, room, old_price, new_price):
+        """Move a room from the price band of old_price to that of new_price."""
+        old_band, new_band = self._price_band(old_price), self._price_band(new_price)
+        if old_band == new_band:
+            return
+        bit = 1 << self._slots[room.get_room_number()]
+        with self._lock:
+            mask = self._band_masks[old_band] & ~bit
+            if mask:
+                self._band_masks[old_band] = mask
+            else:
+                del self._band_masks[old_band]
+            self._band_masks[new_band] = self._band_masks.get(new_band, 0) | bit
+
+    def candidate_mask(self, min_price=None, max_price=None, amenities=None):
+        """Get the mask of rooms in the price range that offer all amenities."""
+        with self._lock:
+            mask = self._all_mask
+            if min_price is not None or max_price is not None:
+                low = self._price_band(min_price) if min_price is not None else None
+                high = self._price_band(max_price) if max_price is not None else None
+                band_mask = 0
+                for band, rooms in self._band_masks.items():
+                    if (low is None or band >= low) and (high is None or band <= high):
+                        band_mask |= rooms
+                mask &= band_mask
+            for amenity in amenities or ():
+                mask &= self._amenity_masks.get(amenity, 0)
+            return mask
+
+    def free_mask(self, start, end, mask=None):
+        """Get the mask of rooms free for every night in [start, end)."""
+        if mask is None:
+            mask = self._all_mask
+        with self._lock:
+            occupied = self._occupied
+            if len(occupied) < end - start:
+                busy = 0
+                for ordinal, rooms in occupied.items():
+                    if start <= ordinal < end:
+                        busy |= rooms
+            else:
+                busy = 0
+                for ordinal in range(start, end):
+                    busy |= occupied.get(ordinal, 0)
+            return mask & ~busy
+
+    def rooms_for_mask(self, mask, limit=None):
+        """Get the rooms whose slots are set in mask, in slot order."""
+        rooms = []
+        for slot in _iter_slots(mask):
+            rooms.append(self._rooms[slot])
+            if limit is not None and len(rooms) >= limit:
+                break
+        return rooms
+
+    def count_free(self, start, end):
+        """Count the rooms free for every night in [start, end)."""
+        return bin(self.free_mask(start, end)).count("1")
+
+    def __len__(self):
+        """Return the number of indexed rooms."""
+        return len(self._slots)
+
+
+class Hotel:
+    """
+    Hotel class holding the room inventory and its search indexes.
+    """
+
+    def __init__(self, name, price_band_width=50.0):
+        """Initialize a new Hotel instance."""
+        if price_band_width <= 0:
+            raise ValueError("Price band width must be positive")
+        self._name = name
+        self._price_band_width = price_band_width
+        self._rooms = {}  # Room number -> Room
+        self._type_indexes = {}  # Room type -> RoomTypeIndex
+
+    def get_name(self):
+        """Get the hotel name."""
+        return self._name
+
+    def add_room(self, room):
+        """Add a room to the inventory and keep the indexes in sync with it."""
+        room_number = room.get_room_number()
+        if room_number in self._rooms:
+            raise ValueError(f"Room {room_number} already exists")
+        room_type = room.get_room_type()
+        if room_type not in self._type_indexes:
+            self._type_indexes[room_type] = RoomTypeIndex(room_type, self._price_band_width)
+        # Hold the room lock so no booking slips in between indexing and listening
+        with room.get_lock():
+            self._type_indexes[room_type].add_room(room)
+            room.add_listener(self)
+        self._rooms[room_number] = room
+
+    def remove_room(self, room_number):
+        """Remove a room from the inventory."""
+        room = self._rooms.pop(room_number)
+        with room.get_lock():
+            room.remove_listener(self)
+            self._type_indexes[room.get_room_type()].remove_room(room)
+        return room
+
+    def get_room(self, room_number):
+        """Get a room by number, or None if it does not exist."""
+        return self._rooms.get(room_number)
+
+    def get_rooms(self):
+        """Get all rooms in the inventory."""
+        return list(self._rooms.values())
+
+    def get_room_types(self):
+        """Get the room types in the inventory."""
+        return list(self._type_indexes)
+
+    def get_type_index(self, room_type):
+        """Get the RoomTypeIndex for a room type, or None."""
+        return self._type_indexes.get(room_type)
+
+    def get_rooms_by_type(self, room_type):
+        """Get all rooms of a type."""
+        index = self._type_indexes.get(room_type)
+        return index.rooms_for_mask(index.candidate_mask()) if index else []
+
+    def get_rooms_in_price_range(self, min_price=None, max_price=None):
+        """Get all rooms with a nightly price between min_price and max_price."""
+        return self._filter(None, min_price, max_price, None)
+
+    def get_rooms_with_amenities(self, amenities):
+        """Get all rooms that offer every amenity in the list."""
+        return self._filter(None, None, None, amenities)
+
+    def _filter(self, room_type, min_price, max_price, amenities, stay=None, limit=None):
+        """Collect rooms matching the attribute filters and optional stay."""
+        if room_type is None:
+            indexes = self._type_indexes.values()
+        elif room_type in self._type_indexes:
+            indexes = [self._type_indexes[room_type]]
+        else:
+            indexes = []
+
+        matches = []
+        for index in indexes:
+            mask = index.candidate_mask(min_price, max_price, amenities)
+            if stay is not None:
+                mask = index.free_mask(stay[0], stay[1], mask)
+            for room in index.rooms_for_mask(mask):
+                # Price bands are coarse, so check the exact price of each match
+                price = room.get_price_per_night()
+                if min_price is not None and price < min_price:
+                    continue
+                if max_price is not None and price > max_price:
+                    continue
+                matches.append(room)
+                if limit is not None and len(matches) >= limit:
+                    return matches
+        return matches
+
+    def search(self, check_in, check_out, room_type=None, min_price=None,
+               max_price=None, amenities=None, limit=None):
+        """
+        Search for rooms available for the given dates.
+
+        Returns:
+            list: Matching rooms, at most limit of them if given
+        """
+        if check_out <= check_in:
+            raise ValueError("Check-out date must be after check-in date")
+        stay = night_range(check_in, check_out)
+        return self._filter(room_type, min_price, max_price, amenities, stay, limit)
+
+    def find_available_room(self, check_in, check_out, room_type=None, **filters):
+        """Get any room available for the given dates, or None."""
+        rooms = self.search(check_in, check_out, room_type, limit=1, **filters)
+        return rooms[0] if rooms else None
+
+    def count_available(self, check_in, check_out, room_type):
+        """Count the rooms of a type available for the given dates."""
+        index = self._type_indexes.get(room_type)
+        if index is None:
+            return 0
+        return index.count_free(*night_range(check_in, check_out))
+
+    def _claim_rooms(self, stays, claimed):
+        """
+        Pick a concrete room for every stay that names a room type.
+
+        Stays of the same type and dates share one free-mask lookup, and
+        rooms already claimed by the batch for overlapping nights are skipped.
+
+        Returns:
+            list: (room, check_in, check_out) per stay, or None if a type is full
+        """
+        resolved = [None] * len(stays)
+        by_type = {}
+        for position, (room, check_in, check_out) in enumerate(stays):
+            if check_out <= check_in:
+                raise ValueError("Check-out date must be after check-in date")
+            if isinstance(room, str):
+                key = (room, night_range(check_in, check_out))
+                by_type.setdefault(key, []).append(position)
+            else:
+                resolved[position] = (room, check_in, check_out)
+                claimed.setdefault(room, []).append(night_range(check_in, check_out))
+
+        for (room_type, (start, end)), positions in by_type.items():
+            index = self._type_indexes.get(room_type)
+            if index is None:
+                return None
+            candidates = index.rooms_for_mask(index.free_mask(start, end))
+            picked = []
+            for room in candidates:
+                if len(picked) == len(positions):
+                    break
+                if any(s < end and start < e for s, e in claimed.get(room, ())):
+                    continue
+                claimed.setdefault(room, []).append((start, end))
+                picked.append(room)
+            if len(picked) < len(positions):
+                return None
+            for position, room in zip(positions, picked):
+                _, check_in, check_out = stays[position]
+                resolved[position] = (room, check_in, check_out)
+        return resolved
+
+    def create_group_booking(self, guest, stays):
+        """
+        Book many stays for a guest as one all-or-nothing block.
+
+        Each stay is (room, check_in, check_out), where room is a Room or a
+        room type string. Every room involved is locked in a fixed order,
+        all stays are checked, and either every night is reserved or none.
+
+        Returns:
+            list: New booking objects in the order of the stays, or None
+        """
+        claimed = {}  # Room -> night ranges taken by this batch
+        resolved = self._claim_rooms(stays, claimed)
+        if resolved is None:
+            return None
+
+        # Overlapping stays within the batch can never all succeed
+        for ranges in claimed.values():
+            ranges.sort()
+            if any(ranges[i][1] > ranges[i + 1][0] for i in range(len(ranges) - 1)):
+                return None
+
+        with ExitStack() as stack:
+            # A fixed lock order keeps concurrent group bookings from deadlocking
+            for room in sorted(claimed, key=id):
+                stack.enter_context(room.get_lock())
+            for room, ranges in claimed.items():
+                calendar = room.get_availability_calendar()
+                if not all(calendar.is_range_available(start, end) for start, end in ranges):
+                    return None
+            with booking_change():
+                for room, check_in, check_out in resolved:
+                    room.set_availability_range(check_in, check_out, False)
+        return guest.record_bookings(resolved)
+
+    def room_availability_changed(self, room, start, end, is_available):
+        """Keep the free-room index in sync with a room's calendar."""
+        self._type_indexes[room.get_room_type()].set_occupied(room, start, end, not is_available)
+
+    def room_price_changed(self, room, old_price, new_price):
+        """Keep the price band index in sync with a room's price."""
+        self._type_indexes[room.get_room_type()].move_price_band(room, old_price, new_price)
+
+    def room_rates_changed(self, room, start, end):
+        """Ignore rate calendar changes; price bands follow the flat price."""
+
+    def __len__(self):
+        """Return the number of rooms in the inventory."""
+        return len(self._rooms)
+
+    def __str__(self):
+        """Return a string representation of the hotel."""
+        types_str = ", ".join(f"{room_type}: {len(index)}"
+                              for room_type, index in self._type_indexes.items())
+        return f"Hotel: {self._name} | Rooms: {len(self._rooms)} | {types_str}"
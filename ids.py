@@ -0,0 +1,162 @@
+"""
+This module contains the ID allocator for the Royal Stay Hotel Management System.
+
+IDs are positive integers, unique and increasing per sequence name such
+as "booking" or "payment". Each process reserves blocks of IDs from an
+IdSource and hands them out from memory, so next_id() only takes a lock
+when a block runs out. The default MemoryIdSource is private to the
+process; configure() a FileIdSource to share sequences between
+processes.
+"""
+
+import itertools
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # No POSIX record locks; only threads are serialized
+    fcntl = None
+
+
+class MemoryIdSource:
+    """IdSource whose counters live in this process only."""
+
+    def __init__(self):
+        """Initialize a new MemoryIdSource instance."""
+        self._lock = threading.Lock()
+        self._next = {}  # Sequence name -> next unreserved ID
+
+    def reserve(self, name, count, minimum=1):
+        """
+        Reserve count consecutive IDs of a sequence, none below minimum.
+
+        Returns:
+            int: The first reserved ID
+        """
+        with self._lock:
+            start = max(self._next.get(name, 1), minimum)
+            self._next[name] = start + count
+            return start
+
+
+class FileIdSource:
+    """
+    IdSource whose counters live in a small JSON file.
+
+    Every reservation takes a POSIX lock on the file, so any number of
+    processes can share it. Blocks keep the lock rare.
+    """
+
+    def __init__(self, path):
+        """Initialize a FileIdSource, creating the file if it does not exist."""
+        self._path = path
+        self._lock = threading.Lock()  # lockf does not exclude threads of one process
+        with open(path, "a"):
+            pass
+
+    def reserve(self, name, count, minimum=1):
+        """
+        Reserve count consecutive IDs of a sequence, none below minimum.
+
+        Returns:
+            int: The first reserved ID
+        """
+        with self._lock, open(self._path, "r+") as counters_file:
+            if fcntl is not None:
+                fcntl.lockf(counters_file.fileno(), fcntl.LOCK_EX)
+            try:
+                text = counters_file.read()
+                counters = json.loads(text) if text else {}
+                start = max(counters.get(name, 1), minimum)
+                counters[name] = start + count
+                counters_file.seek(0)
+                counters_file.truncate()
+                counters_file.write(json.dumps(counters, sort_keys=True))
+                counters_file.flush()
+                os.fsync(counters_file.fileno())
+                return start
+            finally:
+                if fcntl is not None:
+                    fcntl.lockf(counters_file.fileno(), fcntl.LOCK_UN)
+
+
+class IdAllocator:
+    """Hands out IDs of one sequence from blocks reserved in an IdSource."""
+
+    def __init__(self, source, name, block_size=1024):
+        """Initialize a new IdAllocator instance."""
+        if block_size <= 0:
+            raise ValueError("Block size must be positive")
+        self._source = source
+        self._name = name
+        self._block_size = block_size
+        self._lock = threading.Lock()  # Serializes block refills
+        self._block = (itertools.count(), 0)  # (counter, end); empty until first use
+
+    def next_id(self):
+        """Get the next ID of the sequence."""
+        while True:
+            # next() on itertools.count is atomic, so the fast path takes no lock
+            counter, end = self._block
+            value = next(counter)
+            if value < end:
+                return value
+            self._refill(counter)
+
+    def _refill(self, exhausted):
+        """Reserve a new block unless another thread already replaced the exhausted one."""
+        with self._lock:
+            if self._block[0] is exhausted:
+                start = self._source.reserve(self._name, self._block_size)
+                self._block = (itertools.count(start), start + self._block_size)
+
+    def advance(self, minimum):
+        """Make sure every later ID is greater than minimum, such as the highest ID restored from storage."""
+        with self._lock:
+            counter, end = self._block
+            # Move the shared counter itself past minimum; replacing it would let
+            # lock-free next_id() calls still on the old counter repeat IDs
+            for value in counter:
+                if value > minimum or value >= end:
+                    break
+            if value >= end:
+                start = self._source.reserve(self._name, self._block_size, minimum + 1)
+                self._block = (itertools.count(start), start + self._block_size)
+
+
+_lock = threading.Lock()  # Guards the allocator table and the configuration
+_source = MemoryIdSource()
+_block_size = 1024
+_allocators = {}  # Sequence name -> IdAllocator
+
+
+def configure(source, block_size=1024):
+    """Switch every sequence to a new IdSource. Blocks already reserved are dropped."""
+    global _source, _block_size
+    with _lock:
+        _source = source
+        _block_size = block_size
+        _allocators.clear()
+
+
+def get_allocator(name):
+    """Get the allocator of a sequence, creating it on first use."""
+    allocator = _allocators.get(name)
+    if allocator is None:
+        with _lock:
+            allocator = _allocators.get(name)
+            if allocator is None:
+                allocator = _allocators[name] = IdAllocator(_source, name, _block_size)
+    return allocator
+
+
+def next_id(name):
+    """Get the next ID of a sequence."""
+    return get_allocator(name).next_id()
+
+
+def advance(name, minimum):
+    """Make sure every later ID of a sequence is greater than minimum."""
+    get_allocator(name).advance(minimum)
@@ -0,0 +1,320 @@
+"""
+This module contains the opt-in instrumentation layer for the Royal Stay Hotel Management System.
+
+enable() wraps the public operations of the model classes (every public
+method except get_* getters) with a wrapper that counts calls, errors
+and latency; disable() puts the original methods back. While disabled
+nothing is wrapped, so there is no overhead at all. Each thread records
+into its own statistics, merged only when a snapshot is taken, so
+instrumented threads never wait on each other. Statistics of threads
+that have exited are folded into one retired set, and reset() starts a
+new generation rather than clearing what live threads are writing to.
+
+Besides latency the layer counts outcomes that point at capacity or
+contention problems: stays rejected because the room was taken, failed
+payments by status, invoices another payment had already marked paid,
+and room operations that started while another thread held the room's
+lock.
+"""
+
+import functools
+import inspect
+import threading
+import time
+
+from booking import Booking, Invoice
+from guest import Guest, LoyaltyProgram
+from histogram import LatencyHistogram
+from payment import Payment
+from room import Room
+from services import GuestService
+
+INSTRUMENTED_CLASSES = (Room, Guest, LoyaltyProgram, Booking, Invoice, Payment, GuestService)
+
+# Histogram bucket bounds in the Prometheus output, in seconds
+EXPORT_BOUNDS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_ROOM_LOCKING = ("check_availability", "set_availability", "set_availability_range", "reserve", "release")
+
+_lock = threading.Lock()  # Guards enabling, disabling, the thread statistics and the generation
+_originals = []  # (class, method name, original function) while enabled
+_thread_stats = []  # (thread, _ThreadStats) per live thread that has recorded anything since reset()
+_local = threading.local()
+
+
+class _ThreadStats:
+    """Statistics recorded by one thread."""
+
+    __slots__ = ("operations", "errors", "counters", "generation")
+
+    def __init__(self, generation=0):
+        """Initialize empty statistics."""
+        self.operations = {}  # Operation -> LatencyHistogram
+        self.errors = {}  # (operation, exception name) -> count
+        self.counters = {}  # (metric, labels) -> count
+        self.generation = generation  # Value of _generation when the statistics were registered
+
+    def merge(self, other):
+        """Add another set of statistics to this one."""
+        # Copy first: the owning thread may add entries while we read
+        for operation, histogram in list(other.operations.items()):
+            total = self.operations.get(operation)
+            if total is None:
+                total = self.operations[operation] = LatencyHistogram()
+            total.merge(histogram)
+        for target, source in ((self.errors, other.errors), (self.counters, other.counters)):
+            for key, count in list(source.items()):
+                target[key] = target.get(key, 0) + count
+
+
+_generation = 0  # Bumped by reset(); statistics of an older generation are no longer recorded into
+_retired = _ThreadStats()  # Statistics of threads that have exited since reset()
+
+
+def _stats():
+    """Get the statistics of the current thread, registering them on first use and after reset()."""
+    try:
+        stats = _local.stats
+        if stats.generation == _generation:
+            return stats
+    except AttributeError:
+        pass
+    with _lock:
+        stats = _local.stats = _ThreadStats(_generation)
+        _retire_exited()
+        _thread_stats.append((threading.current_thread(), stats))
+    return stats
+
+
+def _retire_exited():
+    """Fold the statistics of threads that have exited into _retired. Caller holds _lock."""
+    live = []
+    for thread, stats in _thread_stats:
+        if thread.is_alive():
+            live.append((thread, stats))
+        else:
+            _retired.merge(stats)
+    _thread_stats[:] = live
+
+
+def increment(metric, labels=(), amount=1):
+    """Add to a counter, labelled by (name, value) pairs, in the current thread's statistics."""
+    counters = _stats().counters
+    key = (metric, tuple(labels))
+    counters[key] = counters.get(key, 0) + amount
+
+
+def _outcome_reserve(operation, room, result):
+    """Count a stay the room could not take."""
+    if not result:
+        increment("hotel_reservation_conflicts_total", (("room_type", room.get_room_type()),))
+
+
+def _outcome_create_booking(operation, guest, result):
+    """Count a booking rejected for lack of availability."""
+    if result is None:
+        increment("hotel_booking_rejections_total")
+
+
+def _outcome_process_payment(operation, payment, result):
+    """Count a failed payment by status."""
+    if not result:
+        increment("hotel_payment_failures_total", (("status", payment.get_status()),))
+
+
+def _outcome_mark_paid(operation, invoice, result):
+    """Count an invoice that was already paid, such as by a concurrent payment."""
+    if not result:
+        increment("hotel_invoice_already_paid_total")
+
+
+# Method name -> function(operation, instance, result) run after a successful call
+_OUTCOMES = {
+    "reserve": _outcome_reserve,
+    "create_booking": _outcome_create_booking,
+    "process_payment": _outcome_process_payment,
+    "mark_paid": _outcome_mark_paid,
+}
+
+
+def _probe_room_lock(operation, room):
+    """Count a room operation starting while another thread holds the room's lock."""
+    lock = room.get_lock()
+    if lock.acquire(blocking=False):
+        lock.release()
+    else:
+        increment("hotel_lock_contention_total", (("operation", operation),))
+
+
+def _instrument(operation, function, probe, outcome):
+    """Wrap a method so each call is timed and counted."""
+    clock = time.perf_counter
+
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        stats = _stats()
+        if probe is not None:
+            probe(operation, self)
+        started = clock()
+        try:
+            result = function(self, *args, **kwargs)
+        except Exception as error:
+            key = (operation, type(error).__name__)
+            stats.errors[key] = stats.errors.get(key, 0) + 1
+            raise
+        finally:
+            elapsed = clock() - started
+            histogram = stats.operations.get(operation)
+            if histogram is None:
+                histogram = stats.operations[operation] = LatencyHistogram()
+            histogram.record(elapsed)
+        if outcome is not None:
+            outcome(operation, self, result)
+        return result
+
+    return wrapper
+
+
+def _classes():
+    """Get the instrumented classes and all their subclasses."""
+    classes = []
+    pending = list(INSTRUMENTED_CLASSES)
+    while pending:
+        cls = pending.pop(0)
+        if cls not in classes:
+            classes.append(cls)
+            pending.extend(cls.__subclasses__())
+    return classes
+
+
+def enable():
+    """Start instrumenting the model classes. Enabling twice has no effect."""
+    with _lock:
+        if _originals:
+            return
+        for cls in _classes():
+            for name, function in list(vars(cls).items()):
+                if name.startswith(("_", "get_")) or not inspect.isfunction(function):
+                    continue
+                operation = f"{cls.__name__}.{name}"
+                probe = _probe_room_lock if issubclass(cls, Room) and name in _ROOM_LOCKING else None
+                setattr(cls, name, _instrument(operation, function, probe, _OUTCOMES.get(name)))
+                _originals.append((cls, name, function))
+
+
+def disable():
+    """Stop instrumenting and restore the original methods. Recorded statistics are kept."""
+    with _lock:
+        for cls, name, function in reversed(_originals):
+            setattr(cls, name, function)
+        _originals.clear()
+
+
+def is_enabled():
+    """Check whether instrumentation is on."""
+    return bool(_originals)
+
+
+def reset():
+    """
+    Discard everything recorded so far, in every thread.
+
+    Each thread's statistics are left as they are and dropped from the
+    list; the thread registers fresh ones on its next recording, so no
+    thread ever clears dictionaries another thread is writing to.
+    """
+    global _generation, _retired
+    with _lock:
+        _generation += 1
+        _thread_stats.clear()
+        _retired = _ThreadStats(_generation)
+
+
+def _merged():
+    """Merge the statistics of every thread into one _ThreadStats."""
+    merged = _ThreadStats()
+    with _lock:
+        _retire_exited()
+        merged.merge(_retired)
+        thread_stats = [stats for _, stats in _thread_stats]
+    for stats in thread_stats:
+        merged.merge(stats)
+    return merged
+
+
+def snapshot():
+    """
+    Get everything recorded so far, merged across threads.
+
+    Returns:
+        dict: "operations" maps each operation to calls, errors, total and
+        mean seconds and p50/p95/p99 latency in seconds; "counters" maps
+        (metric, labels) to counts
+    """
+    merged = _merged()
+    errors = {}
+    for (operation, _), count in merged.errors.items():
+        errors[operation] = errors.get(operation, 0) + count
+    return {
+        "operations": {operation: {
+            "calls": histogram.get_count(),
+            "errors": errors.get(operation, 0),
+            "total_seconds": histogram.get_total(),
+            "mean_seconds": histogram.get_mean(),
+            "p50_seconds": histogram.get_quantile(0.50),
+            "p95_seconds": histogram.get_quantile(0.95),
+            "p99_seconds": histogram.get_quantile(0.99),
+        } for operation, histogram in sorted(merged.operations.items())},
+        "counters": dict(sorted(merged.counters.items())),
+    }
+
+
+def _labels(pairs):
+    """Format (name, value) pairs as a Prometheus label set."""
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def render_prometheus():
+    """
+    Format everything recorded so far in the Prometheus text exposition format.
+
+    Returns:
+        str: Metrics text, ending in a newline
+    """
+    merged = _merged()
+    lines = [
+        "# HELP hotel_operation_seconds Latency of instrumented operations.",
+        "# TYPE hotel_operation_seconds histogram",
+    ]
+    for operation, histogram in sorted(merged.operations.items()):
+        buckets = list(histogram.iter_buckets())
+        seen = index = 0
+        for bound in EXPORT_BOUNDS:
+            # A histogram bucket counts towards a bound when all of it lies below the bound
+            while index < len(buckets) and buckets[index][0] <= bound:
+                seen += buckets[index][1]
+                index += 1
+            lines.append(f"hotel_operation_seconds_bucket{_labels((('operation', operation), ('le', bound)))} "
+                         f"{seen}")
+        labels = _labels((("operation", operation),))
+        lines.append(f"hotel_operation_seconds_bucket{_labels((('operation', operation), ('le', '+Inf')))} "
+                     f"{histogram.get_count()}")
+        lines.append(f"hotel_operation_seconds_sum{labels} {histogram.get_total()!r}")
+        lines.append(f"hotel_operation_seconds_count{labels} {histogram.get_count()}")
+    lines.append("# HELP hotel_operation_errors_total Instrumented operations that raised, by exception.")
+    lines.append("# TYPE hotel_operation_errors_total counter")
+    for (operation, exception), count in sorted(merged.errors.items()):
+        lines.append(f"hotel_operation_errors_total"
+                     f"{_labels((('operation', operation), ('exception', exception)))} {count}")
+    metrics = sorted({metric for metric, _ in merged.counters})
+    for metric in metrics:
+        lines.append(f"# TYPE {metric} counter")
+        for (name, labels), count in sorted(merged.counters.items()):
+            if name == metric:
+                lines.append(f"{metric}{_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,266 @@
+"""
+This module contains the LoyaltyLedger class for the Royal Stay Hotel Management System.
+"""
+
+import threading
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to plain loops
+    np = None
+
+POINTS_PER_DOLLAR = 10  # As in LoyaltyProgram.earn_points
+DOLLARS_PER_POINT = 0.01  # As in LoyaltyProgram.redeem_points
+
+
+class LoyaltyLedger:
+    """
+    Append-only record of loyalty point accruals and redemptions.
+
+    Every change is an entry of (time, member, points), stored in
+    columns, and the ledger keeps each member's LoyaltyProgram balance
+    in step. Entries must be added in time order. Every
+    checkpoint_interval entries the ledger copies all balances, so a
+    balance as of any date replays at most one interval of entries.
+    Earning and redeeming through the ledger is thread-safe. A program's
+    balance when it first reaches the ledger is recorded as an opening
+    entry; after that it should only change through the ledger.
+    """
+
+    def __init__(self, checkpoint_interval=65536, use_numpy=None):
+        """Initialize a new LoyaltyLedger instance."""
+        if checkpoint_interval <= 0:
+            raise ValueError("Checkpoint interval must be positive")
+        if use_numpy is None:
+            use_numpy = np is not None
+        elif use_numpy and np is None:
+            raise ImportError("NumPy is required for use_numpy=True")
+        self._use_numpy = use_numpy
+        self._checkpoint_interval = checkpoint_interval
+        self._lock = threading.Lock()  # Guards the columns, balances and checkpoints
+        self._programs = []  # Member index -> LoyaltyProgram
+        self._members = {}  # LoyaltyProgram -> member index
+        self._balances = array("q")  # Member index -> points balance
+        self._times = array("d")  # Entry -> POSIX timestamp
+        self._entry_members = array("q")  # Entry -> member index
+        self._entry_points = array("q")  # Entry -> points, negative for redemptions
+        self._checkpoint_ends = []  # Number of entries covered by each checkpoint
+        self._checkpoint_balances = []  # Copy of the balances at each checkpoint
+
+    def _member(self, loyalty_program, timestamp):
+        """Get the member index of a program, adding it with its current balance. Caller holds the lock."""
+        member = self._members.get(loyalty_program)
+        if member is None:
+            member = self._members[loyalty_program] = len(self._programs)
+            self._programs.append(loyalty_program)
+            self._balances.append(0)
+            opening = loyalty_program.get_points_balance()
+            if opening:
+                self._append(timestamp, member, opening)
+                self._balances[member] = opening
+        return member
+
+    def _timestamp(self, when):
+        """Convert an entry time to a timestamp no earlier than the last entry. Caller holds the lock."""
+        timestamp = (when or datetime.now()).timestamp()
+        if self._times and timestamp < self._times[-1]:
+            if when is not None:
+                raise ValueError("Ledger entries must be added in time order")
+            timestamp = self._times[-1]  # The wall clock stepped back
+        return timestamp
+
+    def _append(self, timestamp, member, points):
+        """Append one entry. Caller holds the lock."""
+        self._times.append(timestamp)
+        self._entry_members.append(member)
+        self._entry_points.append(points)
+
+    def _maybe_checkpoint(self):
+        """Copy the balances if an interval has passed since the last checkpoint. Caller holds the lock."""
+        last = self._checkpoint_ends[-1] if self._checkpoint_ends else 0
+        if len(self._times) - last >= self._checkpoint_interval:
+            self._checkpoint_ends.append(len(self._times))
+            self._checkpoint_balances.append(array("q", self._balances))
+
+    def earn(self, loyalty_program, amount, when=None):
+        """
+        Record points earned on a spending amount.
+
+        Returns:
+            int: Points earned
+        """
+        points = int(amount * POINTS_PER_DOLLAR)
+        with self._lock:
+            timestamp = self._timestamp(when)
+            member = self._member(loyalty_program, timestamp)
+            self._append(timestamp, member, points)
+            self._balances[member] += points
+            loyalty_program.set_points_balance(self._balances[member])
+            self._maybe_checkpoint()
+        return points
+
+    def redeem(self, loyalty_program, points, when=None):
+        """
+        Redeem points for a discount. Concurrent redemptions never overdraw.
+
+        Returns:
+            float: Discount in dollars
+        """
+        if points <= 0:
+            raise ValueError("Points to redeem must be positive")
+        with self._lock:
+            timestamp = self._timestamp(when)
+            member = self._member(loyalty_program, timestamp)
+            if points > self._balances[member]:
+                raise ValueError("Not enough points available")
+            self._append(timestamp, member, -points)
+            self._balances[member] -= points
+            # Redeeming keeps the membership level, as LoyaltyProgram.redeem_points does
+            loyalty_program.set_points_balance(self._balances[member], update_level=False)
+            self._maybe_checkpoint()
+        return points * DOLLARS_PER_POINT
+
+    def accrue(self, accruals, when=None):
+        """
+        Record points for many (loyalty program, amount) pairs at once.
+
+        Points are computed for the whole batch together and each member's
+        balance and membership level are updated once, however many
+        accruals they have in the batch.
+
+        Returns:
+            int: Total points earned
+        """
+        accruals = list(accruals)
+        programs = [loyalty_program for loyalty_program, _ in accruals]
+        amounts = [amount for _, amount in accruals]
+        with self._lock:
+            timestamp = self._timestamp(when)
+            members = list(map(self._members.get, programs))
+            if None in members:
+                members = [self._member(loyalty_program, timestamp) if member is None else member
+                           for loyalty_program, member in zip(programs, members)]
+            # Apply the batch in pieces ending at checkpoint boundaries, so a large batch
+            # still leaves a checkpoint every checkpoint_interval entries
+            points, touched, start = 0, set(), 0
+            while start < len(members):
+                self._maybe_checkpoint()
+                last = self._checkpoint_ends[-1] if self._checkpoint_ends else 0
+                stop = min(start + last + self._checkpoint_interval - len(self._times), len(members))
+                if self._use_numpy:
+                    piece_points, piece_touched = self._accrue_numpy(members[start:stop], amounts[start:stop])
+                else:
+                    piece_points, piece_touched = self._accrue_python(members[start:stop], amounts[start:stop])
+                self._times.extend(array("d", [timestamp]) * (stop - start))
+                points += piece_points
+                touched.update(piece_touched)
+                start = stop
+            for member in touched:
+                self._programs[member].set_points_balance(self._balances[member])
+            self._maybe_checkpoint()
+        return points
+
+    def _accrue_python(self, members, amounts):
+        """Append batch points and update balances in plain Python. Caller holds the lock."""
+        points = [int(amount * POINTS_PER_DOLLAR) for amount in amounts]
+        self._entry_members.extend(array("q", members))
+        self._entry_points.extend(array("q", points))
+        touched = set()
+        for member, earned in zip(members, points):
+            self._balances[member] += earned
+            touched.add(member)
+        return sum(points), touched
+
+    def _accrue_numpy(self, members, amounts):
+        """Append batch points and update balances with NumPy. Caller holds the lock."""
+        members = np.array(members, dtype=np.int64)
+        # astype truncates toward zero like int()
+        points = (np.array(amounts, dtype=np.float64) * POINTS_PER_DOLLAR).astype(np.int64)
+        self._entry_members.frombytes(members.tobytes())
+        self._entry_points.frombytes(points.tobytes())
+        # Summed as float64, which is exact for any realistic points total
+        totals = np.bincount(members, weights=points, minlength=len(self._balances)).astype(np.int64)
+        touched = np.flatnonzero(totals)
+        balances = np.frombuffer(self._balances, dtype=np.int64)
+        balances[touched] += totals[touched]
+        del balances  # Release the buffer so the array can grow again
+        return int(points.sum()), touched.tolist()
+
+    def accrue_paid_bookings(self, bookings, when=None):
+        """
+        Accrue points for the paid invoices of bookings by enrolled guests.
+
+        Returns:
+            int: Total points earned
+        """
+        accruals = []
+        for booking in bookings:
+            invoice = booking.get_invoice()
+            loyalty_program = booking.get_guest().get_loyalty_program()
+            if invoice is not None and loyalty_program is not None and invoice.get_payment_status() == "Paid":
+                accruals.append((loyalty_program, invoice.get_final_amount()))
+        return self.accrue(accruals, when)
+
+    def get_balance(self, loyalty_program):
+        """Get a member's current balance in the ledger."""
+        with self._lock:
+            member = self._members.get(loyalty_program)
+            return 0 if member is None else self._balances[member]
+
+    def get_balance_as_of(self, loyalty_program, when):
+        """Get a member's balance including every entry up to and including when."""
+        with self._lock:
+            member = self._members.get(loyalty_program)
+            if member is None:
+                return 0
+            end = bisect_right(self._times, when.timestamp())
+            checkpoint = bisect_right(self._checkpoint_ends, end) - 1
+            if checkpoint < 0:
+                start, balance = 0, 0
+            else:
+                start = self._checkpoint_ends[checkpoint]
+                balances = self._checkpoint_balances[checkpoint]
+                balance = balances[member] if member < len(balances) else 0
+            return balance + self._replay(member, start, end)
+
+    def _replay(self, member, start, end):
+        """Sum a member's points over entries [start, end). Caller holds the lock."""
+        if start >= end:
+            return 0
+        if self._use_numpy:
+            members = np.frombuffer(self._entry_members, dtype=np.int64, count=end - start, offset=start * 8)
+            points = np.frombuffer(self._entry_points, dtype=np.int64, count=end - start, offset=start * 8)
+            total = int(points[members == member].sum())
+            del members, points  # Release the buffers so the arrays can grow again
+            return total
+        return sum(points for entry_member, points in zip(self._entry_members[start:end],
+                                                          self._entry_points[start:end])
+                   if entry_member == member)
+
+    def iter_entries(self, loyalty_program=None):
+        """
+        Iterate over ledger entries in time order, optionally for one member.
+
+        Yields:
+            tuple: (datetime, guest ID, points)
+        """
+        with self._lock:
+            count = len(self._times)
+            member = None if loyalty_program is None else self._members.get(loyalty_program, -1)
+        for entry in range(count):
+            entry_member = self._entry_members[entry]
+            if member is None or entry_member == member:
+                yield (datetime.fromtimestamp(self._times[entry]),
+                       self._programs[entry_member].get_guest_id(), self._entry_points[entry])
+
+    def __len__(self):
+        """Return the number of entries in the ledger."""
+        return len(self._times)
+
+    def __str__(self):
+        """Return a string representation of the ledger."""
+        return (f"Loyalty ledger: {len(self)} entries | Members: {len(self._programs)} | "
+                f"Checkpoints: {len(self._checkpoint_ends)}")
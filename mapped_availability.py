@@ -0,0 +1,235 @@
+"""
+This module contains the MappedAvailabilityStore and MappedCalendar classes for the Royal Stay Hotel Management System.
+"""
+
+import mmap
+import os
+import struct
+import threading
+from datetime import datetime
+
+from availability import AvailabilityCalendar
+
+try:
+    import fcntl
+except ImportError:  # No POSIX record locks; only threads are serialized
+    fcntl = None
+
+_MAGIC = b"RSAV"
+_VERSION = 1
+_HEADER = struct.Struct("<4sIqIII")  # Magic, version, start ordinal, days, capacity, room count
+_KEY_SIZE = 32  # Room numbers are stored as UTF-8 text, zero padded
+
+
+def _plain_calendar(unavailable):
+    """Rebuild an in-memory AvailabilityCalendar from a list of unavailable days."""
+    calendar = AvailabilityCalendar()
+    for ordinal in unavailable:
+        calendar.set_available(ordinal, False)
+    return calendar
+
+
+class MappedCalendar(AvailabilityCalendar):
+    """
+    AvailabilityCalendar whose bits live in one row of a memory-mapped file.
+
+    Reads and writes go straight to the shared mapping with no copies.
+    Days outside the file's window read as available and cannot be set.
+    Check-and-reserve takes a POSIX lock on the row so two processes
+    cannot reserve the same night.
+    """
+    __slots__ = ("_store", "_row_offset", "_days")
+
+    def __init__(self, store, row_offset, start_ordinal, days):
+        """Initialize a MappedCalendar over one row of a store."""
+        super().__init__()
+        self._store = store
+        self._row_offset = row_offset
+        self._days = days
+        self._base = start_ordinal
+        self._bits = store._view[row_offset:row_offset + (days + 7) // 8]
+
+    def _ensure(self, start, end):
+        """Refuse writes outside the fixed window of the file."""
+        if start < self._base or end > self._base + self._days:
+            raise ValueError("Dates outside the mapped availability window")
+
+    def _clip(self, start, end):
+        """Clip [start, end) to the window, as bit offsets."""
+        return max(start - self._base, 0), min(end - self._base, self._days)
+
+    def _row_lock(self):
+        """Lock this row against other processes."""
+        return self._store._lock_range(self._row_offset, len(self._bits))
+
+    def set_range(self, start, end, is_available):
+        """Set the availability status for the ordinal range [start, end)."""
+        with self._row_lock():
+            super().set_range(start, end, is_available)
+
+    def reserve_range(self, start, end):
+        """Atomically take the ordinal range [start, end) across processes."""
+        with self._row_lock():
+            return super().reserve_range(start, end)
+
+    def __reduce__(self):
+        """Pickle as a plain in-memory copy of the row."""
+        return _plain_calendar, (list(self.iter_unavailable()),)
+
+
+class _RangeLock:
+    """Context manager holding a POSIX lock on a byte range of a file."""
+
+    def __init__(self, fileno, offset, length):
+        """Initialize a lock over [offset, offset + length) of fileno."""
+        self._fileno = fileno
+        self._offset = offset
+        self._length = length
+
+    def __enter__(self):
+        """Acquire the lock, blocking until it is free."""
+        if fcntl is not None:
+            fcntl.lockf(self._fileno, fcntl.LOCK_EX, self._length, self._offset)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Release the lock."""
+        if fcntl is not None:
+            fcntl.lockf(self._fileno, fcntl.LOCK_UN, self._length, self._offset)
+
+
+class MappedAvailabilityStore:
+    """
+    Fixed-layout availability file shared by every worker process on a box.
+
+    The file holds a header, a table of room numbers and one row per room
+    with one bit per night of a fixed window. Opening it is a single mmap,
+    and Rooms attached to it read and write their row in place, so every
+    worker sees the same inventory and memory stays flat as workers are
+    added. Changes made by other processes do not reach local listeners
+    such as a Hotel index.
+    """
+
+    def __init__(self, path, start_date=None, days=None, capacity=None):
+        """
+        Open an availability file, creating it if it does not exist.
+
+        start_date, days and capacity are only needed to create a new file.
+        """
+        self._path = path
+        self._lock = threading.Lock()  # Guards the room table within this process
+        if not os.path.exists(path):
+            if start_date is None or days is None or capacity is None:
+                raise ValueError("start_date, days and capacity are needed to create a file")
+            self._create(path, start_date.toordinal(), days, capacity)
+
+        self._file = open(path, "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._view = memoryview(self._map)
+        magic, version, start, days, capacity, _ = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not an availability file")
+        self._start = start
+        self._days = days
+        self._capacity = capacity
+        self._row_bytes = (days + 7) // 8
+        self._rows_offset = _HEADER.size + capacity * _KEY_SIZE
+        self._rows = {}  # Room number key -> row index
+        self._calendars = {}  # Row index -> MappedCalendar
+        self._load_table()
+
+    @staticmethod
+    def _create(path, start, days, capacity):
+        """Write an empty availability file."""
+        size = _HEADER.size + capacity * _KEY_SIZE + capacity * ((days + 7) // 8)
+        with open(path, "wb") as new_file:
+            new_file.write(_HEADER.pack(_MAGIC, _VERSION, start, days, capacity, 0))
+            new_file.truncate(size)
+
+    def _lock_range(self, offset, length):
+        """Get a cross-process lock over a byte range of the file."""
+        return _RangeLock(self._file.fileno(), offset, length)
+
+    def _load_table(self):
+        """Read room numbers written by any process into the local index."""
+        count = _HEADER.unpack_from(self._map, 0)[5]
+        for row in range(len(self._rows), count):
+            offset = _HEADER.size + row * _KEY_SIZE
+            key = bytes(self._map[offset:offset + _KEY_SIZE]).rstrip(b"\0").decode("utf-8")
+            self._rows[key] = row
+
+    @staticmethod
+    def _key(room_number):
+        """Encode a room number as a table key."""
+        key = str(room_number)
+        if len(key.encode("utf-8")) > _KEY_SIZE:
+            raise ValueError(f"Room number {room_number} is too long")
+        return key
+
+    def get_start_date(self):
+        """Get the first night covered by the file."""
+        return datetime.fromordinal(self._start)
+
+    def get_days(self):
+        """Get the number of nights covered by the file."""
+        return self._days
+
+    def get_room_count(self):
+        """Get the number of rooms with a row in the file."""
+        return _HEADER.unpack_from(self._map, 0)[5]
+
+    def get_calendar(self, room_number):
+        """
+        Get the shared calendar of a room, allocating a row if needed.
+
+        Returns:
+            tuple: (MappedCalendar, True if the row was just allocated)
+        """
+        key = self._key(room_number)
+        with self._lock:
+            # The header lock serializes row allocation across processes
+            with self._lock_range(0, _HEADER.size):
+                self._load_table()
+                created = key not in self._rows
+                if created:
+                    row = _HEADER.unpack_from(self._map, 0)[5]
+                    if row >= self._capacity:
+                        raise ValueError("Availability file is full")
+                    offset = _HEADER.size + row * _KEY_SIZE
+                    self._map[offset:offset + _KEY_SIZE] = key.encode("utf-8").ljust(_KEY_SIZE, b"\0")
+                    struct.pack_into("<I", self._map, _HEADER.size - 4, row + 1)
+                    self._rows[key] = row
+            row = self._rows[key]
+            if row not in self._calendars:
+                self._calendars[row] = MappedCalendar(self, self._rows_offset + row * self._row_bytes,
+                                                      self._start, self._days)
+            return self._calendars[row], created
+
+    def attach(self, room):
+        """
+        Point a room at its shared row.
+
+        A room seen for the first time copies its current calendar into the
+        file; otherwise the file is the source of truth and wins.
+        """
+        with room.get_lock():
+            calendar, created = self.get_calendar(room.get_room_number())
+            if created:
+                for ordinal in room.get_availability_calendar().iter_unavailable():
+                    calendar.set_available(ordinal, False)
+            room.set_availability_calendar(calendar)
+        return calendar
+
+    def flush(self):
+        """Write dirty pages of the mapping back to the file."""
+        self._map.flush()
+
+    def close(self):
+        """Flush and unmap the file. Attached rooms must not be used afterwards."""
+        for calendar in self._calendars.values():
+            calendar._bits.release()
+        self._calendars.clear()
+        self._view.release()
+        self._map.flush()
+        self._map.close()
+        self._file.close()
@@ -0,0 +1,267 @@
+"""
+This module contains the OccupancyMatrix class for the Royal Stay Hotel Management System.
+"""
+
+from datetime import datetime
+import threading
+
+from availability import night_range
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; fall back to bytearray rows
+    np = None
+
+
+class OccupancyMatrix:
+    """
+    Rooms x days occupancy grid mirroring the availability of each Room.
+
+    Cell [r, d] is set when room r is not available on night d of the
+    window. With NumPy installed the grid is a boolean array and every
+    query is a handful of array operations; otherwise each room is a
+    bytearray row and the same queries run in plain Python.
+    """
+
+    def __init__(self, rooms, start_date, days, use_numpy=None):
+        """Initialize a new OccupancyMatrix covering days nights from start_date."""
+        if days <= 0:
+            raise ValueError("Number of days must be positive")
+        if use_numpy is None:
+            use_numpy = np is not None
+        elif use_numpy and np is None:
+            raise ImportError("NumPy is required for use_numpy=True")
+        self._use_numpy = use_numpy
+        self._start = start_date.toordinal()
+        self._days = days
+        self._rooms = []
+        self._rows = {}  # Room number -> row index
+        self._type_rows = {}  # Room type -> list of row indexes
+        self._type_row_arrays = {}  # Room type -> cached NumPy index array
+        self._lock = threading.Lock()  # Guards writes to the grid and swapping it for a bigger one
+        rooms = list(rooms)
+        for room in rooms:
+            self._add_row(room)
+        # Build the whole grid in one allocation before any listener can write to it
+        if use_numpy:
+            self._grid = np.zeros((len(rooms), days), dtype=bool)
+        else:
+            self._grid = [bytearray(days) for _ in rooms]
+        for row, room in enumerate(rooms):
+            self._fill_row(row, room)
+
+    @classmethod
+    def from_hotel(cls, hotel, start_date, days, use_numpy=None):
+        """Create an OccupancyMatrix over every room in a Hotel."""
+        return cls(hotel.get_rooms(), start_date, days, use_numpy)
+
+    def get_start_date(self):
+        """Get the first night covered by the matrix."""
+        return datetime.fromordinal(self._start)
+
+    def get_days(self):
+        """Get the number of nights covered by the matrix."""
+        return self._days
+
+    def add_room(self, room):
+        """Add a row for a room and copy its current availability into it."""
+        with self._lock:
+            row = self._add_row(room)
+            if self._use_numpy:
+                self._grid = np.vstack([self._grid, np.zeros((1, self._days), dtype=bool)])
+            else:
+                self._grid.append(bytearray(self._days))
+        self._fill_row(row, room)
+
+    def _add_row(self, room):
+        """Record a room's row index and type. Returns the new row index."""
+        room_number = room.get_room_number()
+        if room_number in self._rows:
+            raise ValueError(f"Room {room_number} already exists")
+        row = len(self._rooms)
+        self._rows[room_number] = row
+        self._type_rows.setdefault(room.get_room_type(), []).append(row)
+        self._type_row_arrays.pop(room.get_room_type(), None)
+        self._type_row_arrays.pop(None, None)
+        self._rooms.append(room)
+        return row
+
+    def _fill_row(self, row, room):
+        """Copy a room's availability into its row and start listening to the room."""
+        # Hold the room lock so no booking slips in between copying and listening
+        with room.get_lock():
+            end = self._start + self._days
+            columns = [ordinal - self._start for ordinal in room.get_availability_calendar().iter_unavailable()
+                       if self._start <= ordinal < end]
+            with self._lock:
+                if self._use_numpy:
+                    self._grid[row, columns] = True
+                else:
+                    cells = self._grid[row]
+                    for column in columns:
+                        cells[column] = 1
+            room.add_listener(self)
+
+    def _columns(self, check_in, check_out):
+        """Convert a stay into a column range, checking it lies in the window."""
+        if check_out <= check_in:
+            raise ValueError("Check-out date must be after check-in date")
+        start, end = night_range(check_in, check_out)
+        start, end = start - self._start, end - self._start
+        if start < 0 or end > self._days:
+            raise ValueError("Dates outside the occupancy matrix window")
+        return start, end
+
+    def _rows_for(self, room_type):
+        """Get the row indexes for a room type, or every row if it is None."""
+        if room_type is None:
+            rows = range(len(self._rooms))
+        else:
+            rows = self._type_rows.get(room_type, [])
+        if not self._use_numpy:
+            return rows
+        key = room_type
+        if key not in self._type_row_arrays:
+            self._type_row_arrays[key] = np.asarray(rows, dtype=np.intp)
+        return self._type_row_arrays[key]
+
+    def free_counts(self, room_type=None, check_in=None, check_out=None):
+        """
+        Count free rooms per night.
+
+        Returns:
+            list: Number of free rooms of the type for each night in the range
+        """
+        start, end = (0, self._days) if check_in is None else self._columns(check_in, check_out)
+        rows = self._rows_for(room_type)
+        if self._use_numpy:
+            return (len(rows) - self._grid[rows, start:end].sum(axis=0)).tolist()
+        counts = [len(rows)] * (end - start)
+        for row in rows:
+            cells = self._grid[row]
+            for night in range(start, end):
+                counts[night - start] -= cells[night]
+        return counts
+
+    def rooms_free(self, room_type, check_in, check_out):
+        """Get every room of a type that is free for the whole stay."""
+        start, end = self._columns(check_in, check_out)
+        rows = self._rows_for(room_type)
+        if self._use_numpy:
+            free = ~self._grid[rows, start:end].any(axis=1)
+            return [self._rooms[row] for row in rows[free].tolist()]
+        return [self._rooms[row] for row in rows if not any(self._grid[row][start:end])]
+
+    def first_free_window(self, room_type, nights, check_in=None):
+        """
+        Find the earliest stay of the given length that some room can take.
+
+        Returns:
+            tuple: (check-in date, room), or None if no room is free long enough
+        """
+        if nights <= 0:
+            raise ValueError("Number of nights must be positive")
+        if check_in is None:
+            offset = 0
+        else:
+            offset = check_in.toordinal() - self._start
+            if offset < 0 or offset >= self._days:
+                raise ValueError("Dates outside the occupancy matrix window")
+        rows = self._rows_for(room_type)
+        span = self._days - offset
+        if span < nights or len(rows) == 0:
+            return None
+
+        if self._use_numpy:
+            free = ~self._grid[rows, offset:]
+            runs = np.zeros((len(rows), span + 1), dtype=np.int32)
+            np.cumsum(free, axis=1, out=runs[:, 1:])
+            fits = (runs[:, nights:] - runs[:, :-nights]) == nights
+            any_fit = fits.any(axis=0)
+            if not any_fit.any():
+                return None
+            first = int(any_fit.argmax())
+            row = int(rows[int(fits[:, first].argmax())])
+            return datetime.fromordinal(self._start + offset + first), self._rooms[row]
+
+        best = None
+        for row in rows:
+            run = 0
+            for night, cell in enumerate(self._grid[row][offset:]):
+                run = 0 if cell else run + 1
+                if run == nights:
+                    first = night - nights + 1
+                    if best is None or first < best[0]:
+                        best = (first, row)
+                    break
+        if best is None:
+            return None
+        return datetime.fromordinal(self._start + offset + best[0]), self._rooms[best[1]]
+
+    def _batch(self, queries):
+        """Group queries by room type and test every one against the grid."""
+        grouped = {}
+        for position, (room_type, check_in, check_out) in enumerate(queries):
+            start, end = self._columns(check_in, check_out)
+            grouped.setdefault(room_type, []).append((position, start, end))
+
+        results = [None] * len(queries)
+        for room_type, items in grouped.items():
+            rows = self._rows_for(room_type)
+            if self._use_numpy:
+                # Prefix sums of occupied nights turn each stay into two lookups
+                busy = np.zeros((len(rows), self._days + 1), dtype=np.int32)
+                np.cumsum(self._grid[rows], axis=1, out=busy[:, 1:])
+                starts = np.array([item[1] for item in items], dtype=np.intp)
+                ends = np.array([item[2] for item in items], dtype=np.intp)
+                free = (busy[:, ends] - busy[:, starts]) == 0
+                for column, (position, _, _) in enumerate(items):
+                    results[position] = rows[free[:, column]].tolist()
+            else:
+                for position, start, end in items:
+                    results[position] = [row for row in rows
+                                         if not any(self._grid[row][start:end])]
+        return results
+
+    def batch_rooms_free(self, queries):
+        """
+        Answer many (room type, check-in, check-out) queries in one call.
+
+        Returns:
+            list: For each query, the rooms free for the whole stay
+        """
+        return [[self._rooms[row] for row in rows] for rows in self._batch(queries)]
+
+    def batch_count_free(self, queries):
+        """
+        Count free rooms for many (room type, check-in, check-out) queries.
+
+        Returns:
+            list: For each query, the number of rooms free for the whole stay
+        """
+        return [len(rows) for rows in self._batch(queries)]
+
+    def room_availability_changed(self, room, start, end, is_available):
+        """Mirror a change in a room's calendar into its row."""
+        start = max(start - self._start, 0)
+        end = min(end - self._start, self._days)
+        if start >= end:
+            return
+        row = self._rows[room.get_room_number()]
+        with self._lock:
+            if self._use_numpy:
+                self._grid[row, start:end] = not is_available
+            else:
+                self._grid[row][start:end] = bytes([0 if is_available else 1]) * (end - start)
+
+    def room_price_changed(self, room, old_price, new_price):
+        """Ignore price changes; the matrix only tracks occupancy."""
+
+    def room_rates_changed(self, room, start, end):
+        """Ignore rate changes; the matrix only tracks occupancy."""
+
+    def __str__(self):
+        """Return a string representation of the occupancy matrix."""
+        backend = "NumPy" if self._use_numpy else "bytearray"
+        return (f"Occupancy Matrix: {len(self._rooms)} rooms x {self._days} nights "
+                f"from {self.get_start_date().strftime('%Y-%m-%d')} ({backend})")
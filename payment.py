@@ -2,23 +2,82 @@
 This module contains the Payment class for the Royal Stay Hotel Management System.
 """
 
-import uuid
+from abc import ABC, abstractmethod
 from datetime import datetime
 
+import events
+import ids
+
+PAYMENT_METHODS = ("Credit Card", "Cash", "Mobile Wallet")
+
+# Formatted once per receipt with str.format; timestamps use isoformat, which matches
+# "%Y-%m-%d %H:%M:%S" without parsing a strftime pattern every call
+RECEIPT_TEMPLATE = (
+    "RECEIPT\n"
+    "--------\n"
+    "Payment ID: {}\n"
+    "Invoice: {}\n"
+    "Date: {}\n"
+    "Amount: ${:.2f}\n"
+    "Method: {}\n"
+    "Status: {}\n"
+    "--------\n"
+    "Thank you for choosing Royal Stay Hotel!"
+)
+
+
+class GatewayError(Exception):
+    """Transient failure talking to a payment gateway; the charge may be retried."""
+
+
+class PaymentGateway(ABC):
+    """
+    Interface to an external payment processor.
+    
+    Subclasses implement settle(). A gateway is called from several
+    threads at once and must be thread-safe.
+    """
+    
+    @abstractmethod
+    def settle(self, payment):
+        """
+        Capture the amount of a payment.
+        
+        Returns:
+            bool: True if the charge was accepted, False if it was declined
+        
+        Raises:
+            GatewayError: If the gateway could not be reached
+        """
+
+
 class Payment:
     """
     Payment class representing a payment for a booking invoice.
     """
+    __slots__ = ("_payment_id", "_invoice", "_amount", "_payment_method", "_timestamp", "_status")
     
     def __init__(self, invoice, amount, payment_method):
         """Initialize a new Payment instance."""
-        self._payment_id = str(uuid.uuid4())[:8]  # Generate a short unique ID
+        self._payment_id = f"PAY-{ids.next_id('payment')}"
         self._invoice = invoice
         self._amount = amount
         self._payment_method = payment_method
         self._timestamp = datetime.now()
         self._status = "Pending"
     
+    @classmethod
+    def restore(cls, payment_id, invoice, amount, payment_method, timestamp, status):
+        """Recreate a payment, such as one loaded from storage, without processing it."""
+        payment = cls.__new__(cls)  # Skip __init__, which would allocate a new ID
+        payment._payment_id = payment_id
+        payment._invoice = invoice
+        payment._amount = amount
+        payment._payment_method = payment_method
+        payment._timestamp = timestamp
+        payment._status = status
+        return payment
+    
     def get_payment_id(self):
         """Get the payment ID."""
         return self._payment_id
@@ -39,26 +98,54 @@ class Payment:
         """Get the payment status."""
         return self._status
     
-    def process_payment(self):
+    def get_timestamp(self):
+        """Get the time the payment was created."""
+        return self._timestamp
+    
+    def process_payment(self, gateway=None):
         """
-        Process the payment.
+        Process the payment, charging it through a gateway if one is given.
+        
+        The invoice is first brought up to date with its booking, then the
+        amount must cover its balance due. The invoice is claimed before it
+        is charged, so a payment for an invoice that is already paid, or
+        that another payment is charging, fails without being charged.
+        Processing a payment that already completed again, such as on a
+        retry, returns True and changes nothing.
         
         Returns:
             bool: True if payment successful
         """
-        # Check if amount matches invoice
-        if self._amount < self._invoice.get_final_amount():
+        if self._status == "Completed":
+            return True
+        self._invoice.refresh()
+        # Check if amount covers what is still owed
+        if self._amount < self._invoice.get_balance_due():
             self._status = "Failed - Insufficient Amount"
-            return False
-        
         # Process based on payment method
-        if self._payment_method in ["Credit Card", "Cash", "Mobile Wallet"]:
-            self._status = "Completed"
-            self._invoice.set_payment_status("Paid")
-            return True
-        else:
+        elif self._payment_method not in PAYMENT_METHODS:
             self._status = "Failed - Invalid Payment Method"
-            return False
+        else:
+            blocked = self._invoice.reserve_payment()
+            if blocked is not None:
+                self._status = blocked
+            else:
+                try:
+                    self._status = "Completed" if gateway is None else self._settle(gateway)
+                    if self._status == "Completed":
+                        self._invoice.mark_paid()
+                finally:
+                    self._invoice.release_payment()
+        
+        events.publish("payment_processed", self)
+        return self._status == "Completed"
+    
+    def _settle(self, gateway):
+        """Charge the payment through a gateway and return the resulting status."""
+        try:
+            return "Completed" if gateway.settle(self) else "Failed - Declined"
+        except GatewayError:
+            return "Failed - Gateway Error"
     
     def generate_receipt(self):
         """
@@ -67,19 +154,9 @@ class Payment:
         Returns:
             str: Receipt text
         """
-        receipt = (
-            f"RECEIPT\n"
-            f"--------\n"
-            f"Payment ID: {self._payment_id}\n"
-            f"Invoice: {self._invoice.get_invoice_id()}\n"
-            f"Date: {self._timestamp.strftime('%Y-%m-%d %H:%M:%S')}\n"
-            f"Amount: ${self._amount:.2f}\n"
-            f"Method: {self._payment_method}\n"
-            f"Status: {self._status}\n"
-            f"--------\n"
-            f"Thank you for choosing Royal Stay Hotel!"
-        )
-        return receipt
+        return RECEIPT_TEMPLATE.format(self._payment_id, self._invoice.get_invoice_id(),
+                                       self._timestamp.isoformat(" ", "seconds"), self._amount,
+                                       self._payment_method, self._status)
     
     def __str__(self):
         """Return a string representation of the payment."""
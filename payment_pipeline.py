@@ -0,0 +1,196 @@
+"""
+This module contains the PaymentPipeline and FakeGateway classes for the Royal Stay Hotel Management System.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from payment import GatewayError, PaymentGateway
+
+
+def _percentile(ordered, percent):
+    """Get the nearest-rank percentile of an ascending list, or 0.0 if it is empty."""
+    if not ordered:
+        return 0.0
+    rank = max(int(len(ordered) * percent / 100 + 0.5), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class FakeGateway(PaymentGateway):
+    """
+    In-process gateway for tests and load runs.
+
+    Waits latency seconds per charge, raises GatewayError for a
+    failure_rate share of calls and declines a decline_rate share of
+    the rest. Accepted charges are recorded by payment ID.
+    """
+
+    def __init__(self, latency=0.0, failure_rate=0.0, decline_rate=0.0, seed=None):
+        """Initialize a new FakeGateway instance."""
+        self._latency = latency
+        self._failure_rate = failure_rate
+        self._decline_rate = decline_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()  # Guards the random generator and the charge list
+        self._charges = []
+
+    def settle(self, payment):
+        """Capture a payment, failing or declining some at random."""
+        if self._latency:
+            time.sleep(self._latency)
+        with self._lock:
+            roll = self._random.random()
+            if roll < self._failure_rate:
+                raise GatewayError("Gateway timed out")
+            if roll < self._failure_rate + self._decline_rate:
+                return False
+            self._charges.append(payment.get_payment_id())
+        return True
+
+    def get_charges(self):
+        """Get the IDs of all payments charged, in order."""
+        with self._lock:
+            return list(self._charges)
+
+
+class _RetryingGateway(PaymentGateway):
+    """Gateway wrapper retrying transient errors with exponential backoff."""
+
+    def __init__(self, gateway, max_retries, retry_delay):
+        """Initialize a wrapper around gateway."""
+        self._gateway = gateway
+        self._max_retries = max_retries
+        self._retry_delay = retry_delay
+
+    def settle(self, payment):
+        """Capture a payment, retrying GatewayError up to max_retries times."""
+        for attempt in range(self._max_retries + 1):
+            try:
+                return self._gateway.settle(payment)
+            except GatewayError:
+                if attempt == self._max_retries:
+                    raise
+                time.sleep(self._retry_delay * 2 ** attempt)
+
+
+class PaymentPipeline:
+    """
+    Processes batches of payments concurrently through a PaymentGateway.
+
+    Each payment is submitted with an idempotency key. A key still in
+    flight, or among the last max_keys finished, returns the original
+    payment instead of charging again. Payments run on a thread pool and
+    are retried on transient gateway errors. An invoice is charged at most
+    once whatever the keys, as Payment.process_payment claims it before
+    charging and refuses one that is already paid. Latency percentiles
+    cover the last latency_window payments.
+    """
+
+    def __init__(self, gateway, max_workers=16, max_retries=3, retry_delay=0.01,
+                 max_keys=100000, latency_window=10000):
+        """Initialize a new PaymentPipeline instance."""
+        if max_workers <= 0:
+            raise ValueError("Number of workers must be positive")
+        if max_retries < 0:
+            raise ValueError("Number of retries cannot be negative")
+        if max_keys <= 0 or latency_window <= 0:
+            raise ValueError("Number of keys and latency window must be positive")
+        self._gateway = _RetryingGateway(gateway, max_retries, retry_delay)
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="payment")
+        self._lock = threading.Lock()  # Guards the key table and the statistics
+        self._futures = {}  # Idempotency key -> Future of the processed Payment
+        self._finished = deque()  # Keys of finished payments, oldest first, at most max_keys
+        self._max_keys = max_keys
+        self._latencies = deque(maxlen=latency_window)  # Seconds from submit to completion
+        self._processed = 0
+        self._outcomes = {}  # Payment status -> count
+        self._duplicates = 0
+        self._first_submit = None
+        self._last_completion = None
+
+    def submit(self, payment, idempotency_key):
+        """
+        Queue a payment for processing.
+
+        Returns:
+            Future: Resolves to the processed Payment, which is the first
+            payment submitted with this key
+        """
+        with self._lock:
+            future = self._futures.get(idempotency_key)
+            if future is not None:
+                self._duplicates += 1
+                return future
+            if self._first_submit is None:
+                self._first_submit = time.perf_counter()
+            future = self._executor.submit(self._process, payment, idempotency_key, time.perf_counter())
+            self._futures[idempotency_key] = future
+        return future
+
+    def process_batch(self, requests):
+        """
+        Process (idempotency key, payment) pairs and wait for all of them.
+
+        Returns:
+            list: The processed Payment for each request, in order
+        """
+        futures = [self.submit(payment, key) for key, payment in requests]
+        wait(futures)
+        return [future.result() for future in futures]
+
+    def _process(self, payment, idempotency_key, submitted):
+        """Process one payment on a worker thread, record its outcome and forget the oldest keys."""
+        try:
+            payment.process_payment(self._gateway)
+        finally:
+            # Even a gateway failing with an unexpected exception finishes the key, so max_keys holds
+            completed = time.perf_counter()
+            with self._lock:
+                self._finished.append(idempotency_key)
+                while len(self._finished) > self._max_keys:
+                    del self._futures[self._finished.popleft()]
+                self._latencies.append(completed - submitted)
+                self._processed += 1
+                status = payment.get_status()
+                self._outcomes[status] = self._outcomes.get(status, 0) + 1
+                self._last_completion = completed
+        return payment
+
+    def get_stats(self):
+        """
+        Get throughput and latency statistics for processed payments.
+
+        Returns:
+            dict: Counts by status, duplicate submissions, payments per
+            second and p50/p95/p99 latency in seconds over the latency window
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+            processed = self._processed
+            outcomes = dict(self._outcomes)
+            duplicates = self._duplicates
+            elapsed = (self._last_completion - self._first_submit) if processed else 0.0
+        return {
+            "processed": processed,
+            "outcomes": outcomes,
+            "duplicates": duplicates,
+            "throughput": processed / elapsed if elapsed > 0 else 0.0,
+            "p50": _percentile(latencies, 50),
+            "p95": _percentile(latencies, 95),
+            "p99": _percentile(latencies, 99),
+        }
+
+    def close(self):
+        """Wait for queued payments and stop the worker threads."""
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        """Use the pipeline as a context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the pipeline."""
+        self.close()
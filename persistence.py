@@ -0,0 +1,621 @@
+"""
+This module contains the WriteAheadLog and HotelStore classes for the Royal Stay Hotel Management System.
+
+What is stored: rooms with their availability, prices and rate
+calendars, guests and their email changes, bookings with their status
+and services, invoices and payments. Loyalty programs (points and membership level) are only
+captured by snapshots, so changes since the last snapshot are lost on
+recovery. Feedback is not stored at all.
+"""
+
+import gc
+import os
+import pickle
+import struct
+import threading
+import zlib
+
+import events
+import ids
+from availability import night_range
+from booking import Booking, Invoice
+from guest import Guest
+from hotel import Hotel
+from payment import Payment
+from room import in_booking_change
+
+_FRAME_HEADER = struct.Struct("<II")  # Payload length, CRC32 of the payload
+_SEGMENT_PREFIX = "wal-"
+_SNAPSHOT_PREFIX = "snapshot-"
+
+
+def _numbered_files(directory, prefix, suffix):
+    """List (number, path) for files named prefix + number + suffix, in order."""
+    found = []
+    for name in os.listdir(directory):
+        if name.startswith(prefix) and name.endswith(suffix):
+            number = name[len(prefix):len(name) - len(suffix)]
+            if number.isdigit():
+                found.append((int(number), os.path.join(directory, name)))
+    return sorted(found)
+
+
+def _fsync_directory(directory):
+    """Make a rename or file creation in directory durable."""
+    if hasattr(os, "O_DIRECTORY"):
+        fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def _id_number(text_id):
+    """Get the number of an ID such as "PAY-12", or 0 for IDs from before the allocator."""
+    number = text_id.rpartition("-")[2]
+    return int(number) if number.isdigit() else 0
+
+
+class WriteAheadLog:
+    """
+    Append-only log of state change records with batched fsync.
+
+    append() only queues a record in memory and hands back its log
+    sequence number (LSN). A background thread writes everything queued
+    as one checksummed frame and fsyncs once per batch, so the booking
+    hot path never waits for the disk. The log is split into segment
+    files named after the first LSN they hold.
+    """
+
+    def __init__(self, directory, flush_interval=0.05, batch_size=4096):
+        """Initialize a new WriteAheadLog instance."""
+        self._directory = directory
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._pending = []
+        self._next_lsn = 0
+        self._condition = threading.Condition()
+        self._io_lock = threading.Lock()  # Keeps frames in LSN order on disk
+        self._file = None
+        self._thread = None
+        self._closed = True
+
+    @staticmethod
+    def read(directory, start_lsn=0):
+        """
+        Yield (lsn, record) for every durable record at or after start_lsn.
+
+        Reading stops at the first torn or corrupt frame, which can only
+        be the tail of the last segment after a crash.
+        """
+        for _, path in _numbered_files(directory, _SEGMENT_PREFIX, ".log"):
+            with open(path, "rb") as log_file:
+                while True:
+                    header = log_file.read(_FRAME_HEADER.size)
+                    if len(header) < _FRAME_HEADER.size:
+                        break
+                    length, checksum = _FRAME_HEADER.unpack(header)
+                    payload = log_file.read(length)
+                    if len(payload) < length or zlib.crc32(payload) != checksum:
+                        return
+                    first_lsn, records = pickle.loads(payload)
+                    for offset, record in enumerate(records):
+                        if first_lsn + offset >= start_lsn:
+                            yield first_lsn + offset, record
+
+    def open(self, next_lsn):
+        """Start a new segment at next_lsn and start the background flusher."""
+        self._next_lsn = next_lsn
+        self._closed = False
+        self._open_segment(next_lsn)
+        self._thread = threading.Thread(target=self._run, name="wal-flusher", daemon=True)
+        self._thread.start()
+
+    def _open_segment(self, first_lsn):
+        """Open a fresh segment file whose first record is first_lsn."""
+        path = os.path.join(self._directory, f"{_SEGMENT_PREFIX}{first_lsn:020d}.log")
+        self._file = open(path, "ab")
+        _fsync_directory(self._directory)
+
+    def get_next_lsn(self):
+        """Get the LSN the next appended record will receive."""
+        return self._next_lsn
+
+    def append(self, record):
+        """
+        Queue a record for the next batch.
+
+        Returns:
+            int: The record's log sequence number
+        """
+        with self._condition:
+            if self._closed:
+                raise ValueError("Write-ahead log is closed")
+            lsn = self._next_lsn
+            self._next_lsn += 1
+            self._pending.append(record)
+            if len(self._pending) >= self._batch_size:
+                self._condition.notify()
+        return lsn
+
+    def _take_pending(self):
+        """Detach the queued records. Caller holds the condition."""
+        records, self._pending = self._pending, []
+        return self._next_lsn - len(records), records
+
+    def _write_frame(self, first_lsn, records):
+        """Write records as one frame and fsync. Caller holds the IO lock."""
+        if not records:
+            return
+        payload = pickle.dumps((first_lsn, records), pickle.HIGHEST_PROTOCOL)
+        self._file.write(_FRAME_HEADER.pack(len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def flush(self):
+        """Write and fsync every queued record before returning."""
+        with self._io_lock:
+            with self._condition:
+                first_lsn, records = self._take_pending()
+            self._write_frame(first_lsn, records)
+
+    def rotate(self):
+        """
+        Flush and start a new segment.
+
+        Returns:
+            int: The first LSN of the new segment
+        """
+        with self._io_lock:
+            with self._condition:
+                first_lsn, records = self._take_pending()
+                boundary = self._next_lsn
+            self._write_frame(first_lsn, records)
+            self._file.close()
+            self._open_segment(boundary)
+        return boundary
+
+    def _run(self):
+        """Background loop writing one frame per batch or interval."""
+        while True:
+            with self._condition:
+                if not self._closed and len(self._pending) < self._batch_size:
+                    self._condition.wait(self._flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def close(self):
+        """Flush every queued record and stop the background flusher."""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self._file.close()
+
+
+class HotelStore:
+    """
+    Durable home for a Hotel, its guests, bookings, invoices and payments.
+
+    Every state change published through the events module, and every
+    availability, price or rate change of a stored room, is appended to a
+    WriteAheadLog. A rate calendar shared by several rooms stays shared.
+    The nights a booking takes or its cancellation frees are not logged on
+    their own: replaying the booking or cancellation record applies them,
+    so no crash can separate a booking from its nights. snapshot() writes the whole object graph as one pickle
+    and drops the log segments it covers. open() rebuilds the graph from
+    the newest snapshot plus the log tail. Replaying a record is
+    idempotent, so a snapshot taken while bookings continue is still
+    consistent. Loyalty programs are only captured by snapshots.
+    """
+
+    def __init__(self, directory, hotel_name="Royal Stay Hotel", flush_interval=0.05,
+                 batch_size=4096):
+        """Initialize a new HotelStore instance."""
+        os.makedirs(directory, exist_ok=True)
+        self._directory = directory
+        self._hotel_name = hotel_name
+        self._log = WriteAheadLog(directory, flush_interval, batch_size)
+        self._lock = threading.Lock()  # Guards the registries below
+        self._hotel = None
+        self._rooms = {}  # Room number -> Room
+        self._guests = {}  # Guest ID -> Guest
+        self._bookings = {}  # (guest ID, booking ID) -> Booking
+        self._invoice_keys = {}  # Invoice -> (guest ID, booking ID)
+        self._payments = {}  # Payment ID -> Payment
+        self._calendars = {}  # Calendar key -> RateCalendar
+        self._calendar_keys = {}  # RateCalendar -> calendar key
+        self._last_rates = None  # Last rates record, repeated by every room sharing its calendar
+        self._is_open = False
+
+    def open(self):
+        """
+        Recover the stored state and start logging new changes.
+
+        Returns:
+            HotelStore: This store, for chaining
+        """
+        # Recovered changes are not news; other subscribers must not see them as new.
+        # Everything loaded stays reachable, so pause the cyclic collector, which would
+        # otherwise rescan the growing graph many times over.
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            with events.suppressed():
+                start_lsn = self._load_snapshot()
+                next_lsn = start_lsn
+                for lsn, record in WriteAheadLog.read(self._directory, start_lsn):
+                    self._apply(record)
+                    next_lsn = lsn + 1
+        finally:
+            if collecting:
+                gc.enable()
+        for key, booking in self._bookings.items():
+            if booking.get_invoice() is not None:
+                self._invoice_keys[booking.get_invoice()] = key
+        self._advance_ids()
+
+        self._hotel = Hotel(self._hotel_name)
+        for room in self._rooms.values():
+            self._hotel.add_room(room)
+            room.add_listener(self)
+        self._log.open(next_lsn)
+        events.subscribe(self._on_event)
+        self._is_open = True
+        return self
+
+    def close(self):
+        """Stop logging and make every logged change durable."""
+        if not self._is_open:
+            return
+        self._is_open = False
+        events.unsubscribe(self._on_event)
+        for room in self._rooms.values():
+            room.remove_listener(self)
+        self._log.close()
+
+    def __enter__(self):
+        """Open the store for use in a with statement."""
+        return self.open()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Close the store at the end of a with statement."""
+        self.close()
+
+    def get_hotel(self):
+        """Get the stored hotel."""
+        return self._hotel
+
+    def get_guest(self, guest_id):
+        """Get a stored guest by ID, or None."""
+        return self._guests.get(guest_id)
+
+    def get_guests(self):
+        """Get every stored guest."""
+        return list(self._guests.values())
+
+    def get_payments(self):
+        """Get every stored payment."""
+        return list(self._payments.values())
+
+    def add_room(self, room):
+        """Add a room to the hotel and start logging its changes."""
+        with self._lock:
+            self._track_room(room)
+        self._hotel.add_room(room)
+
+    def add_guest(self, guest):
+        """Start storing a guest."""
+        with self._lock:
+            self._track_guest(guest)
+
+    def flush(self):
+        """Make every change logged so far durable before returning."""
+        self._log.flush()
+
+    def snapshot(self):
+        """
+        Write the whole object graph to a snapshot and drop older log segments.
+
+        Bookings and payments are stored as plain tuples rather than pickled
+        objects, which keeps both the file and the reload several times
+        faster for large histories.
+
+        Returns:
+            int: The LSN replay starts from when recovering from this snapshot
+        """
+        boundary = self._log.rotate()
+        with self._lock:
+            rooms = list(self._rooms.values())
+            guests = list(self._guests.values())
+            payments = list(self._payments.values())
+
+        bookings = []
+        for guest in guests:
+            guest_id = guest.get_guest_id()
+            for booking in list(guest.view_history()):
+                invoice = booking.get_invoice()
+                if invoice is not None:
+                    invoice = (invoice.get_total_amount(), invoice.get_discount_applied(),
+                               invoice.get_payment_status(), invoice.get_amount_paid())
+                bookings.append((guest_id, booking.get_booking_id(),
+                                 booking.get_room().get_room_number(), booking.get_check_in(),
+                                 booking.get_check_out(), booking.get_status(),
+                                 list(booking.get_services()), invoice))
+        with self._lock:
+            calendars = dict(self._calendars)
+        state = {
+            "lsn": boundary,
+            "rooms": rooms,
+            "calendars": calendars,  # Pickled with the rooms, so shared calendars stay shared
+            "guests": [(guest.get_guest_id(), guest.get_name(), guest.get_contact_info(),
+                        guest.get_email(), guest.get_loyalty_program()) for guest in guests],
+            "bookings": bookings,
+            "payments": [(payment.get_payment_id(),) + self._invoice_keys[payment.get_invoice()]
+                         + (payment.get_amount(), payment.get_payment_method(),
+                            payment.get_timestamp(), payment.get_status())
+                         for payment in payments],
+        }
+
+        path = os.path.join(self._directory, f"{_SNAPSHOT_PREFIX}{boundary:020d}.pkl")
+        with open(path + ".tmp", "wb") as snapshot_file:
+            pickle.dump(state, snapshot_file, pickle.HIGHEST_PROTOCOL)
+            snapshot_file.flush()
+            os.fsync(snapshot_file.fileno())
+        os.replace(path + ".tmp", path)
+        _fsync_directory(self._directory)
+
+        for lsn, old_path in _numbered_files(self._directory, _SNAPSHOT_PREFIX, ".pkl"):
+            if lsn < boundary:
+                os.remove(old_path)
+        for lsn, old_path in _numbered_files(self._directory, _SEGMENT_PREFIX, ".log"):
+            if lsn < boundary:
+                os.remove(old_path)
+        return boundary
+
+    def _load_snapshot(self):
+        """Load the newest snapshot, returning the LSN to replay from."""
+        snapshots = _numbered_files(self._directory, _SNAPSHOT_PREFIX, ".pkl")
+        if not snapshots:
+            return 0
+        with open(snapshots[-1][1], "rb") as snapshot_file:
+            state = pickle.load(snapshot_file)
+
+        self._rooms = {room.get_room_number(): room for room in state["rooms"]}
+        self._calendars = state.get("calendars", {})
+        self._calendar_keys = {calendar: key for key, calendar in self._calendars.items()}
+        for guest_id, name, contact_info, email, loyalty_program in state["guests"]:
+            guest = Guest(guest_id, name, contact_info, email)
+            guest.set_loyalty_program(loyalty_program)
+            self._guests[guest_id] = guest
+
+        rooms, guests, bookings = self._rooms, self._guests, self._bookings
+        for (guest_id, booking_id, room_number, check_in, check_out,
+             status, services, invoice) in state["bookings"]:
+            guest = guests[guest_id]
+            booking = Booking(booking_id, guest, rooms[room_number], check_in, check_out)
+            booking.set_status(status)
+            for service in services:
+                booking.add_service(service)
+            if invoice is not None:
+                booking.set_invoice(self._restore_invoice(booking_id, *invoice))
+            guest.add_booking(booking)
+            bookings[(guest_id, booking_id)] = booking
+
+        for payment_id, guest_id, booking_id, amount, method, timestamp, status in state["payments"]:
+            invoice = bookings[(guest_id, booking_id)].get_invoice()
+            self._payments[payment_id] = Payment.restore(payment_id, invoice, amount,
+                                                         method, timestamp, status)
+        return state["lsn"]
+
+    def _advance_ids(self):
+        """Keep newly allocated IDs above every ID recovered from storage."""
+        ids.advance("booking", max((booking_id for _, booking_id in self._bookings), default=0))
+        ids.advance("payment", max(map(_id_number, self._payments), default=0))
+        ids.advance("service", max((_id_number(service.get_service_id())
+                                    for booking in self._bookings.values()
+                                    for service in booking.get_services()), default=0))
+
+    @staticmethod
+    def _restore_invoice(booking_id, total_amount, discount, payment_status, amount_paid=None):
+        """Rebuild an invoice from its stored amounts, status and amount paid."""
+        # Same arithmetic as Invoice.apply_discount
+        final_amount = total_amount - (total_amount * discount) / 100 if discount else total_amount
+        return Invoice.restore(booking_id, total_amount, discount, final_amount, payment_status, amount_paid)
+
+    def _apply(self, record):
+        """Replay one log record onto the in-memory object graph."""
+        kind = record[0]
+        if kind == "avail":
+            _, room_number, start, end, is_available = record
+            self._rooms[room_number].get_availability_calendar().set_range(start, end, is_available)
+        elif kind == "booking":
+            _, guest_id, booking_id, room_number, check_in, check_out = record
+            if (guest_id, booking_id) not in self._bookings:
+                guest = self._guests[guest_id]
+                booking = Booking(booking_id, guest, self._rooms[room_number], check_in, check_out)
+                guest.add_booking(booking)
+                self._bookings[(guest_id, booking_id)] = booking
+            if self._bookings[(guest_id, booking_id)].get_status() != "Cancelled":
+                self._rooms[room_number].get_availability_calendar().set_range(
+                    *night_range(check_in, check_out), False)
+        elif kind == "cancel":
+            _, guest_id, booking_id = record
+            booking = self._bookings[(guest_id, booking_id)]
+            if booking.get_status() != "Cancelled":
+                booking.set_status("Cancelled")
+                booking.get_room().get_availability_calendar().set_range(
+                    *night_range(booking.get_check_in(), booking.get_check_out()), True)
+        elif kind == "status":
+            _, guest_id, booking_id, status = record
+            self._bookings[(guest_id, booking_id)].set_status(status)
+        elif kind == "service":
+            _, guest_id, booking_id, service = record
+            booking = self._bookings[(guest_id, booking_id)]
+            known = {existing.get_service_id() for existing in booking.get_services()}
+            if service.get_service_id() not in known:
+                booking.add_service(service)
+        elif kind == "invoice":
+            _, guest_id, booking_id, total_amount, discount, payment_status = record[:6]
+            amount_paid = record[6] if len(record) > 6 else None  # Logs written before it was recorded
+            invoice = self._restore_invoice(booking_id, total_amount, discount, payment_status, amount_paid)
+            self._bookings[(guest_id, booking_id)].set_invoice(invoice)
+        elif kind == "invoice_amounts":
+            _, guest_id, booking_id, total_amount, discount = record
+            self._bookings[(guest_id, booking_id)].get_invoice().update_amounts(total_amount, discount)
+        elif kind == "invoice_status":
+            _, guest_id, booking_id, status = record
+            self._bookings[(guest_id, booking_id)].get_invoice().set_payment_status(status)
+        elif kind == "payment":
+            _, payment_id, guest_id, booking_id, amount, method, timestamp, status = record
+            if payment_id not in self._payments:
+                invoice = self._bookings[(guest_id, booking_id)].get_invoice()
+                self._payments[payment_id] = Payment.restore(payment_id, invoice, amount,
+                                                             method, timestamp, status)
+        elif kind == "price":
+            _, room_number, price = record
+            self._rooms[room_number].set_price_per_night(price)
+        elif kind == "calendar":
+            _, room_number, key, calendar_state = record
+            if calendar_state is not None and key not in self._calendars:
+                self._calendars[key] = pickle.loads(calendar_state)
+                self._calendar_keys[self._calendars[key]] = key
+            self._rooms[room_number].set_rate_calendar(None if key is None else self._calendars[key])
+        elif kind == "rates":
+            _, key, start, rates, rated = record
+            self._calendars[key].set_slice(start, rates, rated)
+        elif kind == "room":
+            room = pickle.loads(record[1])
+            self._rooms.setdefault(room.get_room_number(), room)
+        elif kind == "guest":
+            _, guest_id, name, contact_info, email = record
+            if guest_id not in self._guests:
+                self._guests[guest_id] = Guest(guest_id, name, contact_info, email)
+        elif kind == "email":
+            _, guest_id, email = record
+            self._guests[guest_id].set_email(email)
+
+    def _track_room(self, room):
+        """Log a room the first time the store sees it. Caller holds the lock."""
+        room_number = room.get_room_number()
+        if room_number in self._rooms:
+            return
+        with room.get_lock():
+            # Copy the room now; later changes reach the log through the listener
+            self._log.append(("room", pickle.dumps(room, pickle.HIGHEST_PROTOCOL)))
+            if room.get_rate_calendar() is not None:
+                self._log.append(self._calendar_record(room))
+            room.add_listener(self)
+        self._rooms[room_number] = room
+
+    def _calendar_record(self, room):
+        """Get the record giving a room its rate calendar, keying calendars seen for the first time."""
+        calendar = room.get_rate_calendar()
+        if calendar is None:
+            return ("calendar", room.get_room_number(), None, None)
+        key = self._calendar_keys.get(calendar)
+        if key is not None:
+            return ("calendar", room.get_room_number(), key, None)
+        key = self._calendar_keys[calendar] = len(self._calendars)
+        self._calendars[key] = calendar
+        return ("calendar", room.get_room_number(), key, pickle.dumps(calendar, pickle.HIGHEST_PROTOCOL))
+
+    def _track_guest(self, guest):
+        """Log a guest the first time the store sees it. Caller holds the lock."""
+        guest_id = guest.get_guest_id()
+        if guest_id not in self._guests:
+            self._log.append(("guest", guest_id, guest.get_name(),
+                              guest.get_contact_info(), guest.get_email()))
+            self._guests[guest_id] = guest
+
+    def _booking_key(self, booking):
+        """Get the (guest ID, booking ID) key of a booking."""
+        return booking.get_guest().get_guest_id(), booking.get_booking_id()
+
+    def _on_event(self, event, *args):
+        """Turn a published state change into a log record."""
+        if event == "booking_created":
+            booking = args[0]
+            key = self._booking_key(booking)
+            with self._lock:
+                self._track_guest(booking.get_guest())
+                self._track_room(booking.get_room())
+                self._bookings[key] = booking
+            self._log.append(("booking", key[0], key[1], booking.get_room().get_room_number(),
+                              booking.get_check_in(), booking.get_check_out()))
+        elif event == "booking_cancelled":
+            booking = args[0]
+            key = self._booking_key(booking)
+            if key in self._bookings:
+                self._log.append(("cancel", key[0], key[1]))
+        elif event == "booking_status_changed":
+            booking = args[0]
+            key = self._booking_key(booking)
+            if key in self._bookings:
+                self._log.append(("status", key[0], key[1], booking.get_status()))
+        elif event == "service_added":
+            booking, service = args
+            key = self._booking_key(booking)
+            if key in self._bookings:
+                self._log.append(("service", key[0], key[1], service))
+        elif event == "invoice_generated":
+            booking, invoice = args
+            key = self._booking_key(booking)
+            if key in self._bookings:
+                self._invoice_keys[invoice] = key
+                self._log.append(("invoice", key[0], key[1], invoice.get_total_amount(),
+                                  invoice.get_discount_applied(), invoice.get_payment_status(),
+                                  invoice.get_amount_paid()))
+        elif event == "invoice_updated":
+            booking, invoice = args
+            key = self._invoice_keys.get(invoice)
+            if key is not None:
+                self._log.append(("invoice_amounts", key[0], key[1], invoice.get_total_amount(),
+                                  invoice.get_discount_applied()))
+        elif event == "invoice_status_changed":
+            invoice, status = args
+            key = self._invoice_keys.get(invoice)
+            if key is not None:
+                self._log.append(("invoice_status", key[0], key[1], status))
+        elif event == "guest_email_changed":
+            guest = args[0]
+            if self._guests.get(guest.get_guest_id()) is guest:
+                self._log.append(("email", guest.get_guest_id(), guest.get_email()))
+        elif event == "payment_processed":
+            payment = args[0]
+            key = self._invoice_keys.get(payment.get_invoice())
+            if key is not None:
+                self._payments[payment.get_payment_id()] = payment
+                self._log.append(("payment", payment.get_payment_id(), key[0], key[1],
+                                  payment.get_amount(), payment.get_payment_method(),
+                                  payment.get_timestamp(), payment.get_status()))
+
+    def room_availability_changed(self, room, start, end, is_available):
+        """Log an availability change of a stored room, unless a booking record carries it."""
+        if not in_booking_change():
+            self._log.append(("avail", room.get_room_number(), start, end, is_available))
+
+    def room_price_changed(self, room, old_price, new_price):
+        """Log a price change of a stored room."""
+        self._log.append(("price", room.get_room_number(), new_price))
+
+    def room_rates_changed(self, room, start, end):
+        """Log a new rate calendar of a stored room, or the changed nights of its calendar."""
+        with self._lock:
+            if start is None:
+                record = self._calendar_record(room)
+            else:
+                key = self._calendar_keys.get(room.get_rate_calendar())
+                if key is None:
+                    return
+                record = ("rates", key, start) + room.get_rate_calendar().get_slice(start, end)
+                if record == self._last_rates:
+                    return
+                self._last_rates = record
+            # Appended under the lock, so a new calendar's key is logged before any of its rates
+            self._log.append(record)
@@ -0,0 +1,218 @@
+"""
+This module contains the QuoteEngine class for the Royal Stay Hotel Management System.
+"""
+
+import threading
+from collections import OrderedDict
+
+from guest import LOYALTY_DISCOUNTS
+
+
+def _discounted(amount, percent):
+    """Take a percentage off an amount, with the same arithmetic as Invoice.apply_discount."""
+    return amount - (amount * percent) / 100 if percent else amount
+
+
+class QuoteEngine:
+    """
+    Prices stays per room type, with an LRU cache of recent quotes.
+
+    A quote prices every room of the type for the stay and offers the
+    cheapest: the room charge from the room's rate calendar and flat
+    price, less the loyalty discount of the guest's membership level,
+    which is what Booking.generate_invoice bills for the stay before
+    services. The room's upgrades (Suite.get_upgrades) are listed as
+    extras. Quotes are cached by
+    (room type, first night, nights, loyalty level). The engine listens to
+    its rooms, which pass on the changes of their rate calendars, so a
+    price or rate change drops only the cached quotes of the room's type
+    whose stays overlap the changed nights, however the calendar was
+    assigned or changed. Quotes do not check availability; use
+    Hotel.search for that. Call close() to stop listening.
+    """
+
+    def __init__(self, rooms=(), cache_size=4096):
+        """Initialize a new QuoteEngine over rooms, caching up to cache_size quotes."""
+        if cache_size < 1:
+            raise ValueError("Cache size must be at least 1")
+        self._cache_size = cache_size
+        self._lock = threading.Lock()  # Guards the rooms, cache and counters
+        self._rooms = {}  # Room number -> Room
+        self._types = {}  # Room type -> list of rooms
+        self._cache = OrderedDict()  # (room type, first night, nights, level) -> quote, oldest first
+        self._generation = 0  # Bumped by every invalidation, so stale quotes are not stored
+        self._stored = 0  # Quotes cached so far
+        self._last_invalidation = None  # (room type, start, end, quotes cached) of the last invalidation
+        self._hits = 0
+        self._misses = 0
+        for room in rooms:
+            self.add_room(room)
+
+    @classmethod
+    def from_hotel(cls, hotel, cache_size=4096):
+        """Create a QuoteEngine over every room in a Hotel."""
+        return cls(hotel.get_rooms(), cache_size)
+
+    def close(self):
+        """Stop listening to the rooms."""
+        with self._lock:
+            rooms = list(self._rooms.values())
+        for room in rooms:
+            room.remove_listener(self)
+
+    def add_room(self, room):
+        """Start quoting a room."""
+        with self._lock:
+            room_number = room.get_room_number()
+            if room_number in self._rooms:
+                raise ValueError(f"Room {room_number} already exists")
+            self._rooms[room_number] = room
+            self._types.setdefault(room.get_room_type(), []).append(room)
+            self._invalidate(room.get_room_type())
+        room.add_listener(self)
+
+    def remove_room(self, room_number):
+        """Stop quoting a room."""
+        with self._lock:
+            room = self._rooms.pop(room_number, None)
+            if room is None:
+                raise ValueError(f"Room {room_number} does not exist")
+            self._types[room.get_room_type()].remove(room)
+            if not self._types[room.get_room_type()]:
+                del self._types[room.get_room_type()]
+            self._invalidate(room.get_room_type())
+        room.remove_listener(self)
+
+    def set_room_calendar(self, room_number, calendar):
+        """Give a room its own rate calendar, or None to charge its flat price."""
+        with self._lock:
+            room = self._rooms.get(room_number)
+        if room is None:
+            raise ValueError(f"Room {room_number} does not exist")
+        room.set_rate_calendar(calendar)
+
+    def set_type_calendar(self, room_type, calendar):
+        """Share one rate calendar, or None, between every room of a type."""
+        with self._lock:
+            rooms = list(self._types.get(room_type, ()))
+        if not rooms:
+            raise ValueError(f"Unknown room type: {room_type}")
+        for room in rooms:
+            room.set_rate_calendar(calendar)
+
+    def _invalidate(self, room_type, start=None, end=None):
+        """
+        Drop cached quotes of a room type, only those overlapping the
+        ordinal range [start, end) if given. Caller holds the lock.
+        """
+        self._generation += 1
+        # Rooms sharing a calendar each pass on the same change; scan the cache once for it
+        invalidation = (room_type, start, end, self._stored)
+        if invalidation == self._last_invalidation:
+            return
+        self._last_invalidation = invalidation
+        stale = [key for key in self._cache
+                 if key[0] == room_type and (start is None or (key[1] < end and key[1] + key[2] > start))]
+        for key in stale:
+            del self._cache[key]
+
+    def quote_room(self, room, check_in, check_out, loyalty_level=None):
+        """
+        Price a stay in one room, without the cache.
+
+        Returns:
+            dict: room_type, room_number, nights, room_charge,
+            loyalty_discount (percent), total, and upgrades as (name, price)
+            pairs offered on top
+        """
+        if check_out <= check_in:
+            raise ValueError("Check-out date must be after check-in date")
+        room_charge = room.get_room_charge(check_in, check_out)
+        loyalty_discount = LOYALTY_DISCOUNTS.get(loyalty_level, 0)
+        return {
+            "room_type": room.get_room_type(),
+            "room_number": room.get_room_number(),
+            "nights": (check_out - check_in).days,
+            "room_charge": room_charge,
+            "loyalty_discount": loyalty_discount,
+            "total": _discounted(room_charge, loyalty_discount),
+            "upgrades": tuple(room.get_upgrades()) if hasattr(room, "get_upgrades") else (),
+        }
+
+    def quote(self, room_type, check_in, check_out, loyalty_level=None):
+        """
+        Get the cheapest quote for a stay in a room of a type.
+
+        Returns:
+            dict: The quote_room result of the cheapest room of the type
+        """
+        if check_out <= check_in:
+            raise ValueError("Check-out date must be after check-in date")
+        key = (room_type, check_in.toordinal(), (check_out - check_in).days, loyalty_level)
+        with self._lock:
+            quote = self._cache.get(key)
+            if quote is not None:
+                self._cache.move_to_end(key)
+                self._hits += 1
+                return dict(quote)
+            self._misses += 1
+            rooms = list(self._types.get(room_type, ()))
+            generation = self._generation
+        if not rooms:
+            raise ValueError(f"Unknown room type: {room_type}")
+
+        # Rooms sharing a calendar and flat price have the same room charge; price each pair once
+        charges = {}
+        cheapest, cheapest_charge = None, None
+        for room in rooms:
+            pricing = (room.get_rate_calendar(), room.get_price_per_night())
+            charge = charges.get(pricing)
+            if charge is None:
+                charge = charges[pricing] = room.get_room_charge(check_in, check_out)
+            if cheapest is None or charge < cheapest_charge:
+                cheapest, cheapest_charge = room, charge
+        quote = self.quote_room(cheapest, check_in, check_out, loyalty_level)
+        with self._lock:
+            # A change while pricing may have made this quote stale; serve it but do not keep it
+            if generation == self._generation:
+                self._cache[key] = quote
+                self._stored += 1
+                if len(self._cache) > self._cache_size:
+                    self._cache.popitem(last=False)
+        return dict(quote)
+
+    def get_cache_stats(self):
+        """
+        Get cache statistics.
+
+        Returns:
+            dict: size, capacity, hits and misses
+        """
+        with self._lock:
+            return {"size": len(self._cache), "capacity": self._cache_size,
+                    "hits": self._hits, "misses": self._misses}
+
+    def clear_cache(self):
+        """Drop every cached quote."""
+        with self._lock:
+            self._generation += 1
+            self._cache.clear()
+
+    def room_rates_changed(self, room, start, end):
+        """Drop the cached quotes of the room's type over the changed nights."""
+        with self._lock:
+            self._invalidate(room.get_room_type(), start, end)
+
+    def room_price_changed(self, room, old_price, new_price):
+        """Drop the cached quotes of the room's type."""
+        with self._lock:
+            self._invalidate(room.get_room_type())
+
+    def room_availability_changed(self, room, start, end, is_available):
+        """Ignore availability changes; quotes do not depend on them."""
+
+    def __str__(self):
+        """Return a string representation of the engine."""
+        stats = self.get_cache_stats()
+        return (f"Quote engine: {len(self._rooms)} rooms | Cached quotes: {stats['size']}/{stats['capacity']} | "
+                f"Hits: {stats['hits']} | Misses: {stats['misses']}")
@@ -0,0 +1,183 @@
+"""
+This module contains the RateCalendar class for the Royal Stay Hotel Management System.
+"""
+
+import threading
+from array import array
+
+
+class RateCalendar:
+    """
+    Compact per-day room rates keyed by day ordinal.
+
+    Rates are doubles in an array with a parallel bytearray marking the
+    days that have a rate; a night without one is charged the room's flat
+    price. Bulk updates assign whole slices, and the room charge of a stay
+    is the sum of one slice. Give a calendar to one room for room rates,
+    or share it between the rooms of a type for type rates. Rooms listen
+    to their calendar and pass its changes on to their own listeners as
+    room_rates_changed.
+    """
+    __slots__ = ("_base", "_rates", "_rated", "_listeners", "_lock")
+
+    def __init__(self):
+        """Initialize an empty RateCalendar instance."""
+        self._base = None  # Ordinal of index 0
+        self._rates = array("d")  # Rate per night, 0.0 where none is set
+        self._rated = bytearray()  # 1 where a night has a rate
+        self._listeners = []  # Notified of rate changes
+        self._lock = threading.Lock()  # Guards the arrays
+
+    def _ensure(self, start, end):
+        """Grow the arrays so they cover the ordinals [start, end). Caller holds the lock."""
+        if self._base is None:
+            self._base = start
+        if start < self._base:
+            self._rates[0:0] = array("d", bytes(8 * (self._base - start)))
+            self._rated[0:0] = bytes(self._base - start)
+            self._base = start
+        missing = end - self._base - len(self._rated)
+        if missing > 0:
+            self._rates.extend(array("d", bytes(8 * missing)))
+            self._rated.extend(bytes(missing))
+
+    def _clip(self, start, end):
+        """Clip [start, end) to the covered ordinals, as indexes. Caller holds the lock."""
+        if self._base is None:
+            return 0, 0
+        return max(start - self._base, 0), min(end - self._base, len(self._rated))
+
+    def get_rate(self, date):
+        """Get the rate for the night of a date, or None if it has none."""
+        with self._lock:
+            offset = date.toordinal() - self._base if self._base is not None else -1
+            if not 0 <= offset < len(self._rated) or not self._rated[offset]:
+                return None
+            return self._rates[offset]
+
+    def _assign(self, start, end, price, weekdays):
+        """Set or clear (price None) the nights of [start, end), optionally only on some weekdays."""
+        if end <= start:
+            raise ValueError("End date must be after start date")
+        if price is not None and price < 0:
+            raise ValueError("Price cannot be negative")
+        with self._lock:
+            if price is None:
+                lo, hi = self._clip(start, end)
+            else:
+                self._ensure(start, end)
+                lo, hi = start - self._base, end - self._base
+            if lo < hi:
+                rate, flag = (0.0, 0) if price is None else (float(price), 1)
+                # Ordinal 1 is a Monday, so a night's weekday is (ordinal - 1) % 7
+                firsts = ([lo] if weekdays is None else
+                          sorted({lo + (weekday - (self._base + lo - 1)) % 7 for weekday in weekdays}))
+                step = 1 if weekdays is None else 7
+                for first in firsts:
+                    count = len(range(first, hi, step))
+                    if count:
+                        self._rates[first:hi:step] = array("d", [rate]) * count
+                        self._rated[first:hi:step] = bytes([flag]) * count
+        for listener in self._listeners:
+            listener.rates_changed(self, start, end)
+
+    def set_rates(self, start_date, end_date, price, weekdays=None):
+        """
+        Set the rate of every night from start_date up to end_date.
+
+        Args:
+            start_date: First night
+            end_date: Day after the last night
+            price: Rate per night
+            weekdays: Only nights on these weekdays (Monday is 0), or None for all
+        """
+        self._assign(start_date.toordinal(), end_date.toordinal(), price, weekdays)
+
+    def clear_rates(self, start_date, end_date, weekdays=None):
+        """Remove the rates of the nights from start_date up to end_date, so they use the flat price."""
+        self._assign(start_date.toordinal(), end_date.toordinal(), None, weekdays)
+
+    def get_slice(self, start, end):
+        """
+        Get the stored rates of the ordinals [start, end), as set_slice takes them.
+
+        Returns:
+            tuple: (array of rates, bytes with 1 for each night that has a rate)
+        """
+        rates = array("d", bytes(8 * max(end - start, 0)))
+        rated = bytearray(max(end - start, 0))
+        with self._lock:
+            lo, hi = self._clip(start, end)
+            if lo < hi:
+                offset = self._base + lo - start
+                rates[offset:offset + hi - lo] = self._rates[lo:hi]
+                rated[offset:offset + hi - lo] = self._rated[lo:hi]
+        return rates, bytes(rated)
+
+    def set_slice(self, start, rates, rated):
+        """Overwrite the nights from ordinal start with the result of get_slice, such as one read from a log."""
+        end = start + len(rated)
+        if end <= start:
+            return
+        with self._lock:
+            self._ensure(start, end)
+            lo = start - self._base
+            self._rates[lo:lo + len(rated)] = array("d", rates)
+            self._rated[lo:lo + len(rated)] = rated
+        for listener in self._listeners:
+            listener.rates_changed(self, start, end)
+
+    def get_charge(self, start, nights, default_price):
+        """
+        Get the charge for nights nights from ordinal start.
+
+        Returns:
+            float: Sum of the nightly rates, with default_price for nights without one
+        """
+        if nights <= 0:
+            return nights * default_price
+        with self._lock:
+            lo, hi = self._clip(start, start + nights)
+            if lo >= hi:
+                return nights * default_price
+            rated = self._rated.count(1, lo, hi)
+            total = sum(self._rates[lo:hi])
+        return total + (nights - rated) * default_price
+
+    def count_rated(self):
+        """Get the number of nights that have a rate."""
+        with self._lock:
+            return self._rated.count(1)
+
+    def add_listener(self, listener):
+        """
+        Register a listener for rate changes.
+
+        The listener must provide rates_changed(calendar, start, end), with
+        the changed nights as the ordinal range [start, end).
+        """
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Unregister a previously added listener."""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def __getstate__(self):
+        """Return the picklable state of the calendar, without its lock and listeners."""
+        with self._lock:
+            return {"_base": self._base, "_rates": array("d", self._rates), "_rated": bytearray(self._rated)}
+
+    def __setstate__(self, state):
+        """Restore a pickled calendar and give it a fresh lock."""
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def __str__(self):
+        """Return a string representation of the calendar."""
+        return f"Rate calendar: {self.count_rated()} rated nights"
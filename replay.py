@@ -0,0 +1,389 @@
+"""
+This module contains the WorkloadReplayer class for the Royal Stay Hotel Management System.
+
+A workload is a JSON Lines file with one operation per line, for example:
+
+    {"op": "add_room", "room": 101, "type": "Single", "price": 120.0}
+    {"op": "create_guest", "guest": 7, "name": "Ada Byron", "email": "ada@example.com"}
+    {"op": "search", "check_in": "2026-03-01", "check_out": "2026-03-04", "room_type": "Suite"}
+    {"op": "book", "booking": "b1", "guest": 7, "room_type": "Suite",
+     "check_in": "2026-03-01", "check_out": "2026-03-04"}
+    {"op": "add_service", "booking": "b1", "type": "Spa", "description": "Massage", "charge": 90.0}
+    {"op": "invoice", "booking": "b1"}
+    {"op": "pay", "booking": "b1", "method": "Credit Card"}
+    {"op": "feedback", "booking": "b1", "rating": 5, "comments": "Wonderful"}
+    {"op": "cancel", "booking": "b1"}
+
+Guests and bookings are referred to by keys chosen by the workload; the
+replayer maps them to the objects it creates. A book operation names
+either a room or a room type, in which case any available room of that
+type is taken.
+"""
+
+import gzip
+import json
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+from guest import Guest
+from histogram import LatencyHistogram
+from hotel import Hotel
+from payment import Payment
+from room import SingleRoom, DoubleRoom, Suite
+from services import GuestService, Feedback
+
+OPERATIONS = ("add_room", "create_guest", "search", "book", "cancel", "add_service", "invoice", "pay",
+              "feedback")
+OUTCOMES = ("ok", "rejected", "skipped", "error")
+
+_QUEUE_DEPTH = 1024  # Operations buffered per worker; the reader waits when a worker falls behind
+_BOOK_ATTEMPTS = 3  # Rooms tried when booking by type, in case another thread takes the first
+
+
+@lru_cache(maxsize=4096)
+def _date(text):
+    """Parse an ISO date, caching the few thousand distinct dates of a workload."""
+    return datetime.fromisoformat(text)
+
+
+def read_workload(path):
+    """
+    Read a workload file lazily, gzip-compressed if it ends in ".gz".
+
+    Yields:
+        dict: One operation per non-blank line
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as workload_file:
+        for number, line in enumerate(workload_file, 1):
+            if not line.strip():
+                continue
+            try:
+                operation = json.loads(line)
+            except ValueError as error:
+                raise ValueError(f"{path}:{number}: {error}") from None
+            if operation.get("op") not in OPERATIONS:
+                raise ValueError(f"{path}:{number}: unknown operation {operation.get('op')!r}")
+            yield operation
+
+
+def write_workload(operations, path):
+    """
+    Write operations as a workload file, gzip-compressed if path ends in ".gz".
+
+    Returns:
+        int: Number of operations written
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    count = 0
+    with opener(path, "wt", encoding="utf-8") as workload_file:
+        for count, operation in enumerate(operations, 1):
+            workload_file.write(json.dumps(operation, separators=(", ", ": ")) + "\n")
+    return count
+
+
+def generate_workload(rooms_per_type=10, guests=100, days=30, seed=1, start_date=datetime(2026, 3, 1)):
+    """
+    Generate a synthetic workload. The same arguments always give the same operations.
+
+    Rooms and guests are created first, then each day has searches and
+    bookings, and most stays are invoiced, paid and reviewed or cancelled.
+
+    Yields:
+        dict: Operations in workload order
+    """
+    rng = random.Random(seed)
+    room_types = (("Single", 90.0), ("Double", 150.0), ("Suite", 380.0))
+    for type_number, (room_type, price) in enumerate(room_types):
+        for index in range(rooms_per_type):
+            yield {"op": "add_room", "room": (type_number + 1) * 100 + index + 1, "type": room_type,
+                   "price": price + index % 4 * 10}
+    for guest_id in range(1, guests + 1):
+        yield {"op": "create_guest", "guest": guest_id, "name": f"Guest {guest_id}",
+               "email": f"guest{guest_id}@example.com", "loyalty": guest_id % 3 == 0}
+    arrivals = max(rooms_per_type * len(room_types) // 3, 1)
+    booking_number = 0
+    for day in range(days):
+        for _ in range(arrivals):
+            check_in = start_date + timedelta(days=day + rng.randrange(14))
+            check_out = check_in + timedelta(days=rng.randint(1, 5))
+            stay = {"check_in": check_in.date().isoformat(), "check_out": check_out.date().isoformat()}
+            room_type = room_types[rng.randrange(len(room_types))][0]
+            yield dict(stay, op="search", room_type=room_type)
+            booking_number += 1
+            key = f"b{booking_number}"
+            yield dict(stay, op="book", booking=key, guest=rng.randint(1, guests), room_type=room_type)
+            if rng.random() < 0.1:
+                yield {"op": "cancel", "booking": key}
+                continue
+            if rng.random() < 0.4:
+                yield {"op": "add_service", "booking": key, "type": "Room Service",
+                       "description": "Breakfast", "charge": 25.0}
+            yield {"op": "invoice", "booking": key}
+            yield {"op": "pay", "booking": key, "method": ("Credit Card", "Cash", "Mobile Wallet")[rng.randrange(3)]}
+            if rng.random() < 0.3:
+                yield {"op": "feedback", "booking": key, "rating": rng.randint(1, 5),
+                       "comments": rng.choice(("Lovely stay", "Noisy at night", "Great staff"))}
+
+
+class _WorkerStats:
+    """Latencies and outcomes recorded by one worker."""
+
+    __slots__ = ("latencies", "outcomes")
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self.latencies = {}  # Operation -> LatencyHistogram
+        self.outcomes = {}  # (operation, outcome) -> count
+
+    def record(self, operation, outcome, seconds):
+        """Record one executed operation."""
+        histogram = self.latencies.get(operation)
+        if histogram is None:
+            histogram = self.latencies[operation] = LatencyHistogram()
+        histogram.record(seconds)
+        key = (operation, outcome)
+        self.outcomes[key] = self.outcomes.get(key, 0) + 1
+
+
+class WorkloadReplayer:
+    """
+    Replays a workload against a fresh Hotel and the model classes.
+
+    run() executes operations single-threaded, or spreads them over worker
+    threads. Every operation on a guest or one of their bookings goes to
+    the same worker, so each guest's operations keep their order while
+    different guests run in parallel. Rooms are added by the reading
+    thread before any later operation is handed out. Without a rate,
+    operations run as fast as possible and latency is service time. With
+    a rate, operations arrive on a fixed schedule and latency is measured
+    from the scheduled arrival, so queueing delay under overload shows up
+    in the tail.
+    """
+
+    def __init__(self, hotel_name="Replay Hotel"):
+        """Initialize a new WorkloadReplayer with an empty hotel."""
+        self._hotel = Hotel(hotel_name)
+        self._lock = threading.Lock()  # Guards the key maps
+        self._guests = {}  # Workload guest key -> Guest
+        self._bookings = {}  # Workload booking key -> Booking
+        self._handlers = {operation: getattr(self, f"_do_{operation}") for operation in OPERATIONS}
+
+    def get_hotel(self):
+        """Get the hotel the workload runs against."""
+        return self._hotel
+
+    def _do_add_room(self, operation):
+        """Add a room to the hotel."""
+        room_type, number = operation["type"], operation["room"]
+        price, amenities = operation["price"], operation.get("amenities", [])
+        if room_type == "Single":
+            room = SingleRoom(number, price, amenities, operation.get("bed_type", "Queen"))
+        elif room_type == "Double":
+            room = DoubleRoom(number, price, amenities, operation.get("extra_bed_option", False))
+        elif room_type == "Suite":
+            room = Suite(number, price, amenities, operation.get("suite_type", "Junior"))
+        else:
+            raise ValueError(f"Unknown room type: {room_type}")
+        self._hotel.add_room(room)
+        return "ok"
+
+    def _do_create_guest(self, operation):
+        """Create a guest, enrolled in the loyalty program if asked."""
+        key = operation["guest"]
+        guest = Guest(key, operation.get("name", f"Guest {key}"), operation.get("contact", ""),
+                      operation.get("email", f"guest{key}@example.com"))
+        if operation.get("loyalty"):
+            guest.enroll_in_loyalty_program()
+        with self._lock:
+            self._guests[key] = guest
+        return "ok"
+
+    def _do_search(self, operation):
+        """Search for available rooms."""
+        self._hotel.search(_date(operation["check_in"]), _date(operation["check_out"]),
+                           operation.get("room_type"), max_price=operation.get("max_price"),
+                           limit=operation.get("limit", 10))
+        return "ok"
+
+    def _do_book(self, operation):
+        """Book a given room, or any available room of a type."""
+        guest = self._guests.get(operation["guest"])
+        if guest is None:
+            return "skipped"
+        check_in, check_out = _date(operation["check_in"]), _date(operation["check_out"])
+        booking = None
+        if "room" in operation:
+            room = self._hotel.get_room(operation["room"])
+            booking = room and guest.create_booking(room, check_in, check_out)
+        else:
+            for _ in range(_BOOK_ATTEMPTS):
+                room = self._hotel.find_available_room(check_in, check_out, operation.get("room_type"))
+                if room is None:
+                    break
+                booking = guest.create_booking(room, check_in, check_out)
+                if booking is not None:
+                    break
+        if booking is None:
+            return "rejected"
+        with self._lock:
+            self._bookings[operation["booking"]] = booking
+        return "ok"
+
+    def _booking(self, operation):
+        """Get the booking an operation refers to, or None if it was never made."""
+        return self._bookings.get(operation["booking"])
+
+    def _do_cancel(self, operation):
+        """Cancel a booking."""
+        booking = self._booking(operation)
+        if booking is None:
+            return "skipped"
+        return "ok" if booking.cancel_reservation() else "rejected"
+
+    def _do_add_service(self, operation):
+        """Add a service to a booking."""
+        booking = self._booking(operation)
+        if booking is None:
+            return "skipped"
+        booking.add_service(GuestService(operation["type"], operation.get("description", ""),
+                                         operation.get("charge", 0.0)))
+        return "ok"
+
+    def _do_invoice(self, operation):
+        """Generate a booking's invoice."""
+        booking = self._booking(operation)
+        if booking is None:
+            return "skipped"
+        booking.generate_invoice()
+        return "ok"
+
+    def _do_pay(self, operation):
+        """Pay a booking's invoice, generating it first if needed."""
+        booking = self._booking(operation)
+        if booking is None:
+            return "skipped"
+        invoice = booking.generate_invoice()
+        amount = operation.get("amount", invoice.get_final_amount())
+        payment = Payment(invoice, amount, operation.get("method", "Credit Card"))
+        return "ok" if payment.process_payment() else "rejected"
+
+    def _do_feedback(self, operation):
+        """Submit feedback on a booking."""
+        booking = self._booking(operation)
+        if booking is None:
+            return "skipped"
+        Feedback(booking.get_guest(), booking, operation["rating"], operation.get("comments", ""))
+        return "ok"
+
+    def _execute(self, operation, stats, arrival=None):
+        """Run one operation and record its outcome and latency."""
+        name = operation["op"]
+        started = time.perf_counter() if arrival is None else arrival
+        try:
+            outcome = self._handlers[name](operation)
+        except Exception:
+            outcome = "error"
+        stats.record(name, outcome, time.perf_counter() - started)
+
+    def _worker(self, jobs, stats):
+        """Run operations from a queue until the None sentinel arrives."""
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            operation, arrival = job
+            self._execute(operation, stats, arrival)
+
+    def run(self, operations, threads=1, rate=None):
+        """
+        Replay operations and report throughput and latency per operation.
+
+        Args:
+            operations: Iterable of operation dicts, such as read_workload(path)
+            threads: Number of worker threads; 1 runs on the calling thread
+            rate: Operations per second to start, or None for as fast as possible
+
+        Returns:
+            dict: operations, errors, elapsed seconds, throughput and, per
+            operation, count, throughput, p50/p95/p99/max latency in
+            seconds and counts by outcome
+        """
+        if threads < 1:
+            raise ValueError("Number of threads must be at least 1")
+        if rate is not None and rate <= 0:
+            raise ValueError("Rate must be positive")
+        queues = [queue.Queue(_QUEUE_DEPTH) for _ in range(threads)] if threads > 1 else []
+        worker_stats = [_WorkerStats() for _ in queues]
+        reader_stats = _WorkerStats()  # Operations run on the calling thread, kept apart from the workers'
+        workers = [threading.Thread(target=self._worker, args=(jobs, stats), daemon=True)
+                   for jobs, stats in zip(queues, worker_stats)]
+        for worker in workers:
+            worker.start()
+
+        booking_guests = {}  # Workload booking key -> guest key, for routing
+        started = time.perf_counter()
+        try:
+            for index, operation in enumerate(operations):
+                arrival = None
+                if rate is not None:
+                    arrival = started + index / rate
+                    delay = arrival - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                name = operation["op"]
+                if not queues or name == "add_room":
+                    self._execute(operation, reader_stats, arrival)
+                    continue
+                if name == "book":
+                    booking_guests[operation["booking"]] = operation["guest"]
+                    owner = operation["guest"]
+                elif "booking" in operation:
+                    owner = booking_guests.get(operation["booking"], operation["booking"])
+                else:
+                    owner = operation.get("guest", index)
+                queues[hash(owner) % threads].put((operation, arrival))
+        finally:
+            for jobs in queues:
+                jobs.put(None)
+            for worker in workers:
+                worker.join()
+        elapsed = time.perf_counter() - started
+        return self._report(worker_stats + [reader_stats], elapsed)
+
+    @staticmethod
+    def _report(worker_stats, elapsed):
+        """Merge the workers' statistics into a report."""
+        latencies, outcomes = {}, {}
+        for stats in worker_stats:
+            for name, histogram in stats.latencies.items():
+                latencies.setdefault(name, LatencyHistogram()).merge(histogram)
+            for key, count in stats.outcomes.items():
+                outcomes[key] = outcomes.get(key, 0) + count
+        total = sum(histogram.get_count() for histogram in latencies.values())
+        per_operation = {}
+        for name in OPERATIONS:
+            histogram = latencies.get(name)
+            if histogram is None:
+                continue
+            per_operation[name] = {
+                "count": histogram.get_count(),
+                "throughput": histogram.get_count() / elapsed if elapsed > 0 else 0.0,
+                "p50": histogram.get_quantile(0.50),
+                "p95": histogram.get_quantile(0.95),
+                "p99": histogram.get_quantile(0.99),
+                "max": histogram.get_max(),
+                "outcomes": {outcome: outcomes[name, outcome] for outcome in OUTCOMES
+                             if (name, outcome) in outcomes},
+            }
+        return {
+            "operations": total,
+            "errors": sum(count for (_, outcome), count in outcomes.items() if outcome == "error"),
+            "elapsed": elapsed,
+            "throughput": total / elapsed if elapsed > 0 else 0.0,
+            "per_operation": per_operation,
+        }
@@ -0,0 +1,314 @@
+"""
+This module contains the RevenueReport class for the Royal Stay Hotel Management System.
+"""
+
+import threading
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+import events
+from availability import night_range
+
+SERIES = ("sold", "booked", "invoiced", "paid")  # Rooms sold and the three revenue bases
+
+
+class _Stay:
+    """What one booking contributes to the nightly counters."""
+
+    __slots__ = ("room_type", "start", "end", "nights", "rates", "invoiced", "paid", "active")
+
+    def __init__(self, room_type, start, end, nights, rates):
+        """Initialize a stay over window columns [start, end) of a stay of nights nights."""
+        self.room_type = room_type
+        self.start = start
+        self.end = end
+        self.nights = nights
+        self.rates = rates  # Room charge of each night in columns [start, end)
+        self.invoiced = 0.0  # Invoice final amount per night
+        self.paid = 0.0  # Amount paid on the invoice per night
+        self.active = True  # False once cancelled
+
+
+class RevenueReport:
+    """
+    Nightly rooms sold and revenue per room type, kept up to date by events.
+
+    For every night of the window and every room type the report holds
+    rooms sold and revenue on three bases: booked (the room charge of
+    each night, from the room's rate calendar and flat price), invoiced
+    (invoice final amount spread evenly over the stay) and paid (amount
+    paid on the invoice, spread the same way, so a partially paid invoice
+    counts what was paid). Bookings, cancellations, invoices and
+    payments adjust only the nights of the stay involved. The report
+    listens to its rooms, and a price or rate change reprices the booked
+    nights it covers. Range queries use prefix sums, rebuilt for a series
+    the first time it is queried after a change, so repeated dashboard
+    queries cost O(1). Call close() to stop listening.
+    """
+
+    def __init__(self, rooms, start_date, days, bookings=()):
+        """Initialize a new RevenueReport covering days nights from start_date."""
+        if days <= 0:
+            raise ValueError("Number of days must be positive")
+        self._start = start_date.toordinal()
+        self._days = days
+        self._lock = threading.Lock()  # Guards the counters, prefix sums and stays
+        self._capacity = {}  # Room type -> number of rooms
+        self._room_numbers = {}  # Room number -> room type
+        self._series = {}  # (room type, series) -> nightly values
+        self._prefix = {}  # (room type, series) -> prefix sums, or absent when stale
+        self._stays = {}  # Booking ID -> _Stay
+        self._rooms = {}  # Room number -> Room
+        self._room_stays = {}  # Room number -> stays in that room that cover window nights
+        for room in rooms:
+            self.add_room(room)
+        for booking in bookings:
+            self.add_booking(booking)
+        events.subscribe(self._on_event)
+
+    @classmethod
+    def from_hotel(cls, hotel, start_date, days, bookings=()):
+        """Create a RevenueReport over every room in a Hotel."""
+        return cls(hotel.get_rooms(), start_date, days, bookings)
+
+    def close(self):
+        """Stop following booking, invoice, price and rate changes."""
+        events.unsubscribe(self._on_event)
+        with self._lock:
+            rooms = list(self._rooms.values())
+        for room in rooms:
+            room.remove_listener(self)
+
+    def get_start_date(self):
+        """Get the first night covered by the report."""
+        return datetime.fromordinal(self._start)
+
+    def get_days(self):
+        """Get the number of nights covered by the report."""
+        return self._days
+
+    def get_room_types(self):
+        """Get the room types in the report."""
+        return list(self._capacity)
+
+    def add_room(self, room):
+        """Count a room towards its type's capacity."""
+        with self._lock:
+            room_number = room.get_room_number()
+            if room_number in self._room_numbers:
+                raise ValueError(f"Room {room_number} already exists")
+            self._room_numbers[room_number] = room.get_room_type()
+            self._rooms[room_number] = room
+            self._add_type(room.get_room_type())
+            self._capacity[room.get_room_type()] += 1
+        room.add_listener(self)
+
+    def remove_room(self, room_number):
+        """Stop counting a room towards its type's capacity."""
+        with self._lock:
+            room_type = self._room_numbers.pop(room_number, None)
+            if room_type is None:
+                raise ValueError(f"Room {room_number} does not exist")
+            self._capacity[room_type] -= 1
+            room = self._rooms.pop(room_number)
+        room.remove_listener(self)
+
+    def _add_type(self, room_type):
+        """Create the counters of a room type if it is new. Caller holds the lock."""
+        if room_type not in self._capacity:
+            self._capacity[room_type] = 0
+            for series in SERIES:
+                self._series[room_type, series] = [0] * self._days
+
+    def _apply(self, stay, series, per_night):
+        """Add an amount to every night of a stay in one series. Caller holds the lock."""
+        if not per_night or stay.start >= stay.end:
+            return
+        values = self._series[stay.room_type, series]
+        for column in range(stay.start, stay.end):
+            values[column] += per_night
+        self._prefix.pop((stay.room_type, series), None)
+
+    def _apply_nightly(self, stay, series, amounts, sign):
+        """Add one amount per night of a stay to a series. Caller holds the lock."""
+        values = self._series[stay.room_type, series]
+        for column, amount in zip(range(stay.start, stay.end), amounts):
+            values[column] += sign * amount
+        self._prefix.pop((stay.room_type, series), None)
+
+    def _nightly_rates(self, room, start, end):
+        """Get the room charge of each night in window columns [start, end)."""
+        return tuple(room.get_room_charge(day, day + timedelta(days=1))
+                     for day in map(datetime.fromordinal, range(self._start + start, self._start + end)))
+
+    def _apply_stay(self, stay, sign):
+        """Add or remove everything a stay contributes. Caller holds the lock."""
+        self._apply(stay, "sold", sign)
+        self._apply_nightly(stay, "booked", stay.rates, sign)
+        self._apply(stay, "invoiced", sign * stay.invoiced)
+        self._apply(stay, "paid", sign * stay.paid)
+
+    def add_booking(self, booking):
+        """Count a booking, with its invoice and payment status. Adding a booking twice has no effect."""
+        room = booking.get_room()
+        first, last = night_range(booking.get_check_in(), booking.get_check_out())
+        start = min(max(first - self._start, 0), self._days)
+        end = min(max(last - self._start, 0), self._days)
+        stay = _Stay(room.get_room_type(), start, end, last - first, self._nightly_rates(room, start, end))
+        invoice = booking.get_invoice()
+        if invoice is not None:
+            stay.invoiced = invoice.get_final_amount() / stay.nights
+            stay.paid = invoice.get_amount_paid() / stay.nights
+        stay.active = booking.get_status() != "Cancelled"
+        with self._lock:
+            if booking.get_booking_id() in self._stays:
+                return
+            self._add_type(stay.room_type)
+            self._stays[booking.get_booking_id()] = stay
+            if start < end:
+                self._room_stays.setdefault(room.get_room_number(), []).append(stay)
+            if stay.active:
+                self._apply_stay(stay, 1)
+
+    def _reprice(self, room, start, end):
+        """Recompute the booked nights of a room's stays overlapping ordinals [start, end), or all if None."""
+        if start is None:
+            first, last = 0, self._days
+        else:
+            first, last = max(start - self._start, 0), min(end - self._start, self._days)
+        with self._lock:
+            for stay in self._room_stays.get(room.get_room_number(), ()):
+                if stay.start < last and stay.end > first:
+                    rates = self._nightly_rates(room, stay.start, stay.end)
+                    if stay.active:
+                        self._apply_nightly(stay, "booked", stay.rates, -1)
+                        self._apply_nightly(stay, "booked", rates, 1)
+                    stay.rates = rates
+
+    def _set_active(self, booking_id, active):
+        """Count or stop counting a booking after a status change."""
+        with self._lock:
+            stay = self._stays.get(booking_id)
+            if stay is not None and stay.active != active:
+                stay.active = active
+                self._apply_stay(stay, 1 if active else -1)
+
+    def _set_invoiced(self, booking_id, final_amount, amount_paid):
+        """Replace the invoiced and paid amounts of a booking."""
+        with self._lock:
+            stay = self._stays.get(booking_id)
+            if stay is None:
+                return
+            per_night = final_amount / stay.nights
+            if stay.active:
+                self._apply(stay, "invoiced", per_night - stay.invoiced)
+            stay.invoiced = per_night
+        self._set_paid(booking_id, amount_paid)
+
+    def _set_paid(self, booking_id, amount_paid):
+        """Replace the amount paid on a booking's invoice."""
+        with self._lock:
+            stay = self._stays.get(booking_id)
+            if stay is None:
+                return
+            per_night = amount_paid / stay.nights
+            if stay.active:
+                self._apply(stay, "paid", per_night - stay.paid)
+            stay.paid = per_night
+
+    def _columns(self, start_date, end_date):
+        """Convert a date range to window columns [start, end), clipped to the window."""
+        first, last = night_range(start_date, end_date)
+        return (min(max(first - self._start, 0), self._days),
+                min(max(last - self._start, 0), self._days))
+
+    def _total(self, series, start, end, room_type):
+        """Sum a series over columns [start, end) for one or every room type. Caller holds the lock."""
+        total = 0
+        for each_type in (self._capacity if room_type is None else (room_type,)):
+            key = (each_type, series)
+            if key not in self._series:
+                continue
+            prefix = self._prefix.get(key)
+            if prefix is None:
+                prefix = self._prefix[key] = list(accumulate(self._series[key], initial=0))
+            total += prefix[end] - prefix[start]
+        return total
+
+    def _room_nights(self, start, end, room_type):
+        """Get the rooms available times nights over columns [start, end). Caller holds the lock."""
+        rooms = sum(self._capacity.values()) if room_type is None else self._capacity.get(room_type, 0)
+        return rooms * (end - start)
+
+    def get_rooms_sold(self, start_date, end_date, room_type=None):
+        """Get the room nights sold from start_date up to end_date, for one or every room type."""
+        start, end = self._columns(start_date, end_date)
+        with self._lock:
+            return self._total("sold", start, end, room_type)
+
+    def get_revenue(self, start_date, end_date, room_type=None, basis="booked"):
+        """Get room revenue from start_date up to end_date on a basis: "booked", "invoiced" or "paid"."""
+        if basis not in SERIES[1:]:
+            raise ValueError(f"Unknown revenue basis: {basis}")
+        start, end = self._columns(start_date, end_date)
+        with self._lock:
+            return self._total(basis, start, end, room_type)
+
+    def get_metrics(self, start_date, end_date, room_type=None, basis="booked"):
+        """
+        Get occupancy and revenue metrics from start_date up to end_date.
+
+        Returns:
+            dict: rooms_sold, room_nights, revenue, occupancy_rate (percent),
+            adr (revenue per room sold) and revpar (revenue per room available)
+        """
+        if basis not in SERIES[1:]:
+            raise ValueError(f"Unknown revenue basis: {basis}")
+        start, end = self._columns(start_date, end_date)
+        with self._lock:
+            sold = self._total("sold", start, end, room_type)
+            revenue = self._total(basis, start, end, room_type)
+            room_nights = self._room_nights(start, end, room_type)
+        return {
+            "rooms_sold": sold,
+            "room_nights": room_nights,
+            "revenue": revenue,
+            "occupancy_rate": 100 * sold / room_nights if room_nights else 0.0,
+            "adr": revenue / sold if sold else 0.0,
+            "revpar": revenue / room_nights if room_nights else 0.0,
+        }
+
+    def get_report(self, start_date, end_date, basis="booked"):
+        """Get get_metrics for each room type, keyed by room type."""
+        return {room_type: self.get_metrics(start_date, end_date, room_type, basis)
+                for room_type in self.get_room_types()}
+
+    def room_price_changed(self, room, old_price, new_price):
+        """Reprice the booked nights of the room's stays."""
+        self._reprice(room, None, None)
+
+    def room_rates_changed(self, room, start, end):
+        """Reprice the booked nights of the room's stays over the changed nights."""
+        self._reprice(room, start, end)
+
+    def room_availability_changed(self, room, start, end, is_available):
+        """Ignore availability changes; bookings are counted from booking events."""
+
+    def _on_event(self, event, *args):
+        """Keep the counters in step with bookings, invoices and payments."""
+        if event == "booking_created":
+            self.add_booking(args[0])
+        elif event in ("booking_cancelled", "booking_status_changed"):
+            booking = args[0]
+            self._set_active(booking.get_booking_id(), booking.get_status() != "Cancelled")
+        elif event in ("invoice_generated", "invoice_updated"):
+            booking, invoice = args
+            self._set_invoiced(booking.get_booking_id(), invoice.get_final_amount(), invoice.get_amount_paid())
+        elif event == "invoice_status_changed":
+            invoice, _ = args
+            self._set_paid(invoice.get_booking_id(), invoice.get_amount_paid())
+
+    def __str__(self):
+        """Return a string representation of the report."""
+        return (f"Revenue report: {self.get_start_date():%Y-%m-%d} + {self._days} nights | "
+                f"Room types: {len(self._capacity)} | Bookings: {len(self._stays)}")
@@ -2,12 +2,39 @@
 This module contains the Room class and its subclasses for the Royal Stay Hotel Management System.
 """
 
-from datetime import datetime
+import contextlib
+import threading
+
+from availability import AvailabilityCalendar, night_range
+
+_local = threading.local()  # booking_change() depth of the current thread
+
+
+@contextlib.contextmanager
+def booking_change():
+    """
+    Mark availability changes the current thread makes inside the with
+    block as part of creating or cancelling bookings. The booking records
+    carry those nights, so a HotelStore does not log them on their own.
+    """
+    _local.depth = getattr(_local, "depth", 0) + 1
+    try:
+        yield
+    finally:
+        _local.depth -= 1
+
+
+def in_booking_change():
+    """Check whether the current thread is inside booking_change()."""
+    return getattr(_local, "depth", 0) > 0
+
 
 class Room:
     """
     Base class for all room types in the hotel.
     """
+    __slots__ = ("_room_number", "_room_type", "_price_per_night", "_amenities",
+                 "_availability", "_rate_calendar", "_listeners", "_lock")
     
     def __init__(self, room_number, room_type, price_per_night, amenities):
         """Initialize a new Room instance."""
@@ -15,7 +42,10 @@ class Room:
         self._room_type = room_type
         self._price_per_night = price_per_night
         self._amenities = amenities
-        self._availability = {}  # Dictionary to track availability by date
+        self._availability = AvailabilityCalendar()  # Bitmap of unavailable nights by day ordinal
+        self._rate_calendar = None  # Nightly rates overriding the flat price, if any
+        self._listeners = []  # Indexes notified of availability, price and rate changes
+        self._lock = threading.RLock()  # Guards the calendar so check-and-reserve is atomic
     
     def get_room_number(self):
         """Get the room number."""
@@ -33,7 +63,56 @@ class Room:
         """Set a new price per night for the room."""
         if price < 0:
             raise ValueError("Price cannot be negative")
+        old_price = self._price_per_night
         self._price_per_night = price
+        for listener in self._listeners:
+            listener.room_price_changed(self, old_price, price)
+    
+    def get_rate_calendar(self):
+        """Get the rate calendar of the room, or None if it charges the flat price."""
+        return self._rate_calendar
+    
+    def set_rate_calendar(self, calendar):
+        """
+        Set the rate calendar of the room, or None to charge the flat price every night.
+        
+        The room listens to its calendar, and listeners are told that the
+        rates of every night may have changed.
+        """
+        with self._lock:
+            old_calendar = self._rate_calendar
+            self._rate_calendar = calendar
+        if old_calendar is not None and old_calendar is not calendar:
+            old_calendar.remove_listener(self)
+        if calendar is not None:
+            calendar.add_listener(self)
+        self._notify_rates(None, None)
+    
+    def rates_changed(self, calendar, start, end):
+        """Pass a change in the room's rate calendar on to the room's listeners."""
+        if calendar is self._rate_calendar:
+            self._notify_rates(start, end)
+    
+    def _notify_rates(self, start, end):
+        """Tell every listener that the rates of the ordinals [start, end), or all if None, changed."""
+        for listener in self._listeners:
+            listener.room_rates_changed(self, start, end)
+    
+    def get_room_charge(self, check_in, check_out):
+        """
+        Calculate the room charge for a stay.
+        
+        Nights are counted as Booking.calculate_stay_duration counts them.
+        Each night costs its rate in the rate calendar, or the flat price
+        per night when it has none.
+        
+        Returns:
+            float: Room charge for the stay
+        """
+        nights = (check_out - check_in).days
+        if self._rate_calendar is None:
+            return nights * self._price_per_night
+        return self._rate_calendar.get_charge(check_in.toordinal(), nights, self._price_per_night)
     
     def get_amenities(self):
         """Get the list of amenities."""
@@ -44,19 +123,104 @@ class Room:
         if check_out <= check_in:
             raise ValueError("Check-out date must be after check-in date")
         
-        current_date = check_in
-        while current_date < check_out:
-            date_str = current_date.strftime("%Y-%m-%d")
-            if date_str in self._availability and not self._availability[date_str]:
-                return False
-            current_date = datetime(current_date.year, current_date.month, 
-                                  current_date.day + 1)
-        return True
+        start, end = night_range(check_in, check_out)
+        with self._lock:
+            return self._availability.is_range_available(start, end)
     
     def set_availability(self, date, is_available):
         """Set the availability status for a specific date."""
-        date_str = date.strftime("%Y-%m-%d")
-        self._availability[date_str] = is_available
+        ordinal = date.toordinal()
+        with self._lock:
+            self._availability.set_available(ordinal, is_available)
+            self._notify_availability(ordinal, ordinal + 1, is_available)
+    
+    def set_availability_range(self, check_in, check_out, is_available):
+        """Set the availability status for every night of a stay."""
+        start, end = night_range(check_in, check_out)
+        with self._lock:
+            self._availability.set_range(start, end, is_available)
+            self._notify_availability(start, end, is_available)
+    
+    def reserve(self, check_in, check_out):
+        """
+        Atomically check availability and mark the nights of a stay as taken.
+        
+        Returns:
+            bool: True if the room was free and is now reserved
+        """
+        if check_out <= check_in:
+            raise ValueError("Check-out date must be after check-in date")
+        
+        start, end = night_range(check_in, check_out)
+        with self._lock:
+            if not self._availability.reserve_range(start, end):
+                return False
+            self._notify_availability(start, end, False)
+        return True
+    
+    def release(self, check_in, check_out):
+        """Mark the nights of a stay as available again."""
+        self.set_availability_range(check_in, check_out, True)
+    
+    def get_lock(self):
+        """Get the re-entrant lock that serializes changes to this room."""
+        return self._lock
+    
+    def _notify_availability(self, start, end, is_available):
+        """Tell every listener about an availability change."""
+        for listener in self._listeners:
+            listener.room_availability_changed(self, start, end, is_available)
+    
+    def get_availability_calendar(self):
+        """Get the availability calendar of the room."""
+        return self._availability
+    
+    def set_availability_calendar(self, calendar):
+        """
+        Replace the availability calendar, for example with a shared mapped one.
+        
+        Listeners are not told about the swap, so do this before adding the
+        room to a Hotel or OccupancyMatrix.
+        """
+        with self._lock:
+            self._availability = calendar
+    
+    def add_listener(self, listener):
+        """
+        Register a listener for availability, price and rate changes.
+        
+        The listener must provide room_availability_changed(room, start, end,
+        is_available), room_price_changed(room, old_price, new_price) and
+        room_rates_changed(room, start, end). Rate changes cover the nights
+        of the ordinal range [start, end), or every night when start and end
+        are None, such as when the room gets another rate calendar.
+        """
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+    
+    def remove_listener(self, listener):
+        """Unregister a previously added listener."""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+    
+    def __getstate__(self):
+        """Return the picklable state of the room, without its lock and listeners."""
+        state = {name: getattr(self, name)
+                 for cls in type(self).__mro__ for name in getattr(cls, "__slots__", ())
+                 if name != "_lock"}
+        state["_listeners"] = []
+        return state
+    
+    def __setstate__(self, state):
+        """Restore a pickled room and give it a fresh lock."""
+        self._rate_calendar = None  # Rooms pickled before rate calendars existed have none
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._lock = threading.RLock()
+        if self._rate_calendar is not None:
+            self._rate_calendar.add_listener(self)
     
     def __str__(self):
         """Return a string representation of the room."""
@@ -66,6 +230,7 @@ class Room:
 
 class SingleRoom(Room):
     """Room with a single bed."""
+    __slots__ = ("_bed_type",)
     
     def __init__(self, room_number, price_per_night, amenities, bed_type):
         """Initialize a SingleRoom instance."""
@@ -87,6 +252,7 @@ class SingleRoom(Room):
 
 class DoubleRoom(Room):
     """Room with double beds."""
+    __slots__ = ("_extra_bed_option", "_extra_bed_requested")
     
     def __init__(self, room_number, price_per_night, amenities, extra_bed_option=False):
         """Initialize a DoubleRoom instance."""
@@ -111,6 +277,7 @@ class DoubleRoom(Room):
 
 class Suite(Room):
     """Luxury suite room."""
+    __slots__ = ("_suite_type",)
     
     def __init__(self, room_number, price_per_night, amenities, suite_type):
         """Initialize a Suite instance."""
@@ -0,0 +1,266 @@
+"""
+This module contains the ServiceDispatcher class for the Royal Stay Hotel Management System.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+from histogram import LatencyHistogram
+
+
+class _ServiceType:
+    """Queue, in-flight count and SLA statistics of one service type."""
+
+    __slots__ = ("queue", "queued", "in_flight", "response_times", "wait_times", "sla_target", "breaches")
+
+    def __init__(self):
+        """Initialize an empty service type."""
+        self.queue = []  # Heap of (priority, sequence, GuestService)
+        self.queued = 0  # Requests in the heap that are not cancelled; the rest of the heap is cancelled
+        self.in_flight = 0
+        self.response_times = LatencyHistogram()  # Request to completion
+        self.wait_times = LatencyHistogram()  # Submission to assignment
+        self.sla_target = None  # Seconds from request to completion, if set
+        self.breaches = 0
+
+
+class ServiceDispatcher:
+    """
+    Routes guest service requests to staff through per-type priority queues.
+
+    Each service type has its own heap, ordered by priority (lower first)
+    and then by submission order. Staff members handle the types they are
+    registered for, one request at a time. Submitting to a type whose
+    queue is at max_queue_depth is refused, or waits for room when
+    block=True. Response and wait times are kept per type in fixed-size
+    histograms, so SLA metrics cost the same memory after a million
+    requests as after ten.
+    """
+
+    def __init__(self, max_queue_depth=10000):
+        """Initialize a new ServiceDispatcher instance."""
+        if max_queue_depth <= 0:
+            raise ValueError("Maximum queue depth must be positive")
+        self._max_queue_depth = max_queue_depth
+        self._condition = threading.Condition()  # Guards everything below
+        self._types = {}  # Service type -> _ServiceType
+        self._staff = {}  # Staff ID -> tuple of service types
+        self._assignments = {}  # Staff ID -> service ID being handled
+        self._queued = {}  # Service ID -> (submission time, GuestService), for queued requests
+        self._in_flight = {}  # Service ID -> (GuestService, staff ID)
+        self._sequence = itertools.count()
+
+    def _type(self, service_type):
+        """Get the state of a service type, creating it on first use. Caller holds the lock."""
+        state = self._types.get(service_type)
+        if state is None:
+            state = self._types[service_type] = _ServiceType()
+        return state
+
+    def add_staff(self, staff_id, service_types):
+        """Register a staff member who handles the given service types."""
+        with self._condition:
+            if staff_id in self._staff:
+                raise ValueError(f"Staff member {staff_id} already exists")
+            self._staff[staff_id] = tuple(service_types)
+            for service_type in service_types:
+                self._type(service_type)
+
+    def remove_staff(self, staff_id):
+        """Unregister a staff member. Their current request goes back to the front of its queue."""
+        with self._condition:
+            if self._staff.pop(staff_id, None) is None:
+                raise ValueError(f"Staff member {staff_id} does not exist")
+            service_id = self._assignments.pop(staff_id, None)
+            if service_id is not None:
+                service, _ = self._in_flight.pop(service_id)
+                state = self._types[service.get_service_type()]
+                state.in_flight -= 1
+                service.set_status("Requested")
+                self._enqueue(state, service, -1)
+                self._condition.notify_all()
+
+    def set_sla_target(self, service_type, seconds):
+        """Set the response time a service type should stay within."""
+        with self._condition:
+            self._type(service_type).sla_target = seconds
+
+    def _enqueue(self, state, service, priority):
+        """Push a request onto its type's heap. Caller holds the lock."""
+        heapq.heappush(state.queue, (priority, next(self._sequence), service))
+        state.queued += 1
+        self._queued[service.get_service_id()] = (time.monotonic(), service)
+
+    def _check_not_pending(self, service):
+        """Raise ValueError if a request is already queued or in progress. Caller holds the lock."""
+        service_id = service.get_service_id()
+        if service_id in self._queued or service_id in self._in_flight:
+            raise ValueError(f"Service {service_id} is already queued or in progress")
+
+    def submit(self, service, priority=0, block=False, timeout=None):
+        """
+        Queue a service request. A request that is already queued or in
+        progress is refused with ValueError rather than queued twice.
+
+        Returns:
+            bool: True if queued, False if the queue for its type stayed full
+        """
+        with self._condition:
+            self._check_not_pending(service)
+            state = self._type(service.get_service_type())
+            if state.queued >= self._max_queue_depth:
+                if not block:
+                    return False
+                if not self._condition.wait_for(lambda: state.queued < self._max_queue_depth, timeout):
+                    return False
+                self._check_not_pending(service)  # Another thread may have queued it while we waited
+            self._enqueue(state, service, priority)
+            self._condition.notify_all()
+            return True
+
+    def _next_for(self, service_types):
+        """Pop the most urgent live request of the given types, or None. Caller holds the lock."""
+        best = None
+        for service_type in service_types:
+            queue = self._types[service_type].queue
+            # Drop cancelled requests left at the top of the heap
+            while queue and queue[0][2].get_service_id() not in self._queued:
+                heapq.heappop(queue)
+            if queue and (best is None or queue[0] < best[0]):
+                best = (queue[0], service_type)
+        if best is None:
+            return None
+        _, service_type = best
+        state = self._types[service_type]
+        _, _, service = heapq.heappop(state.queue)
+        state.queued -= 1
+        state.in_flight += 1
+        submitted, _ = self._queued.pop(service.get_service_id())
+        state.wait_times.record(time.monotonic() - submitted)
+        return service
+
+    def assign(self, staff_id, block=False, timeout=None):
+        """
+        Give a staff member the most urgent request they can handle.
+
+        Returns:
+            GuestService: The assigned request, or None if there was none
+        """
+        with self._condition:
+            service_types = self._staff.get(staff_id)
+            if service_types is None:
+                raise ValueError(f"Staff member {staff_id} does not exist")
+            if staff_id in self._assignments:
+                raise ValueError(f"Staff member {staff_id} is already handling a request")
+            service = self._next_for(service_types)
+            if service is None and block:
+                deadline = None if timeout is None else time.monotonic() + timeout
+                while service is None:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                    if staff_id not in self._staff:
+                        return None
+                    service = self._next_for(service_types)
+            if service is None:
+                return None
+            self._assignments[staff_id] = service.get_service_id()
+            self._in_flight[service.get_service_id()] = (service, staff_id)
+            service.set_status("In Progress")
+            self._condition.notify_all()  # Room in the queue for blocked submitters
+            return service
+
+    def complete(self, service_id):
+        """
+        Mark an assigned request completed and free its staff member.
+
+        Returns:
+            GuestService: The completed request
+        """
+        with self._condition:
+            entry = self._in_flight.pop(service_id, None)
+            if entry is None:
+                raise ValueError(f"Service {service_id} is not in progress")
+            service, staff_id = entry
+            del self._assignments[staff_id]
+            service.set_status("Completed")
+            state = self._types[service.get_service_type()]
+            state.in_flight -= 1
+            response_time = (service.get_completion_time() - service.get_request_time()).total_seconds()
+            state.response_times.record(response_time)
+            if state.sla_target is not None and response_time > state.sla_target:
+                state.breaches += 1
+            return service
+
+    def cancel(self, service_id):
+        """
+        Cancel a queued or in-progress request.
+
+        Returns:
+            bool: True if the request was cancelled
+        """
+        with self._condition:
+            if service_id in self._in_flight:
+                service, staff_id = self._in_flight.pop(service_id)
+                del self._assignments[staff_id]
+                self._types[service.get_service_type()].in_flight -= 1
+            elif service_id in self._queued:
+                # The heap entry is dropped when it reaches the top or the heap is compacted
+                _, service = self._queued.pop(service_id)
+                state = self._types[service.get_service_type()]
+                state.queued -= 1
+                self._compact(state)
+                self._condition.notify_all()
+            else:
+                return False
+            service.set_status("Cancelled")
+            return True
+
+    def _compact(self, state):
+        """Rebuild a type's heap without cancelled requests once they fill over half of it. Caller holds the lock."""
+        if len(state.queue) - state.queued > len(state.queue) // 2:
+            state.queue = [entry for entry in state.queue if entry[2].get_service_id() in self._queued]
+            heapq.heapify(state.queue)
+
+    def get_queue_depth(self, service_type=None):
+        """Get the number of queued requests of one type, or of all types."""
+        with self._condition:
+            if service_type is not None:
+                state = self._types.get(service_type)
+                return state.queued if state else 0
+            return len(self._queued)
+
+    def get_in_flight(self):
+        """Get the requests being handled, by staff ID."""
+        with self._condition:
+            return {staff_id: self._in_flight[service_id][0]
+                    for staff_id, service_id in self._assignments.items()}
+
+    def get_sla_metrics(self):
+        """
+        Get queue and response time statistics for each service type.
+
+        Returns:
+            dict: Service type -> dict with queued, in_flight, completed,
+            p50/p95 response and wait times in seconds, and SLA breaches
+        """
+        with self._condition:
+            return {service_type: {
+                "queued": state.queued,
+                "in_flight": state.in_flight,
+                "completed": state.response_times.get_count(),
+                "response_p50": state.response_times.get_quantile(0.50),
+                "response_p95": state.response_times.get_quantile(0.95),
+                "wait_p50": state.wait_times.get_quantile(0.50),
+                "wait_p95": state.wait_times.get_quantile(0.95),
+                "sla_breaches": state.breaches,
+            } for service_type, state in self._types.items()}
+
+    def __str__(self):
+        """Return a string representation of the dispatcher."""
+        with self._condition:
+            return (f"Service dispatcher: {len(self._queued)} queued | {len(self._in_flight)} in progress | "
+                    f"Staff: {len(self._staff)}")
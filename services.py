@@ -2,17 +2,22 @@
 This module contains the GuestService and Feedback classes for the Royal Stay Hotel Management System.
 """
 
-import uuid
+import sys
 from datetime import datetime
 
+import events
+import ids
+
 class GuestService:
     """
     GuestService class representing additional services requested by guests.
     """
+    __slots__ = ("_service_id", "_service_type", "_description", "_charge", "_status",
+                 "_request_time", "_completion_time")
     
     def __init__(self, service_type, description, charge):
         """Initialize a new GuestService instance."""
-        self._service_id = str(uuid.uuid4())[:8]  # Generate a short unique ID
+        self._service_id = f"SRV-{ids.next_id('service')}"
         self._service_type = service_type
         self._description = description
         self._charge = charge
@@ -40,9 +45,17 @@ class GuestService:
         """Get the service status."""
         return self._status
     
+    def get_request_time(self):
+        """Get the time the service was requested."""
+        return self._request_time
+    
+    def get_completion_time(self):
+        """Get the time the service was completed, or None."""
+        return self._completion_time
+    
     def set_status(self, status):
         """Set a new status for the service."""
-        self._status = status
+        self._status = sys.intern(status)
         if status == "Completed":
             self._completion_time = datetime.now()
     
@@ -66,19 +79,38 @@ class Feedback:
     """
     Feedback class representing guest reviews and ratings.
     """
+    __slots__ = ("_feedback_id", "_guest", "_booking", "_rating", "_comments", "_submission_time")
     
     def __init__(self, guest, booking, rating, comments):
         """Initialize a new Feedback instance."""
-        self._feedback_id = f"FB-{booking.get_booking_id()}"
+        self._feedback_id = ids.next_id("feedback")  # Kept as an int; formatted on access
         self._guest = guest
         self._booking = booking
         self._rating = rating
         self._comments = comments
         self._submission_time = datetime.now()
+        events.publish("feedback_submitted", self)
+    
+    @classmethod
+    def restore(cls, feedback_id, guest, booking, rating, comments, submission_time):
+        """
+        Recreate feedback, such as feedback loaded from storage, keeping its ID.
+        
+        Nothing is published, and later feedback gets IDs above the restored one.
+        """
+        feedback = cls.__new__(cls)  # Skip __init__, which would allocate a new ID and publish
+        feedback._feedback_id = int(feedback_id.rpartition("-")[2])
+        feedback._guest = guest
+        feedback._booking = booking
+        feedback._rating = rating
+        feedback._comments = comments
+        feedback._submission_time = submission_time
+        ids.advance("feedback", feedback._feedback_id)
+        return feedback
     
     def get_feedback_id(self):
         """Get the feedback ID."""
-        return self._feedback_id
+        return f"FB-{self._feedback_id}"
     
     def get_guest(self):
         """Get the guest who provided the feedback."""
@@ -96,7 +128,13 @@ class Feedback:
         """Set a new rating."""
         if rating < 1 or rating > 5:
             raise ValueError("Rating must be between 1 and 5")
+        old_rating = self._rating
         self._rating = rating
+        events.publish("feedback_rating_changed", self, old_rating)
+    
+    def get_submission_time(self):
+        """Get the time the feedback was submitted."""
+        return self._submission_time
     
     def get_comments(self):
         """Get the feedback comments."""
@@ -104,7 +142,9 @@ class Feedback:
     
     def set_comments(self, comments):
         """Set new feedback comments."""
+        old_comments = self._comments
         self._comments = comments
+        events.publish("feedback_comments_changed", self, old_comments)
     
     def __str__(self):
         """Return a string representation of the feedback."""
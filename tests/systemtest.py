@@ -3,8 +3,16 @@ Test cases for the Royal Stay Hotel Management System.
 """
 
 from datetime import datetime, timedelta
+import asyncio
+import gzip
+import json
+import random
+import shutil
 import sys
 import os
+import tempfile
+import threading
+from concurrent.futures import wait
 
 # Import the necessary modules
 from room import Room, SingleRoom, DoubleRoom, Suite
@@ -12,6 +20,28 @@ from guest import Guest, LoyaltyProgram
 from booking import Booking, Invoice
 from payment import Payment
 from services import GuestService, Feedback
+from hotel import Hotel
+from occupancy import OccupancyMatrix
+from async_hotel import AsyncHotel
+from availability import AvailabilityCalendar
+from persistence import HotelStore, WriteAheadLog
+from mapped_availability import MappedAvailabilityStore
+from billing import BillingEngine
+from payment_pipeline import PaymentPipeline, FakeGateway
+from ids import IdAllocator, FileIdSource, MemoryIdSource
+from guest_registry import GuestRegistry
+from booking_ledger import BookingLedger
+from loyalty_ledger import LoyaltyLedger
+from service_dispatcher import ServiceDispatcher
+from feedback_analytics import FeedbackAnalytics
+from feedback_search import FeedbackIndex
+import events
+import export
+from revenue_report import RevenueReport
+import instrumentation
+from replay import WorkloadReplayer, generate_workload, read_workload, write_workload
+from rates import RateCalendar
+from quotes import QuoteEngine
 
 def test_guest_account_creation():
     """Test the process of guest account creation."""
@@ -89,6 +119,1135 @@ def test_making_reservation(guest, rooms):
     
     return booking
 
+def test_month_boundary_stay(guest):
+    """Test a stay that crosses a month and year boundary."""
+    print("\n=== Test: Month Boundary Stay ===")
+    
+    # Test Case 1: Book across the end of the year
+    print("\nTest Case 1: Book across the end of the year")
+    room = DoubleRoom(202, 150.0, ["Wi-Fi", "TV"], False)
+    check_in = datetime(2025, 12, 30)
+    check_out = datetime(2026, 1, 2)
+    booking = guest.create_booking(room, check_in, check_out)
+    print(f"Booking successful: {booking}")
+    print(f"Stay duration: {booking.calculate_stay_duration()} nights")
+    
+    # Test Case 2: Check the nights on both sides of the boundary
+    print("\nTest Case 2: Check the nights on both sides of the boundary")
+    print(f"Available Dec 31 - Jan 1: {room.check_availability(datetime(2025, 12, 31), datetime(2026, 1, 1))}")
+    print(f"Available Jan 2 - Jan 5: {room.check_availability(check_out, datetime(2026, 1, 5))}")
+    assert not room.check_availability(datetime(2026, 1, 1), datetime(2026, 1, 3))
+    assert room.check_availability(check_out, datetime(2026, 1, 5))
+    
+    # Test Case 3: Cancel and check the nights are released
+    print("\nTest Case 3: Cancel and check the nights are released")
+    booking.cancel_reservation()
+    print(f"Available after cancellation: {room.check_availability(check_in, check_out)}")
+    assert room.check_availability(check_in, check_out)
+
+def test_hotel_inventory(guest, rooms):
+    """Test the hotel-wide room inventory index."""
+    print("\n=== Test: Hotel Inventory ===")
+    
+    # Test Case 1: Add rooms to the hotel
+    print("\nTest Case 1: Add rooms to the hotel")
+    hotel = Hotel("Royal Stay Hotel")
+    for room in rooms:
+        hotel.add_room(room)
+    hotel.add_room(Suite(302, 450.0, ["Wi-Fi", "Jacuzzi", "Balcony"], "Presidential"))
+    print(hotel)
+    
+    # Test Case 2: Search for free suites with a jacuzzi
+    print("\nTest Case 2: Search for free suites with a jacuzzi")
+    check_in = datetime(2026, 3, 12)
+    check_out = datetime(2026, 3, 19)
+    suites = hotel.search(check_in, check_out, room_type="Suite", amenities=["Jacuzzi"])
+    print(f"Free suites: {[room.get_room_number() for room in suites]}")
+    
+    # Test Case 3: Book a suite and search again
+    print("\nTest Case 3: Book a suite and search again")
+    booking = guest.create_booking(suites[0], check_in, check_out)
+    suites = hotel.search(check_in, check_out, room_type="Suite", amenities=["Jacuzzi"])
+    print(f"Free suites after booking: {[room.get_room_number() for room in suites]}")
+    assert booking.get_room() not in suites
+    
+    # Test Case 4: Cancel and search by price
+    print("\nTest Case 4: Cancel and search by price")
+    booking.cancel_reservation()
+    cheap = hotel.search(check_in, check_out, max_price=320.0)
+    print(f"Free rooms up to $320: {[room.get_room_number() for room in cheap]}")
+    assert booking.get_room() in cheap
+    
+    return hotel
+
+def test_occupancy_matrix(guest, hotel):
+    """Test bulk occupancy queries over the room x date matrix."""
+    print("\n=== Test: Occupancy Matrix ===")
+    
+    # Test Case 1: Build the matrix and book a suite inside its window
+    print("\nTest Case 1: Build the matrix and book a suite inside its window")
+    start = datetime(2026, 6, 1)
+    matrix = OccupancyMatrix.from_hotel(hotel, start, 30)
+    print(matrix)
+    booking = guest.create_booking(hotel.get_room(301), datetime(2026, 6, 3), datetime(2026, 6, 6))
+    
+    # Test Case 2: Free suites per night
+    print("\nTest Case 2: Free suites per night")
+    counts = matrix.free_counts("Suite", start, datetime(2026, 6, 8))
+    print(f"Free suites Jun 1-7: {counts}")
+    
+    # Test Case 3: First free window and batch queries
+    print("\nTest Case 3: First free window and batch queries")
+    check_in, room = matrix.first_free_window("Suite", 5, datetime(2026, 6, 2))
+    print(f"First 5-night suite window: {check_in.strftime('%Y-%m-%d')} in room {room.get_room_number()}")
+    queries = [("Suite", datetime(2026, 6, 4), datetime(2026, 6, 5)),
+               ("Single", datetime(2026, 6, 4), datetime(2026, 6, 5))]
+    print(f"Batch free counts: {matrix.batch_count_free(queries)}")
+    
+    booking.cancel_reservation()
+    print(f"Free suites Jun 1-7 after cancellation: {matrix.free_counts('Suite', start, datetime(2026, 6, 8))}")
+    
+    # Test Case 4: Rooms added while other rooms are being booked keep every row in step
+    print("\nTest Case 4: Rooms added while other rooms are being booked keep every row in step")
+    for use_numpy in (False, None):  # None uses NumPy when it is installed
+        busy = [SingleRoom(number, 80.0, ["Wi-Fi"], "Twin") for number in range(700, 704)]
+        growing = OccupancyMatrix(busy, start, 30, use_numpy=use_numpy)
+        
+        def book(room):
+            for night in range(30):
+                room.reserve(start + timedelta(days=night), start + timedelta(days=night + 1))
+        
+        threads = [threading.Thread(target=book, args=(room,)) for room in busy]
+        for thread in threads:
+            thread.start()
+        for number in range(710, 760):
+            growing.add_room(SingleRoom(number, 80.0, ["Wi-Fi"], "Twin"))
+        for thread in threads:
+            thread.join()
+        counts = growing.free_counts("Single")
+        print(f"{growing} | Free singles per night: {set(counts)}")
+        assert counts == [50] * 30
+
+def test_concurrent_booking():
+    """Stress test one room with bookings and cancellations from many threads."""
+    print("\n=== Test: Concurrent Booking ===")
+    
+    # Test Case 1: Many threads race to book overlapping stays in one room
+    print("\nTest Case 1: Many threads race to book overlapping stays in one room")
+    room = SingleRoom(501, 90.0, ["Wi-Fi"], "Twin")
+    start = datetime(2026, 9, 1)
+    bookings = []
+    bookings_lock = threading.Lock()
+    
+    def book(guest_id):
+        rng = random.Random(guest_id)
+        guest = Guest(guest_id, f"Guest {guest_id}", "555-000-0000", f"guest{guest_id}@example.com")
+        for _ in range(200):
+            check_in = start + timedelta(days=rng.randint(0, 60))
+            booking = guest.create_booking(room, check_in, check_in + timedelta(days=rng.randint(1, 5)))
+            if booking:
+                with bookings_lock:
+                    bookings.append(booking)
+            if booking and rng.random() < 0.3:
+                booking.cancel_reservation()
+    
+    threads = [threading.Thread(target=book, args=(guest_id,)) for guest_id in range(100, 116)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    confirmed = [b for b in bookings if b.get_status() == "Confirmed"]
+    nights = [n for b in confirmed for n in range(b.get_check_in().toordinal(), b.get_check_out().toordinal())]
+    print(f"Bookings made: {len(bookings)} | Still confirmed: {len(confirmed)}")
+    print(f"Double-booked nights: {len(nights) - len(set(nights))}")
+    assert len(nights) == len(set(nights))
+    assert sorted(nights) == list(room.get_availability_calendar().iter_unavailable())
+    
+    # Test Case 2: Many threads cancel the same booking
+    print("\nTest Case 2: Many threads cancel the same booking")
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(confirmed[0].cancel_reservation()))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"Successful cancellations: {results.count(True)}")
+    assert results.count(True) == 1
+
+def test_async_hotel(hotel):
+    """Test the asyncio booking facade with many concurrent coroutines."""
+    print("\n=== Test: Async Hotel ===")
+    
+    async def run():
+        async_hotel = AsyncHotel(hotel, max_concurrency=16)
+        check_in = datetime(2026, 8, 10)
+        check_out = datetime(2026, 8, 14)
+        guests = [Guest(guest_id, f"Guest {guest_id}", "555-000-0000", f"guest{guest_id}@example.com")
+                  for guest_id in range(200, 300)]
+        
+        # Test Case 1: Many coroutines reserve any free room
+        print("\nTest Case 1: Many coroutines reserve any free room")
+        bookings = await asyncio.gather(*(async_hotel.reserve_any(guest, check_in, check_out)
+                                          for guest in guests))
+        made = [booking for booking in bookings if booking]
+        print(f"Reservations made: {len(made)} of {len(hotel)} rooms")
+        assert len(made) == len(hotel)
+        assert len({booking.get_room() for booking in made}) == len(made)
+        
+        # Test Case 2: Invoice and pay asynchronously
+        print("\nTest Case 2: Invoice and pay asynchronously")
+        invoice = await async_hotel.invoice(made[0])
+        payment = await async_hotel.pay(invoice, invoice.get_final_amount(), "Mobile Wallet")
+        print(f"Payment details: {payment}")
+        
+        # Test Case 3: Cancelled reservations do not hold rooms
+        print("\nTest Case 3: Cancelled reservations do not hold rooms")
+        await asyncio.gather(*(async_hotel.cancel(booking) for booking in made))
+        room = hotel.get_room(302)
+        tasks = [asyncio.ensure_future(async_hotel.reserve(guest, room, check_in, check_out))
+                 for guest in guests[:10]]
+        await asyncio.sleep(0)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0.1)
+        print(f"Room 302 available after cancelled tasks: {room.check_availability(check_in, check_out)}")
+        assert room.check_availability(check_in, check_out)
+        
+        # Test Case 4: A room the index wrongly shows as free does not make reserve_any spin
+        print("\nTest Case 4: A room the index wrongly shows as free does not make reserve_any spin")
+        stale_hotel = Hotel("Stale Index Hotel")
+        stale_room = SingleRoom(991, 90.0, ["Wi-Fi"], "Queen")
+        stale_hotel.add_room(stale_room)
+        taken = AvailabilityCalendar()
+        taken.set_range(check_in.toordinal(), check_out.toordinal(), False)
+        stale_room.set_availability_calendar(taken)  # Booked elsewhere; the index was not told
+        stale = AsyncHotel(stale_hotel)
+        booking = await asyncio.wait_for(stale.reserve_any(guests[0], check_in, check_out), timeout=5)
+        print(f"Booking with a stale index: {booking} | Room locks left: {len(stale._room_locks)}")
+        assert booking is None and not stale._room_locks and not async_hotel._room_locks
+    
+    asyncio.run(run())
+
+def test_group_booking(hotel):
+    """Test all-or-nothing group bookings."""
+    print("\n=== Test: Group Booking ===")
+    organizer = Guest(400, "Conference Organizer", "555-222-3333", "events@example.com")
+    check_in = datetime(2026, 10, 5)
+    check_out = datetime(2026, 10, 8)
+    
+    # Test Case 1: Book a block of rooms by type and by room
+    print("\nTest Case 1: Book a block of rooms by type and by room")
+    block = hotel.create_group_booking(organizer, [("Suite", check_in, check_out),
+                                                   ("Suite", check_in, check_out),
+                                                   (hotel.get_room(101), check_in, check_out)])
+    for booking in block:
+        print(f"Block booking: {booking}")
+    
+    # Test Case 2: A block that cannot be fully booked reserves nothing
+    print("\nTest Case 2: A block that cannot be fully booked reserves nothing")
+    free_before = len(hotel.search(datetime(2026, 10, 7), datetime(2026, 10, 9)))
+    failed = hotel.create_group_booking(organizer, [("Double", datetime(2026, 10, 7), datetime(2026, 10, 9)),
+                                                    ("Suite", datetime(2026, 10, 7), datetime(2026, 10, 9))])
+    free_after = len(hotel.search(datetime(2026, 10, 7), datetime(2026, 10, 9)))
+    print(f"Block result: {failed} | Free rooms before: {free_before} | after: {free_after}")
+    assert failed is None and free_before == free_after
+    
+    for booking in block:
+        booking.cancel_reservation()
+
+def test_persistence():
+    """Test recovering hotel state from the write-ahead log and snapshots."""
+    print("\n=== Test: Persistence ===")
+    directory = tempfile.mkdtemp()
+    
+    # Test Case 1: Record bookings, a cancellation and a payment
+    print("\nTest Case 1: Record bookings, a cancellation and a payment")
+    store = HotelStore(directory).open()
+    store.add_room(SingleRoom(601, 120.0, ["Wi-Fi"], "King"))
+    store.add_room(Suite(602, 380.0, ["Wi-Fi", "Jacuzzi"], "Junior"))
+    guest = Guest(600, "Ada Lovelace", "555-600-0000", "ada@example.com")
+    first = guest.create_booking(store.get_hotel().get_room(601), datetime(2026, 7, 1), datetime(2026, 7, 4))
+    second = guest.create_booking(store.get_hotel().get_room(602), datetime(2026, 7, 1), datetime(2026, 7, 2))
+    second.cancel_reservation()
+    invoice = first.generate_invoice()
+    Payment(invoice, invoice.get_final_amount(), "Credit Card").process_payment()
+    store.close()
+    
+    # Test Case 2: Recover from the log alone
+    print("\nTest Case 2: Recover from the log alone")
+    store = HotelStore(directory).open()
+    recovered = store.get_guest(600)
+    for booking in recovered.view_history():
+        print(f"Recovered: {booking}")
+    print(f"Recovered invoice: {recovered.view_history()[0].get_invoice()}")
+    room = store.get_hotel().get_room(601)
+    assert not room.check_availability(datetime(2026, 7, 1), datetime(2026, 7, 4))
+    assert recovered.view_history()[1].get_status() == "Cancelled"
+    
+    # Test Case 3: Snapshot, book again, and recover
+    print("\nTest Case 3: Snapshot, book again, and recover")
+    store.snapshot()
+    recovered.create_booking(store.get_hotel().get_room(602), datetime(2026, 7, 10), datetime(2026, 7, 12))
+    store.close()
+    store = HotelStore(directory).open()
+    print(f"Bookings after snapshot recovery: {len(store.get_guest(600).view_history())}")
+    print(f"Payments recovered: {[payment.get_status() for payment in store.get_payments()]}")
+    assert len(store.get_guest(600).view_history()) == 3
+    store.close()
+    
+    # Test Case 4: Recovery does not publish the recovered changes
+    print("\nTest Case 4: Recovery does not publish the recovered changes")
+    heard = []
+    listener = lambda event, *args: heard.append(event)
+    events.subscribe(listener)
+    try:
+        store = HotelStore(directory).open()
+    finally:
+        events.unsubscribe(listener)
+    print(f"Events published during recovery: {heard}")
+    assert heard == []
+    store.close()
+    shutil.rmtree(directory)
+    
+    # Test Case 5: Bookings carry their nights, and partly paid invoices keep what was paid
+    print("\nTest Case 5: Bookings carry their nights, and partly paid invoices keep what was paid")
+    directory = tempfile.mkdtemp()
+    store = HotelStore(directory).open()
+    store.add_room(SingleRoom(603, 100.0, ["Wi-Fi"], "Queen"))
+    room = store.get_hotel().get_room(603)
+    stay = guest.create_booking(room, datetime(2026, 8, 1), datetime(2026, 8, 3))
+    guest.create_booking(room, datetime(2026, 8, 5), datetime(2026, 8, 6)).cancel_reservation()
+    room.set_availability(datetime(2026, 8, 10), False)  # Maintenance, not a booking
+    invoice = stay.generate_invoice()
+    Payment(invoice, invoice.get_final_amount(), "Cash").process_payment()
+    stay.add_service(GuestService("Spa", "Massage", 50.0))
+    stay.generate_invoice()
+    store.close()
+    kinds = [record[0] for _, record in WriteAheadLog.read(directory)]
+    print(f"Logged records: {kinds}")
+    assert kinds.count("avail") == 1 and "cancel" in kinds
+    store = HotelStore(directory).open()
+    room = store.get_hotel().get_room(603)
+    recovered = [booking for booking in store.get_guest(600).view_history() if booking.get_room() is room]
+    print(f"Recovered invoice: {recovered[0].get_invoice()} | Balance due: {recovered[0].get_invoice().get_balance_due()}")
+    assert not room.check_availability(datetime(2026, 8, 1), datetime(2026, 8, 3))
+    assert room.check_availability(datetime(2026, 8, 5), datetime(2026, 8, 6))
+    assert not room.check_availability(datetime(2026, 8, 10), datetime(2026, 8, 11))
+    assert recovered[0].get_invoice().get_payment_status() == "Partially Paid"
+    assert recovered[0].get_invoice().get_balance_due() == 50.0
+    store.close()
+    shutil.rmtree(directory)
+
+def test_mapped_availability():
+    """Test sharing room availability through a memory-mapped file."""
+    print("\n=== Test: Mapped Availability ===")
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "availability.bin")
+    
+    # Test Case 1: One worker books a room through the shared file
+    print("\nTest Case 1: One worker books a room through the shared file")
+    first_worker = MappedAvailabilityStore(path, datetime(2026, 1, 1), 365, 100)
+    room = DoubleRoom(701, 160.0, ["Wi-Fi"], True)
+    first_worker.attach(room)
+    guest = Guest(700, "Grace Hopper", "555-700-0000", "grace@example.com")
+    booking = guest.create_booking(room, datetime(2026, 4, 29), datetime(2026, 5, 2))
+    print(f"Booking successful: {booking}")
+    
+    # Test Case 2: Another worker sees the booking without rebuilding anything
+    print("\nTest Case 2: Another worker sees the booking without rebuilding anything")
+    second_worker = MappedAvailabilityStore(path)
+    same_room = DoubleRoom(701, 160.0, ["Wi-Fi"], True)
+    second_worker.attach(same_room)
+    print(f"Rooms in file: {second_worker.get_room_count()}")
+    print(f"Available Apr 30 - May 1 in second worker: {same_room.check_availability(datetime(2026, 4, 30), datetime(2026, 5, 1))}")
+    assert not same_room.check_availability(datetime(2026, 4, 30), datetime(2026, 5, 1))
+    assert Guest(701, "Alan Turing", "555-701-0000", "alan@example.com").create_booking(
+        same_room, datetime(2026, 5, 1), datetime(2026, 5, 3)) is None
+    
+    # Test Case 3: A cancellation in one worker frees the nights in the other
+    print("\nTest Case 3: A cancellation in one worker frees the nights in the other")
+    booking.cancel_reservation()
+    print(f"Available after cancellation: {same_room.check_availability(datetime(2026, 4, 29), datetime(2026, 5, 2))}")
+    assert same_room.check_availability(datetime(2026, 4, 29), datetime(2026, 5, 2))
+    
+    second_worker.close()
+    first_worker.close()
+    shutil.rmtree(directory)
+
+def test_batch_invoicing(hotel):
+    """Test invoicing many bookings at once for the night audit."""
+    print("\n=== Test: Batch Invoicing ===")
+    gold_guest = Guest(800, "Frequent Traveller", "555-800-0000", "frequent@example.com")
+    gold_guest.enroll_in_loyalty_program()
+    gold_guest.get_loyalty_program().earn_points(600)
+    regular_guest = Guest(801, "First Visit", "555-801-0000", "first@example.com")
+    bookings = []
+    for index, room in enumerate(hotel.get_rooms()):
+        guest = gold_guest if index % 2 else regular_guest
+        check_in = datetime(2026, 11, 1) + timedelta(days=index % 5)
+        booking = guest.create_booking(room, check_in, check_in + timedelta(days=1 + index % 3))
+        if index % 3 == 0:
+            booking.add_service(GuestService("Minibar", "Snacks", 12.35))
+        bookings.append(booking)
+    
+    # Test Case 1: Batch amounts match the per-booking invoices exactly
+    print("\nTest Case 1: Batch amounts match the per-booking invoices exactly")
+    batch = BillingEngine().compute(bookings)
+    print(f"Batch computed: {batch}")
+    expected = [Booking(booking.get_booking_id(), booking.get_guest(), booking.get_room(),
+                        booking.get_check_in(), booking.get_check_out()) for booking in bookings]
+    for copy, booking in zip(expected, bookings):
+        for service in booking.get_services():
+            copy.add_service(service)
+    for invoice, copy in zip(batch.to_invoices(), expected):
+        assert invoice.get_final_amount() == copy.generate_invoice().get_final_amount()
+        assert invoice.get_discount_applied() == copy.generate_invoice().get_discount_applied()
+    print(f"Matched {len(expected)} per-booking invoices")
+    
+    # Test Case 2: Attach the batch invoices to their bookings
+    print("\nTest Case 2: Attach the batch invoices to their bookings")
+    invoices = batch.to_invoices()
+    for booking, invoice in zip(bookings, invoices):
+        booking.set_invoice(invoice)
+    print(f"First invoice: {invoices[0]}")
+    assert all(booking.generate_invoice() is invoice and not invoice.is_stale()
+               for booking, invoice in zip(bookings, invoices))
+    
+    for booking in bookings:
+        booking.cancel_reservation()
+
+def test_incremental_invoice(hotel):
+    """Test that invoices follow services, price and loyalty changes."""
+    print("\n=== Test: Incremental Invoice ===")
+    guest = Guest(900, "Late Checkout", "555-900-0000", "late@example.com")
+    room = hotel.get_room(101)
+    booking = guest.create_booking(room, datetime(2026, 12, 1), datetime(2026, 12, 4))
+    invoice = booking.generate_invoice()
+    print(f"Invoice generated: {invoice}")
+    
+    # Test Case 1: A service added after invoicing shows up on the same invoice
+    print("\nTest Case 1: A service added after invoicing shows up on the same invoice")
+    total_before = invoice.get_total_amount()
+    booking.add_service(GuestService("Spa", "Massage", 90.0))
+    assert booking.generate_invoice() is invoice
+    print(f"Updated invoice: {invoice}")
+    assert invoice.get_total_amount() == total_before + 90.0
+    
+    # Test Case 2: Room price and loyalty level changes update the invoice
+    print("\nTest Case 2: Room price and loyalty level changes update the invoice")
+    price = room.get_price_per_night()
+    room.set_price_per_night(price + 10)
+    guest.enroll_in_loyalty_program()
+    guest.get_loyalty_program().earn_points(150)
+    booking.generate_invoice()
+    print(f"Updated invoice: {invoice}")
+    assert invoice.get_total_amount() == total_before + 90.0 + 30
+    assert invoice.get_discount_applied() == 5
+    
+    # Test Case 3: Services added from many threads are all kept
+    print("\nTest Case 3: Services added from many threads are all kept")
+    busy = Booking(99001, guest, room, datetime(2027, 1, 1), datetime(2027, 1, 2))
+    workers = [threading.Thread(target=lambda: [busy.add_service(GuestService("Housekeeping", "Towels", 1.0))
+                                                for _ in range(200)])
+               for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    print(f"Services: {len(busy.get_services())} | Charges: {busy.get_service_charges()}")
+    assert isinstance(busy.get_services(), tuple) and len(busy.get_services()) == 1600
+    assert busy.get_service_charges() == 1600.0
+    
+    # Test Case 4: A paid invoice that grows is reopened for the difference
+    print("\nTest Case 4: A paid invoice that grows is reopened for the difference")
+    paid_booking = Guest(901, "Paid Up", "555-901-0000", "paid@example.com").create_booking(
+        room, datetime(2027, 2, 1), datetime(2027, 2, 3))
+    paid_invoice = paid_booking.generate_invoice()
+    assert Payment(paid_invoice, paid_invoice.get_final_amount(), "Cash").process_payment()
+    paid_booking.add_service(GuestService("Minibar", "Snacks", 50.0))
+    print(f"Stale after adding a service: {paid_invoice.is_stale()}")
+    assert paid_invoice.is_stale() and paid_invoice.get_payment_status() == "Paid"
+    short = Payment(paid_invoice, 10.0, "Cash")
+    assert not short.process_payment()
+    print(f"After refresh: {paid_invoice} | Balance due: {paid_invoice.get_balance_due()}")
+    assert not paid_invoice.is_stale()
+    assert paid_invoice.get_payment_status() == "Partially Paid" and paid_invoice.get_balance_due() == 50.0
+    assert Payment(paid_invoice, 50.0, "Cash").process_payment()
+    assert paid_invoice.get_payment_status() == "Paid" and paid_invoice.get_balance_due() == 0
+    paid_booking.cancel_reservation()
+    
+    room.set_price_per_night(price)
+    booking.cancel_reservation()
+
+def test_payment_pipeline():
+    """Test concurrent batch payments with idempotency keys."""
+    print("\n=== Test: Payment Pipeline ===")
+    invoices = [Invoice(booking_id, 120.0) for booking_id in range(1, 201)]
+    gateway = FakeGateway(failure_rate=0.1, seed=7)
+    
+    # Test Case 1: Process a batch that contains retried requests
+    print("\nTest Case 1: Process a batch that contains retried requests")
+    requests = [(f"settle-{index}", Payment(invoice, 120.0, "Credit Card"))
+                for index, invoice in enumerate(invoices)]
+    requests += requests[:20]
+    with PaymentPipeline(gateway, max_workers=8, retry_delay=0) as pipeline:
+        payments = pipeline.process_batch(requests)
+        stats = pipeline.get_stats()
+    print(f"Processed: {stats['processed']} | Duplicates: {stats['duplicates']} | Outcomes: {stats['outcomes']}")
+    print(f"Throughput: {stats['throughput']:.0f}/s | p95 latency: {stats['p95'] * 1000:.2f} ms")
+    assert stats["processed"] == 200 and stats["duplicates"] == 20
+    assert payments[200] is payments[0]
+    
+    # Test Case 2: Every invoice is paid, and charged, exactly once
+    print("\nTest Case 2: Every invoice is paid, and charged, exactly once")
+    paid = sum(1 for invoice in invoices if invoice.get_payment_status() == "Paid")
+    print(f"Invoices paid: {paid} | Gateway charges: {len(gateway.get_charges())}")
+    assert paid == len(gateway.get_charges()) == stats["outcomes"].get("Completed")
+    
+    # Test Case 3: New keys for paid invoices charge nothing, and old keys are forgotten
+    print("\nTest Case 3: New keys for paid invoices charge nothing, and old keys are forgotten")
+    charged = len(gateway.get_charges())
+    paid_invoices = [invoice for invoice in invoices if invoice.get_payment_status() == "Paid"][:50]
+    with PaymentPipeline(gateway, max_workers=8, retry_delay=0, max_keys=10, latency_window=20) as pipeline:
+        repeats = pipeline.process_batch([(f"{key}-{invoice.get_invoice_id()}", Payment(invoice, 120.0, "Credit Card"))
+                                          for key in ("again", "once-more") for invoice in paid_invoices])
+        stats = pipeline.get_stats()
+        remembered = len(pipeline._futures)
+    print(f"Statuses: {set(payment.get_status() for payment in repeats)} | New charges: {len(gateway.get_charges()) - charged}")
+    print(f"Processed: {stats['processed']} | Keys remembered: {remembered}")
+    assert all(payment.get_status() == "Failed - Already Paid" for payment in repeats)
+    assert len(gateway.get_charges()) == charged
+    assert stats["processed"] == 100 and remembered == 10
+    
+    # Test Case 4: Retrying a completed payment keeps it completed, and crashing gateways still free keys
+    print("\nTest Case 4: Retrying a completed payment keeps it completed, and crashing gateways still free keys")
+    completed = next(payment for payment in payments if payment.get_status() == "Completed")
+    assert completed.process_payment() and completed.get_status() == "Completed"
+    class CrashingGateway(FakeGateway):
+        def settle(self, payment):
+            raise RuntimeError("Gateway bug")
+    with PaymentPipeline(CrashingGateway(), max_workers=2, retry_delay=0, max_keys=2) as pipeline:
+        futures = [pipeline.submit(Payment(Invoice(booking_id, 50.0), 50.0, "Cash"), f"crash-{booking_id}")
+                   for booking_id in range(300, 306)]
+        wait(futures)
+        remembered = len(pipeline._futures)
+    print(f"Failed with exceptions: {sum(1 for future in futures if future.exception())} | Keys remembered: {remembered}")
+    assert all(future.exception() for future in futures) and remembered == 2
+
+def test_id_allocator(guest, booking):
+    """Test that IDs are unique across guests, threads and allocators."""
+    print("\n=== Test: ID Allocator ===")
+    
+    # Test Case 1: Booking, payment and service IDs no longer repeat across guests
+    print("\nTest Case 1: Booking, payment and service IDs no longer repeat across guests")
+    other_guest = Guest(950, "Second Guest", "555-950-0000", "second@example.com")
+    other_booking = other_guest.create_booking(Room(950, "Standard", 90.0, []),
+                                               datetime(2026, 6, 1), datetime(2026, 6, 2))
+    print(f"Booking IDs: {booking.get_booking_id()} and {other_booking.get_booking_id()}")
+    print(f"Payment IDs: {Payment(None, 0, 'Cash').get_payment_id()} and {Payment(None, 0, 'Cash').get_payment_id()}")
+    assert other_booking.get_booking_id() != booking.get_booking_id()
+    assert GuestService("A", "B", 0).get_service_id() != GuestService("A", "B", 0).get_service_id()
+    
+    # Test Case 2: Allocators sharing a file never hand out the same ID
+    print("\nTest Case 2: Allocators sharing a file never hand out the same ID")
+    directory = tempfile.mkdtemp()
+    source = FileIdSource(os.path.join(directory, "ids.json"))
+    allocators = [IdAllocator(source, "booking", block_size=16) for _ in range(4)]
+    allocated = []
+    def allocate(allocator):
+        allocated.extend(allocator.next_id() for _ in range(1000))
+    workers = [threading.Thread(target=allocate, args=(allocator,)) for allocator in allocators]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    print(f"Allocated: {len(allocated)} | Unique: {len(set(allocated))}")
+    assert len(set(allocated)) == 4000
+    shutil.rmtree(directory)
+    
+    # Test Case 3: Advancing an allocator while other threads draw IDs never repeats one
+    print("\nTest Case 3: Advancing an allocator while other threads draw IDs never repeats one")
+    allocator = IdAllocator(MemoryIdSource(), "payment", block_size=256)
+    allocated = []
+    def draw():
+        allocated.extend(allocator.next_id() for _ in range(5000))
+    workers = [threading.Thread(target=draw) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for minimum in range(0, 20000, 50):
+        allocator.advance(minimum)
+    for worker in workers:
+        worker.join()
+    print(f"Allocated: {len(allocated)} | Unique: {len(set(allocated))}")
+    assert len(set(allocated)) == 20000 and allocator.next_id() > 19950
+
+def test_guest_registry(guest):
+    """Test looking guests up by ID, email, name prefix and loyalty level."""
+    print("\n=== Test: Guest Registry ===")
+    registry = GuestRegistry([guest,
+                              Guest(1001, "Johanna Smith", "555-100-1001", "johanna@example.com"),
+                              Guest(1002, "Jon Snow", "555-100-1002", "jon@example.com"),
+                              Guest(1003, "Mary Jones", "555-100-1003", "mary@example.com")])
+    
+    # Test Case 1: Look guests up by ID, email and name prefix
+    print("\nTest Case 1: Look guests up by ID, email and name prefix")
+    print(f"By ID: {registry.get_guest(1002)}")
+    print(f"By email: {registry.find_by_email('MARY@example.com')[0]}")
+    matches = [match.get_name() for match in registry.search_by_name("jo")]
+    print(f"Names starting with 'jo': {matches}")
+    assert matches == ["Johanna Smith", "John Smith", "Jon Snow"]
+    
+    # Test Case 2: Email and loyalty changes update the indexes
+    print("\nTest Case 2: Email and loyalty changes update the indexes")
+    snow = registry.get_guest(1002)
+    snow.set_email("lord.commander@example.com")
+    snow.enroll_in_loyalty_program()
+    snow.get_loyalty_program().earn_points(150)
+    print(f"Old email finds: {registry.find_by_email('jon@example.com')}")
+    print(f"New email finds: {registry.find_by_email('lord.commander@example.com')[0]}")
+    print(f"Guests by level: {registry.count_by_level()}")
+    assert registry.get_guests_by_level("Silver") == [snow]
+    
+    # Test Case 3: Repeated bulk loads merge into the name index
+    print("\nTest Case 3: Repeated bulk loads merge into the name index")
+    rng = random.Random(14)
+    for batch in range(3):
+        registry.add_guests([Guest(20000 + 3000 * batch + number, f"Guest {rng.randrange(10 ** 6):06d}",
+                                   "555-000-0000", f"bulk{batch}-{number}@example.com")
+                             for number in range(3000)])
+    entries = registry._names.entries()
+    largest = max(len(block) for block in registry._names._blocks)
+    print(f"Guests: {len(registry)} | Name blocks: {len(registry._names._blocks)} | Largest block: {largest}")
+    assert entries == sorted(entries) and len(entries) == len(registry) == 9004 and largest <= 2048
+    assert all(match.get_name().startswith("Guest 12")
+               for match in registry.search_by_name("guest 12", limit=50))
+    registry.close()
+
+def test_booking_ledger(hotel):
+    """Test hotel-wide booking history and arrivals by date."""
+    print("\n=== Test: Booking Ledger ===")
+    ledger = BookingLedger()
+    traveller = Guest(1100, "Road Warrior", "555-110-0000", "road@example.com")
+    bookings = [traveller.create_booking(hotel.get_room(101), datetime(2027, 1, 1) + timedelta(days=3 * week),
+                                         datetime(2027, 1, 3) + timedelta(days=3 * week))
+                for week in range(5)]
+    
+    # Test Case 1: Page through a guest's history, newest first
+    print("\nTest Case 1: Page through a guest's history, newest first")
+    second_page = ledger.get_guest_history(1100, page=1, page_size=2)
+    print(f"Bookings in ledger: {len(ledger)}")
+    print(f"Second page: {[booking.get_booking_id() for booking in second_page]}")
+    assert second_page == [bookings[2], bookings[1]]
+    
+    # Test Case 2: Arrivals and departures follow cancellations
+    print("\nTest Case 2: Arrivals and departures follow cancellations")
+    print(f"Arrivals on Jan 4: {len(ledger.get_arrivals(datetime(2027, 1, 4)))}")
+    bookings[1].cancel_reservation()
+    print(f"Arrivals on Jan 4 after cancellation: {len(ledger.get_arrivals(datetime(2027, 1, 4)))}")
+    print(f"Departures on Jan 15: {[str(booking) for booking in ledger.get_departures(datetime(2027, 1, 15))]}")
+    print(f"Bookings by status: {ledger.count_by_status()}")
+    assert ledger.get_arrivals(datetime(2027, 1, 4)) == []
+    assert ledger.count_by_status() == {"Confirmed": 4, "Cancelled": 1}
+    
+    for booking in bookings:
+        booking.cancel_reservation()
+    ledger.close()
+
+def test_loyalty_ledger():
+    """Test batch point accrual, redemptions and balances as of a date."""
+    print("\n=== Test: Loyalty Ledger ===")
+    ledger = LoyaltyLedger(checkpoint_interval=4)
+    members = [LoyaltyProgram(guest_id) for guest_id in range(1200, 1205)]
+    
+    # Test Case 1: Nightly accrual for a batch of paid invoices
+    print("\nTest Case 1: Nightly accrual for a batch of paid invoices")
+    for night in range(3):
+        points = ledger.accrue([(member, 75.5 * (index + 1)) for index, member in enumerate(members)]
+                               + [(members[0], 19.99)], datetime(2026, 3, 1 + night, 23))
+        print(f"Night {night + 1}: {points} points")
+    print(f"Balances: {[member.get_points_balance() for member in members]}")
+    print(f"Levels: {[member.get_membership_level() for member in members]}")
+    print(ledger)
+    assert members[4].get_points_balance() == 3 * int(377.5 * 10)
+    assert members[0].get_points_balance() == 3 * (755 + 199)
+    
+    # Test Case 2: Redeem points and look balances up as of earlier dates
+    print("\nTest Case 2: Redeem points and look balances up as of earlier dates")
+    discount = ledger.redeem(members[4], 5000, datetime(2026, 3, 4, 9))
+    print(f"Redeemed 5000 points for ${discount:.2f} discount")
+    as_of = [ledger.get_balance_as_of(members[4], datetime(2026, 3, day, 23, 30)) for day in range(1, 5)]
+    print(f"Balances as of Mar 1-4: {as_of}")
+    assert as_of == [3775, 7550, 11325, 6325]
+    
+    # Test Case 3: A batch longer than the checkpoint interval checkpoints at every interval
+    print("\nTest Case 3: A batch longer than the checkpoint interval checkpoints at every interval")
+    for use_numpy in (False, None):  # None uses NumPy when it is installed
+        batch_ledger = LoyaltyLedger(checkpoint_interval=4, use_numpy=use_numpy)
+        batch_members = [LoyaltyProgram(guest_id) for guest_id in range(1210, 1215)]
+        batch_ledger.accrue([(member, 10.0) for member in batch_members * 2], datetime(2026, 3, 1))
+        print(batch_ledger)
+        assert str(batch_ledger).endswith("Checkpoints: 2")
+        assert batch_ledger.get_balance_as_of(batch_members[0], datetime(2026, 3, 2)) == 200
+
+def test_service_dispatcher():
+    """Test priority dispatch of service requests to staff, backpressure and SLA metrics."""
+    print("\n=== Test: Service Dispatcher ===")
+    dispatcher = ServiceDispatcher(max_queue_depth=3)
+    dispatcher.add_staff("housekeeper-1", ["Housekeeping"])
+    dispatcher.add_staff("concierge-1", ["Room Service", "Spa"])
+    dispatcher.set_sla_target("Room Service", 1800)
+    
+    # Test Case 1: Urgent requests are assigned first
+    print("\nTest Case 1: Urgent requests are assigned first")
+    breakfast = GuestService("Room Service", "Breakfast", 25.0)
+    massage = GuestService("Spa", "Massage", 90.0)
+    towels = GuestService("Room Service", "Extra towels", 0.0)
+    dispatcher.submit(breakfast, priority=2)
+    dispatcher.submit(massage, priority=1)
+    dispatcher.submit(towels, priority=0)
+    print(dispatcher)
+    assigned = dispatcher.assign("concierge-1")
+    print(f"Assigned to concierge-1: {assigned.get_description()} ({assigned.get_status()})")
+    assert assigned is towels and towels.get_status() == "In Progress"
+    assert dispatcher.assign("housekeeper-1") is None
+    
+    # Test Case 2: A full queue refuses new requests
+    print("\nTest Case 2: A full queue refuses new requests")
+    cleaning = [GuestService("Housekeeping", f"Clean room {number}", 0.0) for number in range(4)]
+    accepted = [dispatcher.submit(service) for service in cleaning]
+    print(f"Accepted: {accepted}")
+    assert accepted == [True, True, True, False]
+    dispatcher.cancel(cleaning[0].get_service_id())
+    assert dispatcher.submit(cleaning[3]) and dispatcher.get_queue_depth("Housekeeping") == 3
+    
+    # Test Case 3: Completing requests feeds the SLA metrics
+    print("\nTest Case 3: Completing requests feeds the SLA metrics")
+    dispatcher.complete(towels.get_service_id())
+    assert dispatcher.assign("concierge-1") is massage
+    dispatcher.complete(massage.get_service_id())
+    metrics = dispatcher.get_sla_metrics()
+    print(f"Room Service: {metrics['Room Service']}")
+    print(towels.track_service_status())
+    assert metrics["Room Service"]["completed"] == 1 and metrics["Room Service"]["queued"] == 1
+    assert metrics["Room Service"]["sla_breaches"] == 0 and metrics["Spa"]["completed"] == 1
+    
+    # Test Case 4: Cancelled requests do not pile up in the heap
+    print("\nTest Case 4: Cancelled requests do not pile up in the heap")
+    laundry = ServiceDispatcher()
+    laundry.add_staff("valet-1", ["Laundry"])
+    orders = [GuestService("Laundry", f"Order {number}", 15.0) for number in range(1000)]
+    for number, order in enumerate(orders):
+        laundry.submit(order, priority=number % 7)
+    for order in orders[:900]:
+        laundry.cancel(order.get_service_id())
+    heap_size = len(laundry._types["Laundry"].queue)
+    print(f"Queued: {laundry.get_queue_depth('Laundry')} | Heap entries: {heap_size}")
+    assert laundry.get_queue_depth("Laundry") == 100 and heap_size <= 200
+    assert laundry.assign("valet-1") is orders[903]
+    
+    # Test Case 5: Submitting a queued or in-progress request again is refused
+    print("\nTest Case 5: Submitting a queued or in-progress request again is refused")
+    depth = laundry.get_queue_depth("Laundry")
+    for order in (orders[903], orders[950]):
+        try:
+            laundry.submit(order)
+            assert False, "Duplicate submission should be refused"
+        except ValueError as error:
+            print(f"Refused: {error}")
+    assert laundry.get_queue_depth("Laundry") == depth
+    laundry.complete(orders[903].get_service_id())
+    laundry.cancel(orders[950].get_service_id())
+    assert laundry.get_queue_depth("Laundry") == depth - 1
+    assert laundry.get_sla_metrics()["Laundry"]["in_flight"] == 0
+
+def test_feedback_analytics(guest, booking):
+    """Test rolling rating aggregates kept up to date by feedback events."""
+    print("\n=== Test: Feedback Analytics ===")
+    analytics = FeedbackAnalytics(window=timedelta(hours=2), bucket_width=timedelta(minutes=10))
+    room = booking.get_room()
+    
+    # Test Case 1: New feedback updates every aggregate
+    print("\nTest Case 1: New feedback updates every aggregate")
+    feedbacks = [Feedback(guest, booking, rating, "Stay review") for rating in (5, 4, 4, 2)]
+    room_stats = analytics.get_room_stats(room.get_room_number())
+    print(f"Room {room.get_room_number()}: {room_stats}")
+    print(analytics)
+    assert room_stats["count"] == 4 and room_stats["mean"] == 3.75
+    assert room_stats["histogram"] == {1: 0, 2: 1, 3: 0, 4: 2, 5: 1}
+    assert analytics.get_room_type_stats(room.get_room_type())["count"] == 4
+    
+    # Test Case 2: Changing a rating replaces it
+    print("\nTest Case 2: Changing a rating replaces it")
+    feedbacks[3].set_rating(5)
+    level_stats = analytics.get_level_stats(guest.get_loyalty_program().get_membership_level())
+    print(f"Loyalty level: {level_stats}")
+    assert level_stats["mean"] == 4.5 and level_stats["histogram"][2] == 0
+    
+    # Test Case 3: Old feedback leaves the sliding window
+    print("\nTest Case 3: Old feedback leaves the sliding window")
+    print(f"Last 2 hours: {analytics.get_overall_stats(windowed=True)['count']} ratings")
+    later = analytics.get_overall_stats(windowed=True, as_of=datetime.now() + timedelta(hours=3))
+    print(f"Window ending 3 hours from now: {later['count']} ratings")
+    assert later["count"] == 0 and analytics.get_overall_stats()["count"] == 4
+    analytics.close()
+
+def test_feedback_search(guest, booking):
+    """Test full-text search over feedback comments."""
+    print("\n=== Test: Feedback Search ===")
+    index = FeedbackIndex()
+    reviews = [Feedback(guest, booking, rating, comments) for rating, comments in (
+        (2, "The AC was broken and the room was noisy"),
+        (4, "Lovely pool, a little noisy at night"),
+        (5, "Spotless room and friendly staff"),
+        (1, "AC broken again, nobody came to fix the broken AC"),
+    )]
+    print(index)
+    
+    # Test Case 1: Phrase, boolean and rating-filtered queries
+    print("\nTest Case 1: Phrase, boolean and rating-filtered queries")
+    phrase = index.search('"AC broken"')
+    print(f'"AC broken": {[(feedback.get_rating(), round(score, 2)) for feedback, score in phrase]}')
+    assert [feedback for feedback, _ in phrase] == [reviews[3]]
+    assert {feedback for feedback, _ in index.search("noisy -pool")} == {reviews[0]}
+    assert len(index.search("pool OR staff")) == 2
+    assert [feedback for feedback, _ in index.search("noisy", min_rating=3)] == [reviews[1]]
+    
+    # Test Case 2: Edited comments are reindexed
+    print("\nTest Case 2: Edited comments are reindexed")
+    reviews[1].set_comments("Lovely quiet pool")
+    print(f"noisy: {len(index.search('noisy'))} result(s)")
+    assert [feedback for feedback, _ in index.search("noisy")] == [reviews[0]]
+    
+    # Test Case 3: Save and reload the index
+    print("\nTest Case 3: Save and reload the index")
+    index.close()
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "feedback.idx")
+        index.save(path)
+        reloaded = FeedbackIndex.load(path, reviews)
+        print(reloaded)
+        assert [feedback for feedback, _ in reloaded.search("quiet pool")] == [reviews[1]]
+        reloaded.close()
+        
+        # Test Case 4: Restored feedback keeps its ID, and changed comments reject the index
+        print("\nTest Case 4: Restored feedback keeps its ID, and changed comments reject the index")
+        restored = [Feedback.restore(review.get_feedback_id(), guest, booking, review.get_rating(),
+                                     review.get_comments(), review.get_submission_time()) for review in reviews]
+        reloaded = FeedbackIndex.load(path, restored)
+        print(f"Restored {restored[1].get_feedback_id()}: {reloaded.search('quiet pool')[0][0].get_feedback_id()}")
+        assert [feedback for feedback, _ in reloaded.search("quiet pool")] == [restored[1]]
+        reloaded.close()
+        assert Feedback(guest, booking, 3, "Later stay").get_feedback_id() not in {review.get_feedback_id() for review in reviews}
+        restored[2].set_comments("Dirty room")
+        try:
+            FeedbackIndex.load(path, restored)
+            assert False, "Changed comments should reject the index"
+        except ValueError as error:
+            print(f"Rejected: {error}")
+    finally:
+        shutil.rmtree(directory)
+
+def test_streaming_export(hotel):
+    """Test streaming bookings, invoices and receipts to CSV, JSON Lines and gzip text."""
+    print("\n=== Test: Streaming Export ===")
+    guest = Guest(900, "Export Tester", "555-900-0000", "export@example.com")
+    bookings = [guest.create_booking(room, datetime(2027, 2, 1), datetime(2027, 2, 3))
+                for room in hotel.get_rooms()]
+    invoices = [booking.generate_invoice() for booking in bookings]
+    payments = [Payment(invoice, invoice.get_final_amount(), "Credit Card") for invoice in invoices[:2]]
+    directory = tempfile.mkdtemp()
+    try:
+        # Test Case 1: Export bookings as CSV and invoices as JSON Lines
+        print("\nTest Case 1: Export bookings as CSV and invoices as JSON Lines")
+        count = export.export(iter(bookings), "bookings", os.path.join(directory, "bookings.csv"))
+        with open(os.path.join(directory, "bookings.csv")) as export_file:
+            lines = export_file.read().splitlines()
+        print(f"Exported {count} bookings; first row: {lines[1]}")
+        assert count == len(bookings) and len(lines) == count + 1
+        assert lines[0] == ",".join(export.BOOKING_COLUMNS)
+        export.export(invoices, "invoices", os.path.join(directory, "invoices.jsonl"), fmt="jsonl")
+        with open(os.path.join(directory, "invoices.jsonl")) as export_file:
+            first = json.loads(export_file.readline())
+        print(f"First invoice: {first}")
+        assert first["final_amount"] == invoices[0].get_final_amount()
+        
+        # Test Case 2: Export gzip-compressed receipts
+        print("\nTest Case 2: Export gzip-compressed receipts")
+        path = os.path.join(directory, "receipts.txt.gz")
+        export.export(payments, "payments", path, fmt="text")
+        with gzip.open(path, "rt") as export_file:
+            receipts = export_file.read()
+        print(f"{len(receipts)} characters of receipts")
+        assert receipts == "".join(payment.generate_receipt() + "\n\n" for payment in payments)
+        assert list(export.iter_text(bookings, "bookings")) == [f"{booking}\n\n" for booking in bookings]
+        
+        # Test Case 3: Amounts JSON cannot represent are refused
+        print("\nTest Case 3: Amounts JSON cannot represent are refused")
+        broken = Invoice(bookings[0].get_booking_id(), float("nan"))
+        try:
+            list(export.iter_jsonl([broken], "invoices"))
+            assert False, "A NaN amount should not be exported"
+        except ValueError as error:
+            print(f"Refused: {error}")
+    finally:
+        shutil.rmtree(directory)
+        for booking in bookings:
+            booking.cancel_reservation()
+
+def test_revenue_report(hotel):
+    """Test occupancy, ADR and RevPAR kept up to date by bookings, invoices and payments."""
+    print("\n=== Test: Revenue Report ===")
+    report = RevenueReport.from_hotel(hotel, datetime(2027, 7, 1), 92)
+    guest = Guest(901, "Summer Guest", "555-901-0000", "summer@example.com")
+    rooms = hotel.get_rooms()
+    quarter = (datetime(2027, 7, 1), datetime(2027, 10, 1))
+    
+    # Test Case 1: Bookings update rooms sold and booked revenue
+    print("\nTest Case 1: Bookings update rooms sold and booked revenue")
+    stays = [guest.create_booking(room, datetime(2027, 8, 10), datetime(2027, 8, 13)) for room in rooms[:2]]
+    metrics = report.get_metrics(*quarter)
+    print(f"Q3: {metrics}")
+    assert metrics["rooms_sold"] == 6
+    assert metrics["revenue"] == 3 * sum(room.get_price_per_night() for room in rooms[:2])
+    assert metrics["room_nights"] == len(rooms) * 92
+    
+    # Test Case 2: Invoices, payments and cancellations adjust their nights
+    print("\nTest Case 2: Invoices, payments and cancellations adjust their nights")
+    invoice = stays[0].generate_invoice()
+    Payment(invoice, invoice.get_final_amount(), "Cash").process_payment()
+    stays[1].cancel_reservation()
+    by_type = report.get_report(*quarter, basis="paid")
+    for room_type, type_metrics in by_type.items():
+        print(f"{room_type}: sold {type_metrics['rooms_sold']} | RevPAR ${type_metrics['revpar']:.2f}")
+    assert report.get_rooms_sold(*quarter) == 3
+    assert report.get_revenue(*quarter, basis="paid") == invoice.get_final_amount()
+    assert report.get_revenue(datetime(2027, 8, 12), datetime(2027, 8, 13), basis="paid") == \
+        invoice.get_final_amount() / 3
+    
+    # Test Case 3: A partially paid invoice counts the amount paid
+    print("\nTest Case 3: A partially paid invoice counts the amount paid")
+    paid = invoice.get_final_amount()
+    stays[0].add_service(GuestService("Room Service", "Dinner", 60.0))
+    stays[0].generate_invoice()
+    paid_revenue = report.get_revenue(*quarter, basis="paid")
+    print(f"Status: {invoice.get_payment_status()} | Invoiced: ${report.get_revenue(*quarter, basis='invoiced'):.2f} "
+          f"| Paid: ${paid_revenue:.2f}")
+    assert invoice.get_payment_status() == "Partially Paid" and abs(paid_revenue - paid) < 1e-9
+    assert abs(report.get_revenue(*quarter, basis="invoiced") - invoice.get_final_amount()) < 1e-9
+    print(report)
+    stays[0].cancel_reservation()
+    report.close()
+
+def test_instrumentation(rooms):
+    """Test opt-in operation metrics and their Prometheus export."""
+    print("\n=== Test: Instrumentation ===")
+    guest = Guest(902, "Metrics Guest", "555-902-0000", "metrics@example.com")
+    original_reserve = Room.reserve
+    instrumentation.reset()
+    instrumentation.enable()
+    try:
+        # Test Case 1: Operations, rejections and failed payments are counted
+        print("\nTest Case 1: Operations, rejections and failed payments are counted")
+        check_in, check_out = datetime(2027, 12, 1), datetime(2027, 12, 4)
+        booking = guest.create_booking(rooms[0], check_in, check_out)
+        rejected = guest.create_booking(rooms[0], check_in, check_out)
+        invoice = booking.generate_invoice()
+        Payment(invoice, 1.0, "Cash").process_payment()
+        snapshot = instrumentation.snapshot()
+        create_booking = snapshot["operations"]["Guest.create_booking"]
+        print(f"Guest.create_booking: {create_booking['calls']} calls, p50 {create_booking['p50_seconds'] * 1e6:.1f} us")
+        print(f"Counters: {snapshot['counters']}")
+        assert rejected is None and create_booking["calls"] == 2
+        assert snapshot["counters"][("hotel_booking_rejections_total", ())] == 1
+        assert snapshot["counters"][("hotel_payment_failures_total",
+                                     (("status", "Failed - Insufficient Amount"),))] == 1
+        
+        # Test Case 2: Export in the Prometheus text format
+        print("\nTest Case 2: Export in the Prometheus text format")
+        text = instrumentation.render_prometheus()
+        print("\n".join(line for line in text.splitlines() if "Room.reserve" in line and "+Inf" in line))
+        assert 'hotel_operation_seconds_count{operation="Room.reserve"} 2' in text
+        assert "hotel_booking_rejections_total 1" in text
+        booking.cancel_reservation()
+        
+        # Test Case 3: Exited threads are folded together and reset starts over
+        print("\nTest Case 3: Exited threads are folded together and reset starts over")
+        workers = [threading.Thread(target=lambda: instrumentation.increment("hotel_test_total"))
+                   for _ in range(20)]
+        for worker in workers:
+            worker.start()
+            worker.join()
+        tracked = len(instrumentation._thread_stats)
+        counters = instrumentation.snapshot()["counters"]
+        print(f"Threads tracked: {tracked} | Test counter: {counters[('hotel_test_total', ())]}")
+        assert counters[("hotel_test_total", ())] == 20 and tracked <= 2
+        instrumentation.reset()
+        instrumentation.increment("hotel_test_total")
+        assert instrumentation.snapshot()["counters"] == {("hotel_test_total", ()): 1}
+    finally:
+        instrumentation.disable()
+    
+    # Test Case 4: Disabling restores the original methods
+    print("\nTest Case 4: Disabling restores the original methods")
+    print(f"Instrumentation enabled: {instrumentation.is_enabled()}")
+    assert Room.reserve is original_reserve and not instrumentation.is_enabled()
+
+def test_workload_replay():
+    """Test replaying a JSON Lines workload against a fresh hotel."""
+    print("\n=== Test: Workload Replay ===")
+    sample = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "workloads", "sample_day.jsonl")
+    
+    # Test Case 1: Replay the sample workload on one thread
+    print("\nTest Case 1: Replay the sample workload on one thread")
+    replayer = WorkloadReplayer()
+    report = replayer.run(read_workload(sample))
+    book = report["per_operation"]["book"]
+    print(f"{report['operations']} operations, {report['throughput']:,.0f} ops/sec, "
+          f"book p99 {book['p99'] * 1e6:.1f} us, outcomes {book['outcomes']}")
+    assert report["errors"] == 0 and report["operations"] == sum(1 for _ in read_workload(sample))
+    assert len(replayer.get_hotel()) == report["per_operation"]["add_room"]["count"]
+    
+    # Test Case 2: Threads keep each guest's operations in order
+    print("\nTest Case 2: Threads keep each guest's operations in order")
+    operations = list(generate_workload(rooms_per_type=5, guests=40, days=10, seed=7))
+    single = WorkloadReplayer().run(operations)
+    threaded = WorkloadReplayer().run(operations, threads=4)
+    print(f"1 thread: {single['per_operation']['pay']['outcomes']}, "
+          f"4 threads: {threaded['per_operation']['pay']['outcomes']}")
+    assert threaded["errors"] == 0 and threaded["operations"] == len(operations)
+    assert threaded["per_operation"]["create_guest"]["outcomes"] == {"ok": 40}
+    assert threaded["per_operation"]["add_room"]["count"] == single["per_operation"]["add_room"]["count"]
+    
+    # Test Case 3: A fixed arrival rate paces the replay
+    print("\nTest Case 3: A fixed arrival rate paces the replay")
+    report = WorkloadReplayer().run(operations[:200], threads=2, rate=2000)
+    print(f"200 operations at 2000/s took {report['elapsed']:.3f}s")
+    assert report["elapsed"] >= 199 / 2000
+    
+    # Test Case 4: Compressed workloads and unknown operations
+    print("\nTest Case 4: Compressed workloads and unknown operations")
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "day.jsonl.gz")
+        written = write_workload(operations, path)
+        print(f"Wrote {written} operations to {os.path.basename(path)}")
+        assert list(read_workload(path)) == operations
+        bad = os.path.join(directory, "bad.jsonl")
+        with open(bad, "w") as bad_file:
+            bad_file.write('{"op": "teleport"}\n')
+        try:
+            list(read_workload(bad))
+            assert False, "Unknown operation accepted"
+        except ValueError as error:
+            print(f"Rejected: {error}")
+    finally:
+        shutil.rmtree(directory)
+
+def test_rate_calendar_and_quotes():
+    """Test nightly rates, invoices priced from them and cached quotes."""
+    print("\n=== Test: Rate Calendar and Quotes ===")
+    singles = [SingleRoom(951, 100.0, ["Wi-Fi"], "Queen"), SingleRoom(952, 120.0, ["Wi-Fi"], "King")]
+    suite = Suite(953, 400.0, ["Wi-Fi", "Minibar"], "Executive")
+    engine = QuoteEngine(singles + [suite], cache_size=2)
+    monday = datetime(2028, 5, 1)
+    week = monday + timedelta(days=7)
+    
+    # Test Case 1: Weekend rates for a room type
+    print("\nTest Case 1: Weekend rates for a room type")
+    weekend = RateCalendar()
+    engine.set_type_calendar("Single", weekend)
+    weekend.set_rates(monday, monday + timedelta(days=90), 150.0, weekdays=(4, 5))
+    print(f"Friday: {weekend.get_rate(monday + timedelta(days=4))}, Monday: {weekend.get_rate(monday)}, {weekend}")
+    assert weekend.get_rate(monday) is None and weekend.count_rated() == 26
+    assert singles[0].get_room_charge(monday, week) == 5 * 100.0 + 2 * 150.0
+    
+    # Test Case 2: Quotes include room, loyalty discounts and upgrades
+    print("\nTest Case 2: Quotes include room, loyalty discounts and upgrades")
+    quote = engine.quote("Single", monday, week, "Gold")
+    print(f"Single quote: {quote}")
+    assert quote["room_number"] == 951 and quote["room_charge"] == 800.0
+    assert quote["total"] == 800.0 * 0.9
+    suite_quote = engine.quote("Suite", monday, monday + timedelta(days=2))
+    print(f"Suite upgrades: {suite_quote['upgrades']}")
+    assert suite_quote["total"] == 800.0 and suite_quote["upgrades"] == tuple(suite.get_upgrades())
+    
+    # Test Case 3: Cached quotes are dropped when rates change over their nights
+    print("\nTest Case 3: Cached quotes are dropped when rates change over their nights")
+    engine.quote("Single", monday, week, "Gold")
+    weekend.set_rates(monday + timedelta(days=60), monday + timedelta(days=61), 90.0)
+    assert engine.get_cache_stats()["hits"] == 1 and engine.get_cache_stats()["size"] == 2
+    weekend.set_rates(monday, monday + timedelta(days=1), 80.0)
+    print(f"After rate change: {engine}")
+    assert engine.quote("Single", monday, week, "Gold")["room_charge"] == 780.0
+    assert engine.get_cache_stats()["misses"] == 3
+    
+    # Test Case 4: Invoices charge the nightly rates
+    print("\nTest Case 4: Invoices charge the nightly rates")
+    guest = Guest(951, "Rate Guest", "555-951-0000", "rates@example.com")
+    booking = guest.create_booking(singles[0], monday, week)
+    invoice = booking.generate_invoice()
+    print(f"Invoice: {invoice}")
+    assert invoice.get_total_amount() == 780.0
+    assert invoice.get_final_amount() == engine.quote("Single", monday, week)["total"]
+    weekend.set_rates(monday + timedelta(days=1), monday + timedelta(days=2), 200.0)
+    assert booking.generate_invoice().get_total_amount() == 880.0
+    assert BillingEngine().compute([booking]).get_total_amounts()[0] == 880.0
+    
+    # Test Case 5: Calendars assigned on the room itself still reach quotes and revenue
+    print("\nTest Case 5: Calendars assigned on the room itself still reach quotes and revenue")
+    report = RevenueReport(singles + [suite], monday, 14, [booking])
+    assert report.get_revenue(monday, week) == 880.0
+    assert engine.quote("Suite", monday, monday + timedelta(days=2))["room_charge"] == 800.0
+    peak = RateCalendar()
+    peak.set_rates(monday, week, 500.0)
+    suite.set_rate_calendar(peak)
+    suite_booking = guest.create_booking(suite, monday, monday + timedelta(days=2))
+    print(f"Suite quote: {engine.quote('Suite', monday, monday + timedelta(days=2))['room_charge']}")
+    assert engine.quote("Suite", monday, monday + timedelta(days=2))["room_charge"] == 1000.0
+    weekend.set_rates(monday, monday + timedelta(days=1), 60.0)
+    peak.set_rates(monday + timedelta(days=1), monday + timedelta(days=2), 450.0)
+    print(f"Booked revenue: {report.get_revenue(monday, week, 'Single')} Single, {report.get_revenue(monday, week, 'Suite')} Suite")
+    assert report.get_revenue(monday, week, "Single") == 860.0
+    assert report.get_revenue(monday, week, "Suite") == 950.0
+    report.close()
+    
+    # Test Case 6: Rate calendars and their changes are stored and recovered
+    print("\nTest Case 6: Rate calendars and their changes are stored and recovered")
+    directory = tempfile.mkdtemp()
+    try:
+        store = HotelStore(directory).open()
+        shared = RateCalendar()
+        shared.set_rates(monday, week, 130.0)
+        rooms = [SingleRoom(number, 100.0, ["Wi-Fi"], "Queen") for number in (961, 962, 963)]
+        for room in rooms:
+            room.set_rate_calendar(shared)
+            store.add_room(room)
+        shared.set_rates(monday, monday + timedelta(days=2), 170.0, weekdays=(0,))
+        rooms[1].set_rate_calendar(RateCalendar())
+        rooms[1].get_rate_calendar().set_rates(monday, monday + timedelta(days=1), 90.0)
+        store.close()
+        for snapshot in (False, True):
+            store = HotelStore(directory).open()
+            recovered = [store.get_hotel().get_room(number) for number in (961, 962, 963)]
+            charges = [room.get_room_charge(monday, week) for room in recovered]
+            print(f"Recovered charges{' after snapshot' if snapshot else ''}: {charges}")
+            assert charges == [170.0 + 6 * 130.0, 90.0 + 6 * 100.0, 170.0 + 6 * 130.0]
+            assert recovered[0].get_rate_calendar() is recovered[2].get_rate_calendar()
+            if snapshot:
+                store.close()
+                break
+            store.snapshot()
+            store.close()
+    finally:
+        shutil.rmtree(directory)
+    suite_booking.cancel_reservation()
+    booking.cancel_reservation()
+    engine.close()
+
 def test_invoice_and_payment(booking):
     """Test invoice generation and payment processing."""
     print("\n=== Test: Invoice Generation and Payment ===")
@@ -170,6 +1329,29 @@ def main():
     guest = test_guest_account_creation()
     rooms = test_room_management()
     booking = test_making_reservation(guest, rooms)
+    test_month_boundary_stay(guest)
+    hotel = test_hotel_inventory(guest, rooms)
+    test_occupancy_matrix(guest, hotel)
+    test_concurrent_booking()
+    test_async_hotel(hotel)
+    test_group_booking(hotel)
+    test_persistence()
+    test_mapped_availability()
+    test_batch_invoicing(hotel)
+    test_incremental_invoice(hotel)
+    test_payment_pipeline()
+    test_id_allocator(guest, booking)
+    test_guest_registry(guest)
+    test_booking_ledger(hotel)
+    test_loyalty_ledger()
+    test_service_dispatcher()
+    test_feedback_analytics(guest, booking)
+    test_feedback_search(guest, booking)
+    test_streaming_export(hotel)
+    test_revenue_report(hotel)
+    test_instrumentation(rooms)
+    test_workload_replay()
+    test_rate_calendar_and_quotes()
     invoice = test_invoice_and_payment(booking)
     feedback = test_feedback_system(guest, booking)
     test_loyalty_program(guest, invoice)